@@ -0,0 +1,74 @@
+"""
+Adaptive (AIMD) concurrency limit for bulk writes to Strapi
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+# Latencies below this are treated as equal, so scheduling jitter on very
+# fast responses is not mistaken for congestion
+LATENCY_FLOOR_SECONDS = 0.005
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit that grows while Strapi keeps up and halves when it does not
+    
+    Additive increase: every successful request with latency within
+    `latency_tolerance` x the best latency seen adds 1/limit, so the limit
+    grows by about one per round of requests. Multiplicative decrease:
+    an overload signal (429, 5xx, timeout) or a slow response halves the
+    limit, at most once per observed latency so one burst of failures
+    counts as a single congestion event.
+    """
+    
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_tolerance: float = 2.0,
+        backoff_factor: float = 0.5
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.backoff_factor = backoff_factor
+        self.in_flight = 0
+        self.min_latency: Optional[float] = None
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+        self._condition = asyncio.Condition()
+    
+    async def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to pass to release()"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+    
+    async def release(self, started: float, overloaded: bool = False) -> None:
+        """Return a slot and adjust the limit from the request's outcome and latency"""
+        now = time.monotonic()
+        latency = now - started
+        async with self._condition:
+            self.in_flight -= 1
+            if not overloaded:
+                self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+            congested = overloaded or latency > self.latency_tolerance * max(self.min_latency, LATENCY_FLOOR_SECONDS)
+            if congested:
+                if now - self._last_decrease >= latency:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "min_latency_ms": round(self.min_latency * 1000, 1) if self.min_latency is not None else None,
+            "decreases": self.decreases
+        }
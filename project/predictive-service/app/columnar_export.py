@@ -0,0 +1,270 @@
+"""
+Arrow IPC / Parquet export of entities, forecasts and simulation paths
+
+Exports are written as a sequence of record batches (Parquet row groups),
+so a response can be sent while later batches are still being built.
+pyarrow is optional; without it every export raises ExportUnavailableError.
+"""
+from datetime import date
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+import numpy as np
+
+from app.deal_table import DealTable
+from app.month_index import month_from_index
+from app.records import BillingRecord, SaleRecord
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pq = None
+
+EXPORT_MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+# Amounts are exported as decimal128 with this many fractional digits
+AMOUNT_SCALE = 2
+_QUANTUM = Decimal(1).scaleb(-AMOUNT_SCALE)
+
+# Rows per record batch (and per Parquet row group)
+RECORD_BATCH_ROWS = 65536
+
+
+class ExportUnavailableError(RuntimeError):
+    """Raised when columnar export is requested but pyarrow is not installed"""
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise ExportUnavailableError("Columnar export requires pyarrow, which is not installed")
+
+
+def _amounts(values: List[Decimal]) -> "pa.Array":
+    """Decimal amounts, rounded half-even to AMOUNT_SCALE places, as decimal128"""
+    return pa.array(
+        [value.quantize(_QUANTUM, ROUND_HALF_EVEN) for value in values],
+        type=pa.decimal128(38, AMOUNT_SCALE)
+    )
+
+
+def _nullable(values: np.ndarray) -> "pa.Array":
+    """float64 column with NaN (unset) as null"""
+    return pa.array(values, mask=np.isnan(values))
+
+
+def deal_table_to_arrow(table: DealTable) -> "pa.Table":
+    """Arrow table over the DealTable columns
+    
+    Numeric columns are handed to Arrow as numpy buffers and stages are
+    dictionary encoded from the table's stage codes, so no per-row Python
+    objects are created.
+    """
+    require_pyarrow()
+    activity_us = np.nan_to_num(table.last_activity_at * 1e6).astype(np.int64)
+    return pa.table({
+        "id": pa.array(table.ids.tolist()),
+        "stage": pa.DictionaryArray.from_arrays(
+            pa.array(table.stage_codes), pa.array(table.stages, type=pa.string())
+        ),
+        "deal_value": pa.array(table.deal_value),
+        "probability": _nullable(table.probability),
+        "confidence_override": _nullable(table.confidence_override),
+        "last_activity_at": pa.array(
+            activity_us, type=pa.timestamp("us", tz="UTC"), mask=np.isnan(table.last_activity_at)
+        ),
+        "high_risk": pa.array(table.high_risk),
+        "complexity_score": _nullable(table.complexity_score)
+    })
+
+
+def _dictionary() -> "pa.DataType":
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def sales_schema() -> "pa.Schema":
+    require_pyarrow()
+    return pa.schema([
+        ("branch", _dictionary()),
+        ("id", pa.string()),
+        ("client", pa.string()),
+        ("status", _dictionary()),
+        ("amount", pa.decimal128(38, AMOUNT_SCALE)),
+        ("sale_date", pa.date32())
+    ])
+
+
+def billings_schema() -> "pa.Schema":
+    require_pyarrow()
+    return pa.schema([
+        ("branch", _dictionary()),
+        ("id", pa.int64()),
+        ("deal_id", pa.int64()),
+        ("amount", pa.decimal128(38, AMOUNT_SCALE)),
+        ("month", pa.date32()),
+        ("collected", pa.bool_())
+    ])
+
+
+def sales_batch(rows: Iterable[Tuple[str, SaleRecord]]) -> "pa.RecordBatch":
+    """Record batch of (branch, sale) rows"""
+    require_pyarrow()
+    branches, ids, clients, statuses, amounts, sale_dates = [], [], [], [], [], []
+    for branch, sale in rows:
+        branches.append(branch)
+        ids.append(str(sale.id))
+        clients.append(str(sale.client))
+        statuses.append(sale.status)
+        amounts.append(sale.amount)
+        sale_dates.append(sale.sale_date)
+    return pa.record_batch([
+        pa.array(branches, type=pa.string()).dictionary_encode(),
+        pa.array(ids, type=pa.string()),
+        pa.array(clients, type=pa.string()),
+        pa.array(statuses, type=pa.string()).dictionary_encode(),
+        _amounts(amounts),
+        pa.array(sale_dates, type=pa.date32())
+    ], schema=sales_schema())
+
+
+def billings_batch(rows: Iterable[Tuple[str, BillingRecord]]) -> "pa.RecordBatch":
+    """Record batch of (branch, billing) rows; month is the first day of the billing month"""
+    require_pyarrow()
+    branches, ids, deal_ids, amounts, months, collected = [], [], [], [], [], []
+    for branch, billing in rows:
+        branches.append(branch)
+        ids.append(billing.id)
+        deal_ids.append(billing.deal_id)
+        amounts.append(billing.amount)
+        months.append(month_from_index(billing.month_index) if billing.month_index is not None else None)
+        collected.append(billing.collected)
+    return pa.record_batch([
+        pa.array(branches, type=pa.string()).dictionary_encode(),
+        pa.array(ids, type=pa.int64()),
+        pa.array(deal_ids, type=pa.int64()),
+        _amounts(amounts),
+        pa.array(months, type=pa.date32()),
+        pa.array(collected, type=pa.bool_())
+    ], schema=billings_schema())
+
+
+def forecast_to_arrow(forecast: Dict[str, Any]) -> "pa.Table":
+    """Arrow table of a forecast result's monthly totals"""
+    require_pyarrow()
+    monthly = forecast.get("forecast", {}).get("monthly_totals", [])
+    months = [date.fromisoformat(row["month"]) if isinstance(row["month"], str) else row["month"] for row in monthly]
+    columns = {"month": pa.array(months, type=pa.date32())}
+    for name in ("confirmed", "tentative", "total"):
+        columns[name] = pa.array(np.array([row[name] for row in monthly], dtype=np.float64))
+    return pa.table(columns)
+
+
+def sample_paths_to_arrow(months: List[date], paths: List[np.ndarray]) -> "pa.Table":
+    """Arrow table with one row per iteration and one column per month (plus the total)
+    
+    Each month's outcomes are already a contiguous float64 array, so the
+    columns wrap those buffers without copying.
+    """
+    require_pyarrow()
+    columns = {"iteration": pa.array(np.arange(len(paths[0]) if paths else 0, dtype=np.int64))}
+    for month, outcomes in zip(months, paths):
+        columns[month.isoformat()] = pa.array(outcomes)
+    columns["total"] = pa.array(np.sum(paths, axis=0) if paths else np.empty(0))
+    return pa.table(columns)
+
+
+class _ChunkSink:
+    """Write-only file that hands back what has been written since the last drain"""
+    
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+    
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def writable(self) -> bool:
+        return True
+    
+    def flush(self) -> None:
+        pass
+    
+    def close(self) -> None:
+        self.closed = True
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class BatchWriter:
+    """Incremental Arrow IPC stream or Parquet writer
+    
+    Each written batch is returned as the bytes it adds to the output
+    (one IPC message, or one Parquet row group); close() returns the end
+    of stream marker or the Parquet footer.
+    """
+    
+    def __init__(self, schema: "pa.Schema", format: str):
+        require_pyarrow()
+        if format not in EXPORT_MEDIA_TYPES:
+            raise ValueError(f"Unknown export format: {format} (expected one of {', '.join(EXPORT_MEDIA_TYPES)})")
+        self._sink = _ChunkSink()
+        output = pa.PythonFile(self._sink, mode="w")
+        if format == "arrow":
+            self._writer = pa.ipc.new_stream(output, schema)
+        else:
+            self._writer = pq.ParquetWriter(output, schema)
+    
+    def header(self) -> bytes:
+        return self._sink.drain()
+    
+    def write(self, batch: "pa.RecordBatch") -> bytes:
+        if batch.num_rows:
+            self._writer.write_batch(batch)
+        return self._sink.drain()
+    
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+def iter_table(table: "pa.Table", format: str, batch_rows: int = RECORD_BATCH_ROWS) -> Iterator[bytes]:
+    """Serialized chunks of an in-memory table, one per record batch
+    
+    Batches are slices of the table's columns, so no column data is copied
+    before it is written.
+    """
+    writer = BatchWriter(table.schema, format)
+    yield writer.header()
+    for batch in table.to_batches(max_chunksize=batch_rows):
+        yield writer.write(batch)
+    yield writer.close()
+
+
+async def stream_batches(
+    batches: AsyncIterator["pa.RecordBatch"],
+    schema: "pa.Schema",
+    format: str
+) -> AsyncIterator[bytes]:
+    """Serialized chunks of record batches as they are produced; encoding runs off the event loop"""
+    writer = BatchWriter(schema, format)
+    yield writer.header()
+    async for batch in batches:
+        yield await run_in_threadpool(writer.write, batch)
+    yield await run_in_threadpool(writer.close)
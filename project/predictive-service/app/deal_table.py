@@ -0,0 +1,95 @@
+"""
+Columnar view of pipeline deals for batch computations
+"""
+from typing import List, Dict
+
+import numpy as np
+
+from app.records import DealLike, deal_records
+
+# Scalar deal attributes read by from_deals; the project and risk_flags
+# relations are read too when the caller populates them
+DEAL_TABLE_FIELDS = ("deal_value", "probability", "confidence_override", "stage", "last_activity_at")
+
+# Relation fields behind the risk flag and complexity adjustments (relation -> fields to populate)
+DEAL_TABLE_RELATIONS = {"risk_flags": ("severity",), "project": ("complexity_score",)}
+
+
+class DealTable:
+    """Struct-of-arrays table with the deal fields the probability model reads
+    
+    Missing or falsy optional numbers are stored as NaN so they follow the
+    same "is it set" rules as the attribute-dict code paths.
+    """
+    
+    def __init__(
+        self,
+        ids: np.ndarray,
+        deal_value: np.ndarray,
+        probability: np.ndarray,
+        confidence_override: np.ndarray,
+        stage_codes: np.ndarray,
+        stages: List[str],
+        last_activity_at: np.ndarray,
+        high_risk: np.ndarray,
+        complexity_score: np.ndarray
+    ):
+        self.ids = ids
+        self.deal_value = deal_value
+        self.probability = probability
+        self.confidence_override = confidence_override
+        self.stage_codes = stage_codes
+        self.stages = stages
+        self.last_activity_at = last_activity_at
+        self.high_risk = high_risk
+        self.complexity_score = complexity_score
+    
+    def __len__(self) -> int:
+        return len(self.deal_value)
+    
+    @classmethod
+    def from_deals(cls, deals: List[DealLike]) -> "DealTable":
+        """Build a table from deal records or Strapi deal entries ({"id": ..., "attributes": {...}})"""
+        records = deal_records(deals)
+        n = len(records)
+        ids = np.empty(n, dtype=object)
+        deal_value = np.zeros(n, dtype=np.float64)
+        probability = np.full(n, np.nan)
+        confidence_override = np.full(n, np.nan)
+        stage_codes = np.zeros(n, dtype=np.int32)
+        last_activity_at = np.full(n, np.nan)
+        high_risk = np.zeros(n, dtype=bool)
+        complexity_score = np.full(n, np.nan)
+        
+        stage_index: Dict[str, int] = {}
+        for i, record in enumerate(records):
+            ids[i] = record.id
+            deal_value[i] = float(record.deal_value)
+            
+            # Same "is it set" rule as the scalar path, applied to the raw value
+            if record.has_probability and record.probability is not None:
+                probability[i] = float(record.probability)
+            if record.has_override and record.confidence_override is not None:
+                confidence_override[i] = float(record.confidence_override)
+            
+            stage = str(record.stage or "prospecting").lower()
+            stage_codes[i] = stage_index.setdefault(stage, len(stage_index))
+            
+            if record.last_activity_at is not None:
+                last_activity_at[i] = record.last_activity_at.timestamp()
+            
+            high_risk[i] = record.high_risk
+            if record.complexity_score is not None:
+                complexity_score[i] = record.complexity_score
+        
+        return cls(
+            ids=ids,
+            deal_value=deal_value,
+            probability=probability,
+            confidence_override=confidence_override,
+            stage_codes=stage_codes,
+            stages=list(stage_index),
+            last_activity_at=last_activity_at,
+            high_risk=high_risk,
+            complexity_score=complexity_score
+        )
@@ -0,0 +1,265 @@
+"""
+Materialised monthly forecast aggregates maintained per deal contribution
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+
+from app.month_index import month_from_index, window_bounds
+
+TIERS = ("confirmed", "tentative")
+
+# Deals at or above this probability (percent) are counted as confirmed
+CONFIRMED_PROBABILITY = 75
+
+# Fixed-point amounts are integers in units of 10^-9 of the currency
+# (10^-7 satang), fine enough that per-deal-month rounding stays far
+# below a cent on books with millions of contributions.
+FIXED_POINT_DIGITS = 9
+FIXED_POINT_SCALE = 10 ** FIXED_POINT_DIGITS
+
+Amount = Union[Decimal, float, int]
+
+# (first month index, last month index, tier, monthly amount) recognised by one deal
+Recognition = Tuple[int, int, str, Amount]
+
+
+class AggregationBackend:
+    """Number representation used to accumulate forecast amounts
+    
+    Deal inputs are converted once per deal; per-month totals are then
+    summed in the backend's own type and only converted to float when a
+    response is formatted.
+    """
+    
+    name = ""
+    zero: Amount = 0
+    
+    def monthly_amount(self, deal_value: Any, probability: Any, months: int) -> Tuple[str, Amount]:
+        """Tier and per-month recognised amount of a deal spread over `months`"""
+        raise NotImplementedError
+    
+    def to_float(self, amount: Amount, weight: Decimal = Decimal(1)) -> float:
+        """Output boundary: amount * weight as a float"""
+        raise NotImplementedError
+    
+    def ratio(self, numerator: Amount, denominator: Amount) -> float:
+        return self.to_float(numerator) / self.to_float(denominator) if denominator else 0.0
+
+
+class DecimalBackend(AggregationBackend):
+    """Exact decimal arithmetic (28 significant digits)"""
+    
+    name = "decimal"
+    zero = Decimal(0)
+    
+    def monthly_amount(self, deal_value: Any, probability: Any, months: int) -> Tuple[str, Decimal]:
+        deal_value = Decimal(str(deal_value))
+        probability = Decimal(str(probability)) / 100
+        tier = "confirmed" if probability >= Decimal(CONFIRMED_PROBABILITY) / 100 else "tentative"
+        expected_amount = deal_value * probability
+        return tier, expected_amount / months if months else expected_amount
+    
+    def to_float(self, amount: Decimal, weight: Decimal = Decimal(1)) -> float:
+        return float(amount * weight)
+    
+    def ratio(self, numerator: Decimal, denominator: Decimal) -> float:
+        return float(numerator / denominator) if denominator > 0 else 0.0
+
+
+class FloatBackend(AggregationBackend):
+    """Native float64 arithmetic; fastest, exact to well under a cent for typical books"""
+    
+    name = "float"
+    zero = 0.0
+    
+    def monthly_amount(self, deal_value: Any, probability: Any, months: int) -> Tuple[str, float]:
+        probability = float(probability)
+        tier = "confirmed" if probability >= CONFIRMED_PROBABILITY else "tentative"
+        expected_amount = float(deal_value) * probability / 100
+        return tier, expected_amount / months if months else expected_amount
+    
+    def to_float(self, amount: float, weight: Decimal = Decimal(1)) -> float:
+        return amount * float(weight)
+    
+    def ratio(self, numerator: float, denominator: float) -> float:
+        return numerator / denominator if denominator > 0 else 0.0
+
+
+def _to_fixed(value: Any) -> int:
+    """Exact decimal value of `value` (as Decimal(str(value)) reads it) in fixed-point units"""
+    if isinstance(value, int):
+        return value * FIXED_POINT_SCALE
+    text = str(value)
+    whole, _, fraction = text.partition(".")
+    # Plain decimal literals are converted with integer parsing; anything else goes through Decimal
+    if whole.lstrip("-").isdigit() and len(fraction) <= FIXED_POINT_DIGITS and (not fraction or fraction.isdigit()):
+        return int(whole + fraction.ljust(FIXED_POINT_DIGITS, "0"))
+    return int(Decimal(text).scaleb(FIXED_POINT_DIGITS).to_integral_value(ROUND_HALF_EVEN))
+
+
+def _div_half_even(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+class FixedPointBackend(AggregationBackend):
+    """Integer fixed-point arithmetic in FIXED_POINT_SCALE units
+    
+    Sums are exact, so incremental add/remove never drifts; each deal's
+    per-month amount is rounded half-even once, and the output boundary
+    is a correctly rounded integer-to-float division.
+    """
+    
+    name = "fixed"
+    zero = 0
+    
+    def monthly_amount(self, deal_value: Any, probability: Any, months: int) -> Tuple[str, int]:
+        probability = _to_fixed(probability)
+        tier = "confirmed" if probability >= CONFIRMED_PROBABILITY * FIXED_POINT_SCALE else "tentative"
+        # value * probability / 100 / months, rescaled from SCALE^2 back to SCALE
+        numerator = _to_fixed(deal_value) * probability
+        return tier, _div_half_even(numerator, 100 * FIXED_POINT_SCALE * max(months, 1))
+    
+    def to_float(self, amount: int, weight: Decimal = Decimal(1)) -> float:
+        numerator, denominator = weight.as_integer_ratio()
+        return amount * numerator / (denominator * FIXED_POINT_SCALE)
+    
+    def ratio(self, numerator: int, denominator: int) -> float:
+        return numerator / denominator if denominator > 0 else 0.0
+
+
+AGGREGATION_BACKENDS = {
+    "decimal": DecimalBackend,
+    "float": FloatBackend,
+    "fixed": FixedPointBackend,
+}
+
+
+def make_aggregation_backend(kind: str = "decimal") -> AggregationBackend:
+    """Create an aggregation backend by name ("decimal", "float" or "fixed")"""
+    if kind not in AGGREGATION_BACKENDS:
+        raise ValueError(f"Unknown aggregation backend: {kind}. Expected one of {sorted(AGGREGATION_BACKENDS)}")
+    return AGGREGATION_BACKENDS[kind]()
+
+
+class MonthlyForecastAggregate:
+    """Monthly confirmed/tentative totals kept in sync with individual deals
+    
+    Each deal recognises a constant monthly amount over a run of months, so
+    the aggregate keeps per-month differences: adding, removing or updating
+    a deal costs O(1) however long its recognition window. Monthly totals
+    and window sums come from a lazily rebuilt list of constant segments
+    with prefix sums. Amounts are summed in the representation of the given
+    backend (Decimal by default).
+    """
+    
+    def __init__(self, backend: Optional[AggregationBackend] = None):
+        self.backend = backend or DecimalBackend()
+        self._recognitions: Dict[Hashable, List[Recognition]] = {}
+        # month index -> change in {"confirmed", "tentative", "deals"} from the month before
+        self._deltas: Dict[int, Dict[str, Any]] = {}
+        # (segment starts, segments, prefix sums per tier)
+        self._segments: Optional[Tuple[List[int], List[Tuple[int, int, Amount, Amount]], Dict[str, List[Amount]]]] = None
+    
+    def __len__(self) -> int:
+        """Number of deals in the aggregate"""
+        return len(self._recognitions)
+    
+    def _shift(self, index: int, tier: str, amount: Amount, deals: int) -> None:
+        delta = self._deltas.get(index)
+        if delta is None:
+            zero = self.backend.zero
+            delta = self._deltas[index] = {"confirmed": zero, "tentative": zero, "deals": 0}
+        delta[tier] += amount
+        delta["deals"] += deals
+        if delta["deals"] == 0 and not delta["confirmed"] and not delta["tentative"]:
+            del self._deltas[index]
+    
+    def _apply(self, recognitions: List[Recognition], sign: int) -> None:
+        for first, last, tier, amount in recognitions:
+            self._shift(first, tier, sign * amount, sign)
+            self._shift(last + 1, tier, -sign * amount, -sign)
+        self._segments = None
+    
+    def add_deal(self, deal_id: Hashable, recognitions: List[Recognition]) -> None:
+        """Add or replace a deal's recognitions without reporting months (bulk loads)"""
+        recognitions = [r for r in recognitions if r[0] <= r[1]]
+        self._apply(self._recognitions.pop(deal_id, []), -1)
+        self._apply(recognitions, 1)
+        self._recognitions[deal_id] = recognitions
+    
+    @staticmethod
+    def _months_of(recognitions: List[Recognition]) -> set:
+        return {index for first, last, _, _ in recognitions for index in range(first, last + 1)}
+    
+    def upsert_deal(self, deal_id: Hashable, recognitions: List[Recognition]) -> List[date]:
+        """Add or replace a deal's recognitions; returns the months touched"""
+        previous = self._recognitions.get(deal_id, [])
+        self.add_deal(deal_id, recognitions)
+        touched = self._months_of(previous) | self._months_of(self._recognitions[deal_id])
+        return [month_from_index(i) for i in sorted(touched)]
+    
+    def remove_deal(self, deal_id: Hashable) -> List[date]:
+        """Remove a deal; returns the months touched"""
+        previous = self._recognitions.pop(deal_id, [])
+        self._apply(previous, -1)
+        return [month_from_index(i) for i in sorted(self._months_of(previous))]
+    
+    def _build_segments(self) -> Tuple[List[int], List[Tuple[int, int, Amount, Amount]], Dict[str, List[Amount]]]:
+        if self._segments is None:
+            zero = self.backend.zero
+            starts: List[int] = []
+            segments: List[Tuple[int, int, Amount, Amount]] = []
+            sums = {tier: [zero] for tier in TIERS}
+            confirmed, tentative, deals = zero, zero, 0
+            indices = sorted(self._deltas)
+            for index, next_index in zip(indices, indices[1:]):
+                delta = self._deltas[index]
+                confirmed += delta["confirmed"]
+                tentative += delta["tentative"]
+                deals += delta["deals"]
+                if deals:
+                    # Months [index, next_index) all carry the same totals
+                    starts.append(index)
+                    segments.append((index, next_index, confirmed, tentative))
+                    length = next_index - index
+                    sums["confirmed"].append(sums["confirmed"][-1] + length * confirmed)
+                    sums["tentative"].append(sums["tentative"][-1] + length * tentative)
+            self._segments = (starts, segments, sums)
+        return self._segments
+    
+    def _cumulative(self, index: int, tier: str) -> Amount:
+        """Sum of a tier over all months before `index`"""
+        starts, segments, sums = self._build_segments()
+        position = bisect_right(starts, index) - 1
+        if position < 0:
+            return self.backend.zero
+        start, end, confirmed, tentative = segments[position]
+        value = confirmed if tier == "confirmed" else tentative
+        return sums[tier][position] + min(index - start, end - start) * value
+    
+    def window(self, start_month: date, end_month: date) -> Dict[str, Any]:
+        """Monthly totals and summed tiers for months in [start_month, end_month]"""
+        starts, segments, _ = self._build_segments()
+        lo, last = window_bounds(start_month, end_month)
+        hi = max(last + 1, lo)
+        
+        months = []
+        for start, end, confirmed, tentative in segments[max(bisect_right(starts, lo) - 1, 0):bisect_left(starts, hi)]:
+            for index in range(max(start, lo), min(end, hi)):
+                months.append({
+                    "month": month_from_index(index),
+                    "confirmed": confirmed,
+                    "tentative": tentative,
+                    "total": confirmed + tentative
+                })
+        return {
+            "months": months,
+            "confirmed": self._cumulative(hi, "confirmed") - self._cumulative(lo, "confirmed"),
+            "tentative": self._cumulative(hi, "tentative") - self._cumulative(lo, "tentative")
+        }
@@ -1,16 +1,93 @@
 """
 Forecast computation service
 """
+import asyncio
+import heapq
 from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Awaitable
 from app.strapi_client import StrapiClient
+from app.forecast_aggregate import (
+    AggregationBackend, DecimalBackend, MonthlyForecastAggregate, Recognition, make_aggregation_backend
+)
+from app.month_index import month_from_index, month_index, window_bounds
+from app.records import DealRecord, billing_records, sale_records
+from app.single_flight import SingleFlight, coalesced
+from app.replica_store import ReplicaStore, SALES_COLLECTIONS, BILLING_COLLECTIONS
+from app.strapi_query import StrapiQuery
+
+# Deal attributes each computation reads; only these are requested from Strapi
+FORECAST_DEAL_FIELDS = ("deal_value", "probability", "recognition_start_month", "recognition_end_month")
+HEATMAP_DEAL_FIELDS = ("name", "stage", "deal_value", "probability", "last_activity_at")
 
 
 class ForecastService:
-    def __init__(self, strapi_client: StrapiClient):
+    def __init__(
+        self,
+        strapi_client: StrapiClient,
+        replica: Optional[ReplicaStore] = None,
+        aggregation_backend: str = "decimal"
+    ):
         self.strapi = strapi_client
+        self.replica = replica
+        # Number representation for base forecast aggregation ("decimal", "float" or "fixed")
+        self.aggregation_backend = make_aggregation_backend(aggregation_backend)
+        self._aggregate: Optional[MonthlyForecastAggregate] = None
+        # Concurrent identical computations share one execution
+        self.single_flight = SingleFlight()
+    
+    def _serves_locally(self, *collections: str) -> bool:
+        return self.replica is not None and all(self.replica.is_synced(c) for c in collections)
+    
+    async def _iter_replica(self, collection: str, query: StrapiQuery) -> AsyncIterator[Dict[str, Any]]:
+        # Equality filters run in SQLite; the remaining conditions are checked per entry
+        for entry in self.replica.iter_entries(collection, query.equalities()):
+            if query.matches(entry):
+                yield entry
+    
+    def _iter_pipeline_deals(
+        self,
+        query: StrapiQuery,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream pipeline deals matching the query from the replica once synced, otherwise from Strapi"""
+        if self._serves_locally("pipeline-deals"):
+            return self._iter_replica("pipeline-deals", query)
+        return self.strapi.iter_pipeline_deals(query=query, page_size=page_size)
+    
+    async def _has_active_deals(self) -> bool:
+        deals = self._iter_pipeline_deals(StrapiQuery().eq("status", "active").fields("status"), page_size=1)
+        try:
+            await anext(deals)
+            return True
+        except Exception:
+            # StopAsyncIteration, or Strapi not available
+            return False
+        finally:
+            await deals.aclose()
+    
+    async def _get_branches(
+        self,
+        collections: Dict[str, str],
+        fetch_remote: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """All-branch data in the StrapiClient.get_all_* shape, from the replica when synced"""
+        if not self._serves_locally(*collections.values()):
+            return await fetch_remote()
+        result: Dict[str, Any] = {
+            name: self.replica.entries(collection) for name, collection in collections.items()
+        }
+        result["total"] = [entry for name in collections for entry in result[name]]
+        result["errors"] = {}
+        return result
     
+    async def get_all_sales(self) -> Dict[str, Any]:
+        return await self._get_branches(SALES_COLLECTIONS, self.strapi.get_all_sales)
+    
+    async def get_all_billings(self) -> Dict[str, Any]:
+        return await self._get_branches(BILLING_COLLECTIONS, self.strapi.get_all_billings)
+    
+    @coalesced
     async def compute_base_forecast(
         self,
         start_month: Optional[date] = None,
@@ -23,97 +100,35 @@ class ForecastService:
         if not end_month:
             end_month = (start_month + timedelta(days=365)).replace(day=1)
         
-        # Fetch all active pipeline deals
-        try:
-            deals = await self.strapi.get_pipeline_deals(
-                filters={"status": "active"},
-                populate="project"
-            )
-        except Exception as e:
-            # If Strapi is not available or content types not registered, return empty forecast
-            deals = []
-        
-        # Fetch existing forecast snapshots for base scenario
-        try:
-            snapshots = await self.strapi.get_forecast_snapshots(
-                filters={"scenario": "base"}
-            )
-        except Exception:
-            snapshots = []
-        
-        # Group by month and compute totals
-        monthly_totals = {}
-        total_confirmed = Decimal(0)
-        total_tentative = Decimal(0)
+        aggregate = await self._base_aggregate()
         
         # If no pipeline deals, fallback to sales-based forecast
-        if not deals:
+        if aggregate is None:
             return await self.compute_sales_based_forecast(start_month, end_month, currency)
         
-        for deal in deals:
-            deal_attrs = deal.get("attributes", {})
-            deal_value = Decimal(str(deal_attrs.get("deal_value", 0)))
-            probability = Decimal(str(deal_attrs.get("probability", 0))) / 100
-            
-            # Determine recognition months
-            rec_start = deal_attrs.get("recognition_start_month")
-            rec_end = deal_attrs.get("recognition_end_month")
-            
-            if rec_start and rec_end:
-                # For now, distribute evenly across months
-                # In production, this would use milestone-based recognition
-                expected_amount = deal_value * probability
-                
-                # Simple distribution (in production, use actual milestone dates)
-                current_month = datetime.strptime(rec_start, "%Y-%m-%d").date().replace(day=1)
-                end_month_date = datetime.strptime(rec_end, "%Y-%m-%d").date().replace(day=1)
-                
-                months = []
-                while current_month <= end_month_date:
-                    months.append(current_month)
-                    if current_month.month == 12:
-                        current_month = current_month.replace(year=current_month.year + 1, month=1)
-                    else:
-                        current_month = current_month.replace(month=current_month.month + 1)
-                
-                monthly_amount = expected_amount / len(months) if months else expected_amount
-                
-                for month in months:
-                    if start_month <= month <= end_month:
-                        if month not in monthly_totals:
-                            monthly_totals[month] = {
-                                "confirmed": Decimal(0),
-                                "tentative": Decimal(0),
-                                "total": Decimal(0)
-                            }
-                        
-                        if probability >= Decimal("0.75"):
-                            monthly_totals[month]["confirmed"] += monthly_amount
-                            total_confirmed += monthly_amount
-                        else:
-                            monthly_totals[month]["tentative"] += monthly_amount
-                            total_tentative += monthly_amount
-                        
-                        monthly_totals[month]["total"] += monthly_amount
+        # Prefix-sum range query over the months in the window
+        window = aggregate.window(start_month, end_month)
+        total_confirmed = window["confirmed"]
+        total_tentative = window["tentative"]
         
-        # Format monthly totals
+        # Format monthly totals; amounts become floats only here
+        to_float = aggregate.backend.to_float
         formatted_monthly = []
-        for month in sorted(monthly_totals.keys()):
-            totals = monthly_totals[month]
+        for totals in window["months"]:
             formatted_monthly.append({
-                "month": month.isoformat(),
-                "confirmed": float(totals["confirmed"]),
-                "tentative": float(totals["tentative"]),
-                "total": float(totals["total"]),
+                "month": totals["month"].isoformat(),
+                "confirmed": to_float(totals["confirmed"]),
+                "tentative": to_float(totals["tentative"]),
+                "total": to_float(totals["total"]),
                 "confidence_tiers": {
-                    "high": float(totals["confirmed"]),
-                    "medium": float(totals["tentative"] * Decimal("0.75")),
-                    "low": float(totals["tentative"] * Decimal("0.25"))
+                    "high": to_float(totals["confirmed"]),
+                    "medium": to_float(totals["tentative"], Decimal("0.75")),
+                    "low": to_float(totals["tentative"], Decimal("0.25"))
                 }
             })
         
         total_forecast = total_confirmed + total_tentative
-        conversion_rate = total_confirmed / total_forecast if total_forecast > 0 else Decimal(0)
+        conversion_rate = aggregate.backend.ratio(total_confirmed, total_forecast)
         
         return {
             "forecast": {
@@ -122,16 +137,161 @@ class ForecastService:
                 "currency": currency,
                 "monthly_totals": formatted_monthly,
                 "summary": {
-                    "total_confirmed": float(total_confirmed),
-                    "total_tentative": float(total_tentative),
-                    "total_forecast": float(total_forecast),
-                    "conversion_rate": float(conversion_rate)
+                    "total_confirmed": to_float(total_confirmed),
+                    "total_tentative": to_float(total_tentative),
+                    "total_forecast": to_float(total_forecast),
+                    "conversion_rate": conversion_rate
                 }
             },
             "generated_at": datetime.utcnow().isoformat(),
             "model_version": "1.0.0"
         }
     
+    @staticmethod
+    def _deal_contributions(
+        deal: DealRecord,
+        backend: Optional[AggregationBackend] = None
+    ) -> List[Recognition]:
+        """Recognised amounts of one deal as [(first_index, last_index, tier, monthly_amount)]"""
+        # Simple distribution (in production, use actual milestone dates)
+        if deal.recognition is None:
+            return []
+        first, last = deal.recognition
+        
+        # For now, distribute evenly across months
+        # In production, this would use milestone-based recognition
+        tier, monthly_amount = (backend or DecimalBackend()).monthly_amount(
+            deal.deal_value,
+            deal.probability or 0,
+            last - first + 1
+        )
+        return [(first, last, tier, monthly_amount)]
+    
+    async def _base_aggregate(self) -> Optional[MonthlyForecastAggregate]:
+        """Per-deal monthly aggregate over all active deals, or None when there are no deals
+        
+        An aggregate built from the replica is kept and patched by
+        apply_deal_change, so later requests skip the walk over every deal.
+        """
+        if self._aggregate is not None:
+            return self._aggregate if len(self._aggregate) else None
+        
+        cacheable = self._serves_locally("pipeline-deals")
+        aggregate = MonthlyForecastAggregate(self.aggregation_backend)
+        
+        # Stream all active pipeline deals page by page
+        deals = self._iter_pipeline_deals(
+            StrapiQuery().eq("status", "active").fields(*FORECAST_DEAL_FIELDS)
+        )
+        deal_count = 0
+        while True:
+            try:
+                deal = await anext(deals)
+            except StopAsyncIteration:
+                break
+            except Exception:
+                # If Strapi is not available or content types not registered, treat as no deals
+                return None
+            deal_count += 1
+            deal_id = deal.get("id")
+            aggregate.add_deal(
+                deal_id if deal_id is not None else ("anonymous", deal_count),
+                self._deal_contributions(DealRecord.from_entry(deal), self.aggregation_backend)
+            )
+        
+        if cacheable:
+            self._aggregate = aggregate
+        return aggregate if deal_count else None
+    
+    def invalidate_forecast_cache(self) -> None:
+        """Drop cached forecast aggregates (e.g. after a replica sync)"""
+        self._aggregate = None
+    
+    def apply_deal_change(
+        self,
+        deal_id: Any,
+        deal_attrs: Optional[Dict[str, Any]]
+    ) -> Optional[List[date]]:
+        """Patch the cached aggregate for one deal; returns the months touched
+        
+        Pass None as deal_attrs for a deleted deal. Returns None when no
+        aggregate is cached (the next forecast request builds a fresh one).
+        """
+        if self._aggregate is None:
+            return None
+        if not deal_attrs or deal_attrs.get("status") != "active":
+            return self._aggregate.remove_deal(deal_id)
+        return self._aggregate.upsert_deal(
+            deal_id,
+            self._deal_contributions(DealRecord.from_attributes(deal_id, deal_attrs), self.aggregation_backend)
+        )
+    
+    async def recompute_snapshots(
+        self,
+        snapshot_id_prefix: str,
+        write_snapshots: bool = True,
+        scenario_overrides: Optional[Dict[str, Any]] = None,
+        batch_size: int = 100,
+        progress: Optional[Callable[..., None]] = None
+    ) -> Dict[str, int]:
+        """Compute per-deal, per-month forecast snapshots and write them to Strapi in batches
+        
+        Active deals are streamed and snapshots are flushed every `batch_size`,
+        so memory stays bounded by one batch. `scenario_overrides` of the form
+        {"deal_id": 1, "probability_override": 0.8} replaces that deal's
+        probability. `progress` is called with the running counters after
+        each deal.
+        """
+        backend = self.aggregation_backend
+        snapshot_date = date.today().isoformat()
+        override_id = (scenario_overrides or {}).get("deal_id")
+        override_probability = (scenario_overrides or {}).get("probability_override")
+        
+        counts = {"deals_processed": 0, "snapshots_computed": 0, "snapshots_created": 0, "snapshots_failed": 0}
+        batch: List[Dict[str, Any]] = []
+        
+        async def flush() -> None:
+            if write_snapshots and batch:
+                result = await self.strapi.bulk_create_snapshots(batch)
+                counts["snapshots_created"] += result["created"]
+                counts["snapshots_failed"] += result["failed"]
+            batch.clear()
+        
+        query = StrapiQuery().eq("status", "active").fields(*FORECAST_DEAL_FIELDS)
+        async for deal in self._iter_pipeline_deals(query):
+            record = DealRecord.from_entry(deal)
+            deal_id = record.id
+            if override_probability is not None and deal_id == override_id:
+                record = record.with_probability(float(override_probability) * 100)
+            
+            for first, last, _, monthly_amount in self._deal_contributions(record, backend):
+                expected_amount = backend.to_float(monthly_amount)
+                for index in range(first, last + 1):
+                    month = month_from_index(index).isoformat()
+                    batch.append({
+                        "snapshot_id": f"{snapshot_id_prefix}-{deal_id}-{month[:7]}",
+                        "snapshot_date": snapshot_date,
+                        "scenario": "base",
+                        "probability": float(record.probability or 0),
+                        "expected_amount": expected_amount,
+                        "expected_month": month,
+                        "model_version": "1.0.0",
+                        "deal": deal_id
+                    })
+                    counts["snapshots_computed"] += 1
+                    if len(batch) >= batch_size:
+                        await flush()
+            
+            counts["deals_processed"] += 1
+            if progress:
+                progress(**counts)
+        
+        await flush()
+        if progress:
+            progress(**counts)
+        return counts
+    
+    @coalesced
     async def compute_risk_heatmap(
         self,
         group_by_stage: bool = True,
@@ -139,14 +299,17 @@ class ForecastService:
         min_deal_value: Optional[Decimal] = None
     ) -> Dict[str, Any]:
         """Compute risk heatmap from pipeline deals"""
-        try:
-            deals = await self.strapi.get_pipeline_deals(
-                filters={"status": "active"},
-                populate="project,risk_flags"
-            )
-        except Exception:
-            # If Strapi is not available, return empty heatmap
-            deals = []
+        # Value threshold and projection are applied by Strapi (or the replica query)
+        query = (
+            StrapiQuery()
+            .eq("status", "active")
+            .fields(*HEATMAP_DEAL_FIELDS)
+            .populate("risk_flags", ["id"])
+        )
+        if min_deal_value:
+            query.gte("deal_value", min_deal_value)
+        deals = self._iter_pipeline_deals(query)
+        deal_count = 0
         
         # Group deals by stage and probability buckets
         matrix = {}
@@ -158,23 +321,23 @@ class ForecastService:
         stages = ["prospecting", "qualification", "proposal", "negotiation", "closed-won"]
         prob_buckets = ["0-25%", "25-50%", "50-75%", "75-100%"]
         
-        # If no pipeline deals, fallback to sales-based risk analysis
-        if not deals:
-            return await self.compute_sales_based_risk_heatmap(
-                group_by_stage=group_by_stage,
-                group_by_probability=group_by_probability,
-                min_deal_value=min_deal_value
-            )
-        
-        for deal in deals:
-            deal_attrs = deal.get("attributes", {})
-            deal_value = Decimal(str(deal_attrs.get("deal_value", 0)))
+        # Stream deals page by page
+        while True:
+            try:
+                deal = await anext(deals)
+            except StopAsyncIteration:
+                break
+            except Exception:
+                # If Strapi is not available, treat as no deals
+                deal_count = 0
+                break
+            deal_count += 1
             
-            if min_deal_value and deal_value < min_deal_value:
-                continue
+            record = DealRecord.from_entry(deal)
+            deal_value = record.deal_value
             
-            stage = deal_attrs.get("stage", "prospecting")
-            probability = float(deal_attrs.get("probability", 0))
+            stage = record.stage or "prospecting"
+            probability = record.probability or Decimal(0)
             
             # Determine probability bucket
             if probability < 25:
@@ -204,25 +367,38 @@ class ForecastService:
             total_at_risk += at_risk
             
             # Calculate risk score
-            risk_score = (1 - probability / 100) * (deal_value / 1000000)  # Normalized
+            risk_score = float(at_risk / 1000000)  # Normalized
             if risk_score > 0.7:
                 high_risk_count += 1
             elif risk_score > 0.4:
                 medium_risk_count += 1
             
-            matrix[key]["deals"].append({
-                "deal_id": deal.get("id"),
-                "deal_name": deal_attrs.get("name", f"Deal {deal.get('id')}"),
-                "value": float(deal_value),
-                "probability": probability / 100
-            })
+            if len(matrix[key]["deals"]) < 10:  # Only the first 10 are reported
+                matrix[key]["deals"].append({
+                    "deal_id": record.id,
+                    "deal_name": record.name or f"Deal {record.id}",
+                    "value": float(deal_value),
+                    "probability": float(probability / 100)
+                })
             
             if risk_score > 0.6:
                 top_risks.append({
-                    "deal_id": deal.get("id"),
+                    "deal_id": record.id,
                     "risk_score": risk_score,
-                    "risk_factors": self._identify_risk_factors(deal_attrs)
+                    "risk_factors": self._identify_risk_factors(record)
                 })
+                if len(top_risks) >= 200:
+                    # Keep memory bounded; nlargest matches sort(reverse=True)[:20]
+                    top_risks = heapq.nlargest(20, top_risks, key=lambda x: x["risk_score"])
+        
+        # If no pipeline deals, fallback to sales-based risk analysis
+        # (active deals all below min_deal_value still give an empty heatmap)
+        if not deal_count and not (min_deal_value and await self._has_active_deals()):
+            return await self.compute_sales_based_risk_heatmap(
+                group_by_stage=group_by_stage,
+                group_by_probability=group_by_probability,
+                min_deal_value=min_deal_value
+            )
         
         # Format matrix as list
         formatted_matrix = []
@@ -257,23 +433,23 @@ class ForecastService:
             }
         }
     
-    def _identify_risk_factors(self, deal_attrs: Dict[str, Any]) -> List[str]:
+    def _identify_risk_factors(self, deal: DealRecord) -> List[str]:
         """Identify risk factors for a deal"""
         factors = []
-        probability = float(deal_attrs.get("probability", 0))
         
-        if probability < 50:
+        if (deal.probability or 0) < 50:
             factors.append("low_probability")
-        if deal_attrs.get("deal_value", 0) > 500000:
+        if deal.deal_value > 500000:
             factors.append("high_value")
-        if deal_attrs.get("last_activity_at"):
+        if deal.last_activity_at is not None:
             # Check if last activity is old
             factors.append("stale_activity")
-        if deal_attrs.get("risk_flags"):
+        if deal.risk_flag_count:
             factors.append("has_risk_flags")
         
         return factors
     
+    @coalesced
     async def compute_sales_based_forecast(
         self,
         start_month: Optional[date] = None,
@@ -287,12 +463,12 @@ class ForecastService:
             end_month = (start_month + timedelta(days=365)).replace(day=1)
         
         try:
-            # Fetch all sales data
-            all_sales = await self.strapi.get_all_sales()
-            sales_data = all_sales.get("total", [])
-            
-            # Fetch all billings data for cash flow projection
-            all_billings = await self.strapi.get_all_billings()
+            # Fetch all sales data, and billings for cash flow projection, concurrently
+            all_sales, all_billings = await asyncio.gather(
+                self.get_all_sales(),
+                self.get_all_billings()
+            )
+            sales_data = sale_records(all_sales.get("total", []))
             billings_data = all_billings.get("total", [])
         except Exception as e:
             print(f"Error fetching sales/billings data: {e}")
@@ -319,17 +495,17 @@ class ForecastService:
                 "data_source": "sales_billings"
             }
         
-        # Analyze historical sales patterns
+        # Analyze historical sales patterns; months are keyed by month index
         monthly_totals = {}
         total_confirmed = Decimal(0)
         total_tentative = Decimal(0)
+        first_month, last_month = window_bounds(start_month, end_month)
+        today = date.today()
         
         # Process sales data
         for sale in sales_data:
-            attrs = sale.get("attributes", sale)
-            sale_amount = Decimal(str(attrs.get("sale_amount", attrs.get("amount", 0))))
-            status = attrs.get("status", "Pending")
-            sale_date_str = attrs.get("sale_date") or attrs.get("createdAt")
+            sale_amount = sale.amount
+            status = sale.status
             
             if not sale_amount or sale_amount <= 0:
                 continue
@@ -342,17 +518,8 @@ class ForecastService:
             else:
                 probability = Decimal("0.25")  # 25% for other statuses
             
-            # Parse sale date
-            if sale_date_str:
-                try:
-                    if isinstance(sale_date_str, str):
-                        sale_date = datetime.fromisoformat(sale_date_str.replace('Z', '+00:00')).date()
-                    else:
-                        sale_date = sale_date_str
-                except:
-                    sale_date = date.today()
-            else:
-                sale_date = date.today()
+            # Undated sales (or unparsable dates) count as today
+            sale_date = sale.sale_date or today
             
             # Project future revenue based on historical patterns
             # For confirmed sales, distribute over next 6-12 months
@@ -364,96 +531,65 @@ class ForecastService:
                 months_to_project = 12  # Confirmed sales over 12 months
             
             # Start from next month if sale is recent, or from sale date if future
-            if sale_date <= date.today():
-                projection_start = (date.today() + timedelta(days=30)).replace(day=1)
+            if sale_date <= today:
+                projection_start = month_index(today + timedelta(days=30))
             else:
-                projection_start = sale_date.replace(day=1)
+                projection_start = month_index(sale_date)
             
             # Distribute sale amount across months
             monthly_amount = sale_amount * probability / Decimal(str(months_to_project))
-            
-            current_month = projection_start
-            months_added = 0
-            
-            while months_added < months_to_project and current_month <= end_month:
-                if current_month >= start_month:
-                    if current_month not in monthly_totals:
-                        monthly_totals[current_month] = {
-                            "confirmed": Decimal(0),
-                            "tentative": Decimal(0),
-                            "total": Decimal(0)
-                        }
-                    
-                    if probability >= Decimal("0.75"):
-                        monthly_totals[current_month]["confirmed"] += monthly_amount
-                        total_confirmed += monthly_amount
-                    else:
-                        monthly_totals[current_month]["tentative"] += monthly_amount
-                        total_tentative += monthly_amount
-                    
-                    monthly_totals[current_month]["total"] += monthly_amount
-                    months_added += 1
+            tier = "confirmed" if probability >= Decimal("0.75") else "tentative"
+            
+            # The first months_to_project months from the projection start that fall in the window
+            projection_first = max(projection_start, first_month)
+            for index in range(projection_first, min(projection_first + months_to_project - 1, last_month) + 1):
+                if index not in monthly_totals:
+                    monthly_totals[index] = {
+                        "confirmed": Decimal(0),
+                        "tentative": Decimal(0),
+                        "total": Decimal(0)
+                    }
                 
-                # Move to next month
-                if current_month.month == 12:
-                    current_month = current_month.replace(year=current_month.year + 1, month=1)
+                monthly_totals[index][tier] += monthly_amount
+                monthly_totals[index]["total"] += monthly_amount
+                if tier == "confirmed":
+                    total_confirmed += monthly_amount
                 else:
-                    current_month = current_month.replace(month=current_month.month + 1)
+                    total_tentative += monthly_amount
         
         # Add trend projection based on historical average
         if sales_data:
             # Calculate average monthly sales from last 6 months
-            today = date.today()
             six_months_ago = (today - timedelta(days=180)).replace(day=1)
             
-            historical_sales = []
-            for sale in sales_data:
-                attrs = sale.get("attributes", sale)
-                sale_date_str = attrs.get("sale_date") or attrs.get("createdAt")
-                sale_amount = Decimal(str(attrs.get("sale_amount", attrs.get("amount", 0))))
-                
-                if sale_date_str and sale_amount > 0:
-                    try:
-                        if isinstance(sale_date_str, str):
-                            sale_date = datetime.fromisoformat(sale_date_str.replace('Z', '+00:00')).date()
-                        else:
-                            sale_date = sale_date_str
-                        
-                        if six_months_ago <= sale_date <= today:
-                            historical_sales.append(sale_amount)
-                    except:
-                        pass
+            historical_sales = [
+                sale.amount for sale in sales_data
+                if sale.sale_date and sale.amount > 0 and six_months_ago <= sale.sale_date <= today
+            ]
             
             if historical_sales:
                 avg_monthly_sales = sum(historical_sales) / Decimal(str(len(historical_sales))) / Decimal("6")
                 
                 # Project average trend for remaining months
-                current_month = date.today().replace(day=1)
-                while current_month <= end_month:
-                    if current_month not in monthly_totals:
-                        monthly_totals[current_month] = {
+                for index in range(month_index(today), last_month + 1):
+                    if index not in monthly_totals:
+                        monthly_totals[index] = {
                             "confirmed": Decimal(0),
                             "tentative": Decimal(0),
                             "total": Decimal(0)
                         }
                     
                     # Add trend projection as tentative
-                    monthly_totals[current_month]["tentative"] += avg_monthly_sales * Decimal("0.3")  # 30% of average
-                    monthly_totals[current_month]["total"] += avg_monthly_sales * Decimal("0.3")
+                    monthly_totals[index]["tentative"] += avg_monthly_sales * Decimal("0.3")  # 30% of average
+                    monthly_totals[index]["total"] += avg_monthly_sales * Decimal("0.3")
                     total_tentative += avg_monthly_sales * Decimal("0.3")
-                    
-                    # Move to next month
-                    if current_month.month == 12:
-                        current_month = current_month.replace(year=current_month.year + 1, month=1)
-                    else:
-                        current_month = current_month.replace(month=current_month.month + 1)
         
         # Format monthly totals
         formatted_monthly = []
-        for month in sorted(monthly_totals.keys()):
-            totals = monthly_totals[month]
+        for index in sorted(monthly_totals.keys()):
+            totals = monthly_totals[index]
             formatted_monthly.append({
-                "month": month.isoformat(),
+                "month": month_from_index(index).isoformat(),
                 "confirmed": float(totals["confirmed"]),
                 "tentative": float(totals["tentative"]),
                 "total": float(totals["total"]),
@@ -485,6 +621,7 @@ class ForecastService:
             "data_source": "sales_billings"
         }
     
+    @coalesced
     async def compute_billings_cashflow_forecast(
         self,
         start_month: Optional[date] = None,
@@ -497,70 +634,50 @@ class ForecastService:
             end_month = (start_month + timedelta(days=365)).replace(day=1)
         
         try:
-            all_billings = await self.strapi.get_all_billings()
+            all_billings = await self.get_all_billings()
             billings_data = all_billings.get("total", [])
         except Exception as e:
             print(f"Error fetching billings data: {e}")
             billings_data = []
         
+        # Months are keyed by month index
         monthly_cashflow = {}
+        first_month, last_month = window_bounds(start_month, end_month)
         
-        for billing in billings_data:
-            attrs = billing.get("attributes", billing)
-            amount = Decimal(str(attrs.get("amount", 0)))
-            
-            # Get invoice date and collected date
-            invoice_date_str = attrs.get("invoice_date")
-            collected_date_str = attrs.get("collected_date")
+        for billing in billing_records(billings_data):
+            amount = billing.amount
             
-            # Use month/year if available
-            billing_month = attrs.get("month")
-            billing_year = attrs.get("year")
-            
-            if billing_month and billing_year:
-                try:
-                    billing_date = date(int(billing_year), int(billing_month), 1)
-                except:
-                    billing_date = None
-            else:
-                billing_date = None
-            
-            if invoice_date_str:
-                try:
-                    if isinstance(invoice_date_str, str):
-                        billing_date = datetime.fromisoformat(invoice_date_str.replace('Z', '+00:00')).date().replace(day=1)
-                except:
-                    pass
-            
-            if not billing_date:
+            # Billing month from the invoice date, else the month/year fields
+            billing_index = billing.month_index
+            if billing_index is None:
                 continue
             
-            if start_month <= billing_date <= end_month:
-                if billing_date not in monthly_cashflow:
-                    monthly_cashflow[billing_date] = {
+            if first_month <= billing_index <= last_month:
+                if billing_index not in monthly_cashflow:
+                    monthly_cashflow[billing_index] = {
                         "inflow": Decimal(0),
                         "outflow": Decimal(0),
                         "net": Decimal(0)
                     }
                 
                 # If collected, it's inflow; if just invoiced, it's projected inflow
-                if collected_date_str:
-                    monthly_cashflow[billing_date]["inflow"] += amount
+                if billing.collected:
+                    monthly_cashflow[billing_index]["inflow"] += amount
                 else:
                     # Projected inflow (80% collection rate assumption)
-                    monthly_cashflow[billing_date]["inflow"] += amount * Decimal("0.8")
+                    monthly_cashflow[billing_index]["inflow"] += amount * Decimal("0.8")
                 
-                monthly_cashflow[billing_date]["net"] = (
-                    monthly_cashflow[billing_date]["inflow"] - 
-                    monthly_cashflow[billing_date]["outflow"]
+                monthly_cashflow[billing_index]["net"] = (
+                    monthly_cashflow[billing_index]["inflow"] - 
+                    monthly_cashflow[billing_index]["outflow"]
                 )
         
         # Format monthly cashflow
         formatted_monthly = []
-        for month in sorted(monthly_cashflow.keys()):
-            cf = monthly_cashflow[month]
+        for index in sorted(monthly_cashflow.keys()):
+            cf = monthly_cashflow[index]
             formatted_monthly.append({
-                "month": month.isoformat(),
+                "month": month_from_index(index).isoformat(),
                 "inflow": float(cf["inflow"]),
                 "outflow": float(cf["outflow"]),
                 "net": float(cf["net"])
@@ -580,6 +697,7 @@ class ForecastService:
             "generated_at": datetime.utcnow().isoformat()
         }
     
+    @coalesced
     async def compute_sales_based_risk_heatmap(
         self,
         group_by_stage: bool = True,
@@ -588,7 +706,7 @@ class ForecastService:
     ) -> Dict[str, Any]:
         """Compute risk heatmap from sales data (fallback when no pipeline deals)"""
         try:
-            all_sales = await self.strapi.get_all_sales()
+            all_sales = await self.get_all_sales()
             sales_data = all_sales.get("total", [])
         except Exception as e:
             print(f"Error fetching sales data for risk analysis: {e}")
@@ -618,10 +736,9 @@ class ForecastService:
         high_risk_count = 0
         medium_risk_count = 0
         
-        for sale in sales_data:
-            attrs = sale.get("attributes", sale)
-            sale_amount = Decimal(str(attrs.get("sale_amount", attrs.get("amount", 0))))
-            status = attrs.get("status", "Pending").lower()
+        for sale in sale_records(sales_data):
+            sale_amount = sale.amount
+            status = sale.status.lower()
             
             if min_deal_value and sale_amount < min_deal_value:
                 continue
@@ -671,12 +788,9 @@ class ForecastService:
             elif risk_score > 0.4:
                 medium_risk_count += 1
             
-            sale_id = sale.get("id") or sale.get("documentId", "unknown")
-            client_name = attrs.get("client") or attrs.get("customer", "Unknown")
-            
             matrix[key]["deals"].append({
-                "deal_id": sale_id,
-                "deal_name": f"{client_name} - {sale_amount}",
+                "deal_id": sale.id,
+                "deal_name": f"{sale.client} - {sale_amount}",
                 "value": float(sale_amount),
                 "probability": probability / 100
             })
@@ -691,7 +805,7 @@ class ForecastService:
                     risk_factors.append("pending_status")
                 
                 top_risks.append({
-                    "deal_id": sale_id,
+                    "deal_id": sale.id,
                     "risk_score": risk_score,
                     "risk_factors": risk_factors
                 })
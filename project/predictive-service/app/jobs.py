@@ -0,0 +1,172 @@
+"""
+In-process background job queue for long-running recomputes
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+
+class Job:
+    """A queued unit of work with progress and timing"""
+    
+    def __init__(self, kind: str, params: Dict[str, Any], run: Callable[["Job"], Awaitable[Dict[str, Any]]]):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.completed_at: Optional[datetime] = None
+        self.execution_time_ms: Optional[int] = None
+        self._run = run
+    
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+    
+    def update_progress(self, **progress: Any) -> None:
+        """Record progress counters reported by the running job"""
+        self.progress.update(progress)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "execution_time_ms": self.execution_time_ms
+        }
+
+
+class JobQueue:
+    """Bounded FIFO of jobs drained by a fixed number of asyncio workers
+    
+    Workers are started on the running event loop with the first job, so
+    requests only enqueue and return. Finished jobs are kept for status
+    queries up to `history_size`, oldest first out.
+    """
+    
+    def __init__(self, workers: int = 1, max_queued: int = 100, history_size: int = 200):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.history_size = history_size
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+    
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        """Create a queue sized by JOB_WORKERS, JOB_QUEUE_SIZE and JOB_HISTORY_SIZE"""
+        return cls(
+            workers=int(os.getenv("JOB_WORKERS", "1")),
+            max_queued=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+            history_size=int(os.getenv("JOB_HISTORY_SIZE", "200"))
+        )
+    
+    def _ensure_workers(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or not self._tasks or self._tasks[0].get_loop() is not loop:
+            # Jobs queued on a loop that has since stopped can no longer run
+            for job in self._jobs.values():
+                if job.active:
+                    self._finish(job, error="Interrupted before completion")
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        return self._queue
+    
+    def submit(
+        self,
+        kind: str,
+        run: Callable[[Job], Awaitable[Dict[str, Any]]],
+        params: Optional[Dict[str, Any]] = None
+    ) -> Job:
+        """Queue a job; raises asyncio.QueueFull when the backlog is full"""
+        queue = self._ensure_workers()
+        job = Job(kind, params or {}, run)
+        queue.put_nowait(job)
+        self._jobs[job.id] = job
+        self._trim_history()
+        return job
+    
+    def find_active(self, kind: str, params: Dict[str, Any]) -> Optional[Job]:
+        """A queued or running job of the same kind and parameters, if any"""
+        for job in self._jobs.values():
+            if job.active and job.kind == kind and job.params == params:
+                return job
+        return None
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+    
+    def _finish(self, job: Job, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        job.completed_at = datetime.utcnow()
+        job.status = "failed" if error else "completed"
+        job.result = result
+        job.error = error
+    
+    def _trim_history(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+    
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            start = time.perf_counter()
+            try:
+                self._finish(job, result=await job._run(job))
+            except asyncio.CancelledError:
+                self._finish(job, error="Cancelled")
+                raise
+            except Exception as e:
+                logger.exception(f"Job {job.id} ({job.kind}) failed")
+                self._finish(job, error=str(e))
+            finally:
+                job.execution_time_ms = int((time.perf_counter() - start) * 1000)
+                self._queue.task_done()
+    
+    async def join(self) -> None:
+        """Wait until every queued job has finished"""
+        if self._queue is not None:
+            await self._queue.join()
+    
+    async def stop(self) -> None:
+        """Cancel the workers; running and still queued jobs are marked failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        for job in self._jobs.values():
+            if job.active:
+                self._finish(job, error="Stopped before completion")
+    
+    def stats(self) -> Dict[str, Any]:
+        counts = {status: 0 for status in JOB_STATUSES}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "jobs": counts
+        }
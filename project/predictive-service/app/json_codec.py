@@ -0,0 +1,132 @@
+"""
+JSON encoding/decoding with optional orjson or msgspec acceleration
+"""
+import json
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the environment
+    msgspec = None
+
+
+def _default(value: Any) -> Any:
+    """Encode types JSON has no native form for, the way FastAPI's jsonable_encoder does"""
+    if isinstance(value, Decimal):
+        # Whole numbers stay integers, anything else becomes a float
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JSONCodec:
+    """Standard library JSON: compact separators, UTF-8 output"""
+    
+    name = "stdlib"
+    
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+    
+    def loads(self, data: Any) -> Any:
+        """Decode bytes or str; invalid input raises ValueError"""
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson: native datetime, date and numpy array support"""
+    
+    name = "orjson"
+    
+    def __init__(self):
+        if orjson is None:
+            raise ValueError("orjson is not installed")
+    
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    
+    def loads(self, data: Any) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    """msgspec: native datetime and date support"""
+    
+    name = "msgspec"
+    
+    def __init__(self):
+        if msgspec is None:
+            raise ValueError("msgspec is not installed")
+        self._encoder = msgspec.json.Encoder(enc_hook=_default, decimal_format="number")
+        self._decoder = msgspec.json.Decoder()
+    
+    def dumps(self, value: Any) -> bytes:
+        return self._encoder.encode(value)
+    
+    def loads(self, data: Any) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+JSON_CODECS: Dict[str, Callable[[], JSONCodec]] = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "stdlib": JSONCodec
+}
+
+
+def make_json_codec(kind: str = "auto") -> JSONCodec:
+    """Create a codec by name; "auto" picks orjson, then msgspec, then the standard library"""
+    if kind == "auto":
+        kind = "orjson" if orjson is not None else "msgspec" if msgspec is not None else "stdlib"
+    try:
+        factory = JSON_CODECS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown JSON codec: {kind} (expected one of {', '.join(JSON_CODECS)} or auto)")
+    return factory()
+
+
+# Process-wide codec, chosen by JSON_CODEC (default auto)
+codec = make_json_codec(os.getenv("JSON_CODEC", "auto"))
+
+
+def dumps(value: Any) -> bytes:
+    return codec.dumps(value)
+
+
+def loads(data: Any) -> Any:
+    return codec.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the process-wide codec
+    
+    As the app's default_response_class this only replaces rendering:
+    FastAPI still runs jsonable_encoder on a route's return value first.
+    Routes that build and return a FastJSONResponse themselves skip that
+    pass, and Decimals, dates and numpy values are encoded by the codec.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
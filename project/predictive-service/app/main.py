@@ -1,15 +1,44 @@
-from fastapi import FastAPI, HTTPException, Query, Path, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Path, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 from datetime import date, datetime
-from typing import Optional
+from decimal import Decimal
+from typing import Any, Dict, Literal, Optional
+import asyncio
+import json
 import os
 import time
 
 from app.strapi_client import StrapiClient
 from app.forecast_service import ForecastService
+from app.response_cache import ResponseCache
+from app.jobs import Job, JobQueue
+from app.replica_store import ReplicaStore, REPLICATED_COLLECTIONS, SALES_COLLECTIONS, BILLING_COLLECTIONS
 from app.probability_model import ProbabilityModel
-from app.monte_carlo import MonteCarloSimulation
+from app.deal_table import DealTable, DEAL_TABLE_FIELDS, DEAL_TABLE_RELATIONS
+from app.monte_carlo import MonteCarloSimulation, SIMULATION_FIELDS
+from app.strapi_query import StrapiQuery
+from app.json_codec import FastJSONResponse
+from app.streaming import FLUSH, STREAM_MEDIA_TYPES, json_document_stream, ndjson_stream
+from app.columnar_export import (
+    EXPORT_MEDIA_TYPES,
+    RECORD_BATCH_ROWS,
+    ExportUnavailableError,
+    billings_batch,
+    billings_schema,
+    deal_table_to_arrow,
+    forecast_to_arrow,
+    iter_table,
+    require_pyarrow,
+    sales_batch,
+    sales_schema,
+    sample_paths_to_arrow,
+    stream_batches
+)
+from app.records import BillingRecord, SaleRecord
 from app.model_calibration import ModelCalibration
 from app.webhook_handler import WebhookHandler
 from app.retry_logic import retry_async, RetryConfig, CircuitBreaker
@@ -19,6 +48,7 @@ from app.models import (
     ForecastRunResponse,
     ScenarioRequest,
     MonteCarloRequest,
+    SimulationExportRequest,
     StrapiSyncRequest,
     StrapiSyncResponse
 )
@@ -27,12 +57,24 @@ from app.models import (
 load_dotenv('.env.local')
 load_dotenv()  # Fallback to .env if .env.local doesn't exist
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop background job workers, then release pooled Strapi connections and simulation workers
+    await job_queue.stop()
+    await strapi_client.aclose()
+    monte_carlo.close()
+
+
 app = FastAPI(
     title="Double V Predictive Service",
     version="1.0.0",
     description="API for revenue forecasting and risk analytics",
     docs_url="/api/v1/docs",
-    redoc_url="/api/v1/redoc"
+    redoc_url="/api/v1/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -47,9 +89,20 @@ app.add_middleware(
 
 # Initialize services
 strapi_client = StrapiClient()
-forecast_service = ForecastService(strapi_client)
+replica_store = ReplicaStore.from_env()
+forecast_service = ForecastService(
+    strapi_client,
+    replica_store,
+    aggregation_backend=os.getenv("FORECAST_AGGREGATION_BACKEND", "decimal")
+)
+response_cache = ResponseCache.from_env()
+job_queue = JobQueue.from_env()
 probability_model = ProbabilityModel()
-monte_carlo = MonteCarloSimulation()
+monte_carlo = MonteCarloSimulation(
+    accumulator=os.getenv("MONTE_CARLO_ACCUMULATOR", "exact"),
+    rank_error=float(os.getenv("MONTE_CARLO_RANK_ERROR", "0.005")),
+    max_workers=int(os.getenv("MONTE_CARLO_MAX_WORKERS", "0")) or None
+)
 model_calibration = ModelCalibration()
 webhook_handler = WebhookHandler(strapi_client, forecast_service)
 
@@ -83,52 +136,117 @@ async def health():
 
 @app.get("/api/v1/models/forecast/base")
 async def get_base_forecast(
+    request: Request,
     start_month: Optional[date] = Query(None, description="Start of forecast period"),
     end_month: Optional[date] = Query(None, description="End of forecast period"),
     currency: str = Query("THB", description="Base currency for aggregation")
 ):
-    """Get base forecast - uses pipeline deals if available, falls back to sales/billings data"""
+    """Get base forecast - uses pipeline deals if available, falls back to sales/billings data
+    
+    Responses are cached until the data changes and carry an ETag for If-None-Match revalidation.
+    """
     try:
-        result = await forecast_service.compute_base_forecast(
-            start_month=start_month,
-            end_month=end_month,
-            currency=currency
+        return await response_cache.respond(
+            request,
+            "forecast/base",
+            {"start_month": start_month, "end_month": end_month, "currency": currency},
+            lambda: forecast_service.compute_base_forecast(
+                start_month=start_month,
+                end_month=end_month,
+                currency=currency
+            )
         )
-        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error computing forecast: {str(e)}")
 
 
-@app.post("/api/v1/models/forecast/run", response_model=ForecastRunResponse)
-async def run_forecast_recompute(request: ForecastRunRequest):
-    """Run forecast recompute and optionally write snapshots to Strapi"""
-    start_time = time.time()
-    started_at = datetime.utcnow()
-    
+@app.get("/api/v1/models/forecast/cashflow")
+async def get_cashflow_forecast(
+    request: Request,
+    start_month: Optional[date] = Query(None, description="Start of forecast period"),
+    end_month: Optional[date] = Query(None, description="End of forecast period")
+):
+    """Get cash flow forecast from billings data (cached with ETag revalidation)"""
     try:
-        # Fetch all active deals
-        deals = await strapi_client.get_pipeline_deals(filters={"status": "active"})
-        deals_processed = len(deals)
-        
-        snapshots_created = 0
-        if request.write_snapshots:
-            # In production, this would compute and create snapshots
-            # For now, return placeholder
-            snapshots_created = deals_processed * 3  # Assume 3 snapshots per deal
-        
-        execution_time_ms = int((time.time() - start_time) * 1000)
-        completed_at = datetime.utcnow()
-        
-        return ForecastRunResponse(
-            status="completed",
-            deals_processed=deals_processed,
-            snapshots_created=snapshots_created,
-            execution_time_ms=execution_time_ms,
-            started_at=started_at,
-            completed_at=completed_at
+        return await response_cache.respond(
+            request,
+            "forecast/cashflow",
+            {"start_month": start_month, "end_month": end_month},
+            lambda: forecast_service.compute_billings_cashflow_forecast(
+                start_month=start_month,
+                end_month=end_month
+            )
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error running forecast: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error computing cash flow forecast: {str(e)}")
+
+
+def _forecast_run_response(job: Job) -> ForecastRunResponse:
+    return ForecastRunResponse(
+        job_id=job.id,
+        status=job.status,
+        execution_time_ms=job.execution_time_ms,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+        error=job.error,
+        **job.progress
+    )
+
+
+@app.post("/api/v1/models/forecast/run", response_model=ForecastRunResponse, status_code=202)
+async def run_forecast_recompute(request: ForecastRunRequest):
+    """Queue a forecast recompute; poll GET /api/v1/models/forecast/run/{job_id} for progress
+    
+    Workers compute per-deal monthly snapshots and, if requested, write them
+    to Strapi in batches. An identical recompute that is still queued or
+    running is returned instead of queueing another unless force_recompute
+    is set.
+    """
+    params = {
+        "write_snapshots": request.write_snapshots,
+        "scenario_overrides": request.scenario_overrides
+    }
+    if not request.force_recompute:
+        active = job_queue.find_active("forecast_recompute", params)
+        if active is not None:
+            return _forecast_run_response(active)
+    
+    async def run(job: Job) -> Dict[str, Any]:
+        return await forecast_service.recompute_snapshots(
+            snapshot_id_prefix=job.id,
+            write_snapshots=request.write_snapshots,
+            scenario_overrides=request.scenario_overrides,
+            batch_size=int(os.getenv("SNAPSHOT_BATCH_SIZE", "100")),
+            progress=job.update_progress
+        )
+    
+    try:
+        job = job_queue.submit("forecast_recompute", run, params)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Forecast job queue is full, retry later")
+    return _forecast_run_response(job)
+
+
+@app.get("/api/v1/models/forecast/run/{job_id}", response_model=ForecastRunResponse)
+async def get_forecast_run(job_id: str = Path(..., description="Job ID returned by POST /models/forecast/run")):
+    """Status, progress and timing of a forecast recompute job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown forecast job: {job_id}")
+    return _forecast_run_response(job)
+
+
+def _active_deals_query(fields) -> StrapiQuery:
+    """Active deals with `fields` plus the relations the probability model reads
+    
+    Strapi omits relations that are not populated, which would silently
+    drop the risk flag and complexity adjustments.
+    """
+    query = StrapiQuery().eq("status", "active").fields(*fields)
+    for relation, relation_fields in DEAL_TABLE_RELATIONS.items():
+        query.populate(relation, relation_fields)
+    return query
 
 
 @app.get("/api/v1/models/forecast/scenario/{scenario_id}")
@@ -140,19 +258,21 @@ async def get_scenario_forecast(
 ):
     """Get forecast for a specific scenario"""
     try:
-        # Fetch deals
+        # Fetch deals (only the fields the probability model reads)
         try:
-            deals = await strapi_client.get_pipeline_deals(filters={"status": "active"})
+            deals = await strapi_client.get_pipeline_deals(
+                query=_active_deals_query(DEAL_TABLE_FIELDS)
+            )
         except Exception:
             # If Strapi is not available, use empty list
             deals = []
         
-        # Apply scenario adjustments to probabilities
+        # Apply scenario adjustments to probabilities (scored as one batch)
+        base_probs = probability_model.compute_deal_probabilities(DealTable.from_deals(deals))
         adjusted_deals = []
-        for deal in deals:
+        for deal, base_prob in zip(deals, base_probs):
             deal_attrs = deal.get("attributes", {})
-            base_prob = probability_model.compute_deal_probability(deal_attrs)
-            scenario_prob = probability_model.get_scenario_probability(base_prob, scenario_id)
+            scenario_prob = probability_model.get_scenario_probability(Decimal(str(base_prob)), scenario_id)
             
             # Create adjusted deal copy
             adjusted_attrs = deal_attrs.copy()
@@ -170,8 +290,8 @@ async def get_scenario_forecast(
             currency=currency
         )
         
-        result["scenario"] = scenario_id
-        return result
+        # The forecast may be shared with concurrent callers, so copy before adding fields
+        return {**result, "scenario": scenario_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error computing scenario forecast: {str(e)}")
 
@@ -187,41 +307,63 @@ async def create_custom_scenario(request: ScenarioRequest):
     }
 
 
+def _confidence_key(level: float) -> str:
+    """Map a confidence level (0.8 or 80) to the simulation result key ("80")"""
+    percent = level * 100 if level <= 1 else level
+    return f"{percent:g}"
+
+
 @app.post("/api/v1/models/forecast/simulate")
 async def run_monte_carlo_simulation(request: MonteCarloRequest):
     """Run Monte Carlo simulation for specified deals"""
     start_time = time.time()
     
     try:
-        # Fetch deals by IDs
+        # Fetch only the requested deals and the fields the simulation reads
+        query = _active_deals_query(SIMULATION_FIELDS).in_("id", request.deal_ids)
         try:
-            all_deals = await strapi_client.get_pipeline_deals(filters={"status": "active"})
+            selected_deals = await strapi_client.get_pipeline_deals(query=query) if request.deal_ids else []
         except Exception:
-            all_deals = []
-        selected_deals = [deal for deal in all_deals if deal.get("id") in request.deal_ids]
+            selected_deals = []
         
         if not selected_deals:
             raise HTTPException(status_code=404, detail="No deals found with provided IDs")
         
-        # Run Monte Carlo simulation
-        results = monte_carlo.simulate_portfolio(
-            deals=selected_deals,
-            iterations=request.iterations,
-            probability_model=probability_model
-        )
+        # Run Monte Carlo simulation off the event loop; large runs are CPU bound
+        if request.mode == "analytic":
+            results = await run_in_threadpool(
+                monte_carlo.analytic_portfolio,
+                deals=selected_deals,
+                probability_model=probability_model
+            )
+        else:
+            results = await run_in_threadpool(
+                monte_carlo.simulate_portfolio,
+                deals=selected_deals,
+                iterations=request.iterations,
+                probability_model=probability_model,
+                workers=request.workers,
+                variance_reduction=request.variance_reduction,
+                target_precision=request.target_precision
+            )
         
         execution_time_ms = int((time.time() - start_time) * 1000)
         
         return {
             "simulation_id": f"sim_{int(time.time())}",
-            "iterations": request.iterations,
+            "iterations": results["iterations"],
+            "method": results.get("method", "sampling"),
+            "variance_reduction": results.get("variance_reduction"),
+            "converged": results.get("converged"),
             "results": {
                 "expected_value": results["expected_value"],
                 "confidence_intervals": {
-                    str(level): results["confidence_intervals"][str(level)]
+                    str(level): results["confidence_intervals"][_confidence_key(level)]
                     for level in request.confidence_levels
+                    if _confidence_key(level) in results["confidence_intervals"]
                 },
-                "distribution": results["distribution"]
+                "distribution": results["distribution"],
+                "standard_error": results.get("standard_error", 0.0)
             },
             "execution_time_ms": execution_time_ms
         }
@@ -257,76 +399,62 @@ async def get_forecast_waterfall(
 
 @app.get("/api/v1/models/risk/heatmap")
 async def get_risk_heatmap(
+    request: Request,
     group_by_stage: bool = Query(True),
     group_by_probability: bool = Query(True),
     min_deal_value: Optional[float] = Query(None)
 ):
-    """Get risk heatmap - uses pipeline deals if available, falls back to sales data"""
+    """Get risk heatmap - uses pipeline deals if available, falls back to sales data
+    
+    Responses are cached until the data changes and carry an ETag for If-None-Match revalidation.
+    """
     try:
         from decimal import Decimal
         min_value = Decimal(str(min_deal_value)) if min_deal_value else None
-        result = await forecast_service.compute_risk_heatmap(
-            group_by_stage=group_by_stage,
-            group_by_probability=group_by_probability,
-            min_deal_value=min_value
+        return await response_cache.respond(
+            request,
+            "risk/heatmap",
+            {
+                "group_by_stage": group_by_stage,
+                "group_by_probability": group_by_probability,
+                "min_deal_value": min_deal_value
+            },
+            lambda: forecast_service.compute_risk_heatmap(
+                group_by_stage=group_by_stage,
+                group_by_probability=group_by_probability,
+                min_deal_value=min_value
+            )
         )
-        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error computing risk heatmap: {str(e)}")
 
 
 @app.post("/api/v1/models/ingest/strapi-sync", response_model=StrapiSyncResponse)
 async def sync_from_strapi(request: StrapiSyncRequest):
-    """Sync data from Strapi (webhook or manual trigger)"""
+    """Sync data from Strapi into the local replica (webhook or manual trigger)
+    
+    Without full_sync, only entries updated since the last sync (or since
+    request.since) are pulled. Counts are the number of entries pulled.
+    """
     start_time = time.time()
     entities_synced = {}
     
     try:
         for entity_type in request.entity_types:
-            if entity_type == "pipeline-deals":
-                deals = await strapi_client.get_pipeline_deals()
-                entities_synced["pipeline-deals"] = len(deals)
-            elif entity_type == "billings":
-                billings = await strapi_client.get_billings()
-                entities_synced["billings"] = len(billings)
-            elif entity_type == "clients":
-                clients = await strapi_client.get_clients()
-                entities_synced["clients"] = len(clients)
-            elif entity_type == "construction-sales":
-                sales = await strapi_client.get_construction_sales()
-                entities_synced["construction-sales"] = len(sales)
-            elif entity_type == "construction-billings":
-                billings = await strapi_client.get_construction_billings()
-                entities_synced["construction-billings"] = len(billings)
-            elif entity_type == "loose-furniture-sales":
-                sales = await strapi_client.get_loose_furniture_sales()
-                entities_synced["loose-furniture-sales"] = len(sales)
-            elif entity_type == "loose-furniture-billings":
-                billings = await strapi_client.get_loose_furniture_billings()
-                entities_synced["loose-furniture-billings"] = len(billings)
-            elif entity_type == "interior-design-sales":
-                sales = await strapi_client.get_interior_design_sales()
-                entities_synced["interior-design-sales"] = len(sales)
-            elif entity_type == "interior-design-billings":
-                billings = await strapi_client.get_interior_design_billings()
-                entities_synced["interior-design-billings"] = len(billings)
-            elif entity_type == "all-sales":
-                all_sales = await strapi_client.get_all_sales()
-                entities_synced["all-sales"] = {
-                    "construction": len(all_sales.get("construction", [])),
-                    "loose_furniture": len(all_sales.get("loose_furniture", [])),
-                    "interior_design": len(all_sales.get("interior_design", [])),
-                    "total": len(all_sales.get("total", []))
-                }
-            elif entity_type == "all-billings":
-                all_billings = await strapi_client.get_all_billings()
-                entities_synced["all-billings"] = {
-                    "general": len(all_billings.get("general", [])),
-                    "construction": len(all_billings.get("construction", [])),
-                    "loose_furniture": len(all_billings.get("loose_furniture", [])),
-                    "interior_design": len(all_billings.get("interior_design", [])),
-                    "total": len(all_billings.get("total", []))
-                }
+            if entity_type in REPLICATED_COLLECTIONS:
+                entities_synced[entity_type] = await replica_store.sync(
+                    strapi_client, entity_type, since=request.since, full_sync=request.full_sync
+                )
+            elif entity_type in ("all-sales", "all-billings"):
+                branches = SALES_COLLECTIONS if entity_type == "all-sales" else BILLING_COLLECTIONS
+                for collection in branches.values():
+                    entities_synced[collection] = await replica_store.sync(
+                        strapi_client, collection, since=request.since, full_sync=request.full_sync
+                    )
+        
+        if "pipeline-deals" in entities_synced:
+            forecast_service.invalidate_forecast_cache()
+        response_cache.bump_version()
         
         sync_duration_ms = int((time.time() - start_time) * 1000)
         
@@ -393,9 +521,22 @@ async def get_calibration_status():
 
 
 @app.post("/api/v1/webhooks/strapi")
-async def handle_strapi_webhook(request: Request):
+async def handle_strapi_webhook(
+    request: Request,
+    x_strapi_event: Optional[str] = Header(None),
+    x_strapi_entity: Optional[str] = Header(None),
+    x_strapi_signature: Optional[str] = Header(None)
+):
     """Handle webhook from Strapi"""
-    return await webhook_handler.handle_webhook(request)
+    result = await webhook_handler.handle_webhook(
+        request,
+        x_strapi_event=x_strapi_event,
+        x_strapi_entity=x_strapi_entity,
+        x_strapi_signature=x_strapi_signature
+    )
+    # Any processed event may change forecast inputs; retire cached responses
+    response_cache.bump_version()
+    return result
 
 
 @app.get("/api/v1/alerts")
@@ -433,6 +574,15 @@ async def detailed_health():
             "state": strapi_circuit_breaker.state,
             "failure_count": strapi_circuit_breaker.failure_count
         },
+        "replica": replica_store.status(),
+        "single_flight": {
+            "forecast": forecast_service.single_flight.stats(),
+            "strapi": strapi_client.single_flight.stats()
+        },
+        "jobs": job_queue.stats(),
+        "caches": {
+            "response": response_cache.stats()
+        },
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -453,7 +603,7 @@ async def get_clients(
             filters=filter_dict if filter_dict else None,
             populate=populate
         )
-        return {"data": clients, "count": len(clients)}
+        return FastJSONResponse({"data": clients, "count": len(clients)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching clients: {str(e)}")
 
@@ -469,15 +619,16 @@ async def get_all_sales(
             filter_dict = eval(filters) if isinstance(filters, str) else filters
         
         all_sales = await strapi_client.get_all_sales(filters=filter_dict if filter_dict else None)
-        return {
+        return FastJSONResponse({
             "data": all_sales,
             "summary": {
                 "construction_count": len(all_sales.get("construction", [])),
                 "loose_furniture_count": len(all_sales.get("loose_furniture", [])),
                 "interior_design_count": len(all_sales.get("interior_design", [])),
-                "total_count": len(all_sales.get("total", []))
+                "total_count": len(all_sales.get("total", [])),
+                "failed_branches": sorted(all_sales.get("errors", {}))
             }
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching all sales: {str(e)}")
 
@@ -493,20 +644,86 @@ async def get_all_billings(
             filter_dict = eval(filters) if isinstance(filters, str) else filters
         
         all_billings = await strapi_client.get_all_billings(filters=filter_dict if filter_dict else None)
-        return {
+        return FastJSONResponse({
             "data": all_billings,
             "summary": {
                 "general_count": len(all_billings.get("general", [])),
                 "construction_count": len(all_billings.get("construction", [])),
                 "loose_furniture_count": len(all_billings.get("loose_furniture", [])),
                 "interior_design_count": len(all_billings.get("interior_design", [])),
-                "total_count": len(all_billings.get("total", []))
+                "total_count": len(all_billings.get("total", [])),
+                "failed_branches": sorted(all_billings.get("errors", {}))
             }
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching all billings: {str(e)}")
 
 
+def _parse_filters(filters: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Filter criteria from a JSON object string; anything else is a 422"""
+    if not filters:
+        return None
+    try:
+        filter_dict = json.loads(filters)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="filters must be a JSON object")
+    if not isinstance(filter_dict, dict):
+        raise HTTPException(status_code=422, detail="filters must be a JSON object")
+    return filter_dict or None
+
+
+def _stream_branches(collections: Dict[str, str], filters: Optional[str], format: str) -> StreamingResponse:
+    """Stream entries of every branch collection as they are fetched
+    
+    Each row is the Strapi entry plus its "branch". NDJSON ends with one
+    {"branch", "error"} line per failed branch; the JSON document reports
+    counts and failed branches in its trailing "summary".
+    """
+    filter_dict = _parse_filters(filters)
+    
+    errors: Dict[str, str] = {}
+    summary: Dict[str, Any] = {f"{name}_count": 0 for name in collections}
+    summary.update(total_count=0, failed_branches=[])
+    
+    async def rows():
+        async for name, entries in strapi_client.iter_branch_pages(
+            {name: f"/{collection}" for name, collection in collections.items()},
+            filters=filter_dict,
+            errors=errors
+        ):
+            summary[f"{name}_count"] += len(entries)
+            summary["total_count"] += len(entries)
+            for entry in entries:
+                yield {"branch": name, **entry}
+            # Send each page as it arrives rather than waiting for a full chunk
+            yield FLUSH
+        summary["failed_branches"] = sorted(errors)
+        if format == "ndjson":
+            for name, error in errors.items():
+                yield {"branch": name, "error": error}
+    
+    body = ndjson_stream(rows()) if format == "ndjson" else json_document_stream(rows(), summary)
+    return StreamingResponse(body, media_type=STREAM_MEDIA_TYPES[format])
+
+
+@app.get("/api/v1/data/sales/all/stream")
+async def stream_all_sales(
+    filters: Optional[str] = None,
+    format: Literal["ndjson", "json"] = Query("ndjson", description="ndjson (one entry per line) or json")
+):
+    """Stream all sales from all branches without assembling them in memory"""
+    return _stream_branches(SALES_COLLECTIONS, filters, format)
+
+
+@app.get("/api/v1/data/billings/all/stream")
+async def stream_all_billings(
+    filters: Optional[str] = None,
+    format: Literal["ndjson", "json"] = Query("ndjson", description="ndjson (one entry per line) or json")
+):
+    """Stream all billings from all branches without assembling them in memory"""
+    return _stream_branches(BILLING_COLLECTIONS, filters, format)
+
+
 @app.get("/api/v1/data/sales/construction")
 async def get_construction_sales(
     filters: Optional[str] = None,
@@ -522,7 +739,7 @@ async def get_construction_sales(
             filters=filter_dict if filter_dict else None,
             populate=populate
         )
-        return {"data": sales, "count": len(sales)}
+        return FastJSONResponse({"data": sales, "count": len(sales)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching construction sales: {str(e)}")
 
@@ -542,7 +759,7 @@ async def get_construction_billings(
             filters=filter_dict if filter_dict else None,
             populate=populate
         )
-        return {"data": billings, "count": len(billings)}
+        return FastJSONResponse({"data": billings, "count": len(billings)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching construction billings: {str(e)}")
 
@@ -562,7 +779,7 @@ async def get_loose_furniture_sales(
             filters=filter_dict if filter_dict else None,
             populate=populate
         )
-        return {"data": sales, "count": len(sales)}
+        return FastJSONResponse({"data": sales, "count": len(sales)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching loose furniture sales: {str(e)}")
 
@@ -582,7 +799,7 @@ async def get_loose_furniture_billings(
             filters=filter_dict if filter_dict else None,
             populate=populate
         )
-        return {"data": billings, "count": len(billings)}
+        return FastJSONResponse({"data": billings, "count": len(billings)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching loose furniture billings: {str(e)}")
 
@@ -602,7 +819,7 @@ async def get_interior_design_sales(
             filters=filter_dict if filter_dict else None,
             populate=populate
         )
-        return {"data": sales, "count": len(sales)}
+        return FastJSONResponse({"data": sales, "count": len(sales)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching interior design sales: {str(e)}")
 
@@ -622,7 +839,7 @@ async def get_interior_design_billings(
             filters=filter_dict if filter_dict else None,
             populate=populate
         )
-        return {"data": billings, "count": len(billings)}
+        return FastJSONResponse({"data": billings, "count": len(billings)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching interior design billings: {str(e)}")
 
@@ -642,11 +859,175 @@ async def get_projects(
             filters=filter_dict if filter_dict else None,
             populate=populate
         )
-        return {"data": projects, "count": len(projects)}
+        return FastJSONResponse({"data": projects, "count": len(projects)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching projects: {str(e)}")
 
 
+ExportFormat = Literal["arrow", "parquet"]
+EXPORT_FORMAT_QUERY = Query("arrow", description="arrow (Arrow IPC stream) or parquet")
+
+
+def _require_export() -> None:
+    """Columnar exports answer 501 when pyarrow is not installed"""
+    try:
+        require_pyarrow()
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+
+def _export_headers(format: str, name: str) -> Dict[str, str]:
+    extension = "arrows" if format == "arrow" else "parquet"
+    return {"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+
+
+async def _export_response(build, format: str, name: str) -> StreamingResponse:
+    """Build an Arrow table off the event loop and stream it batch by batch"""
+    table = await run_in_threadpool(build)
+    return StreamingResponse(
+        iter_table(table, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=_export_headers(format, name)
+    )
+
+
+async def _export_branches(
+    collections: Dict[str, str],
+    record_type,
+    to_batch,
+    schema,
+    filters: Optional[str],
+    format: str,
+    name: str
+) -> StreamingResponse:
+    """Stream entries of every branch collection as (branch, record) record batches
+    
+    Entries are converted to records as each page arrives and written out
+    every RECORD_BATCH_ROWS rows. A failed branch fails the export: with a
+    502 when it happens before the first batch is ready, otherwise by
+    ending the response before the end of stream marker (Arrow) or footer
+    (Parquet), so readers reject the file rather than see partial data.
+    """
+    filter_dict = _parse_filters(filters)
+    errors: Dict[str, str] = {}
+    
+    def check_errors():
+        if errors:
+            raise HTTPException(status_code=502, detail=f"Failed to fetch branches: {', '.join(sorted(errors))}")
+    
+    async def batches():
+        rows = []
+        async for branch, entry in strapi_client.iter_branches(
+            {branch: f"/{collection}" for branch, collection in collections.items()},
+            filters=filter_dict,
+            errors=errors
+        ):
+            check_errors()
+            rows.append((branch, record_type.from_entry(entry)))
+            if len(rows) >= RECORD_BATCH_ROWS:
+                yield to_batch(rows)
+                rows = []
+        check_errors()
+        if rows:
+            yield to_batch(rows)
+    
+    # Fetch up to the first batch before responding, so most failures still get a status code
+    source = batches()
+    try:
+        first = await source.__anext__()
+    except StopAsyncIteration:
+        first = None
+    
+    async def all_batches():
+        if first is not None:
+            yield first
+        async for batch in source:
+            yield batch
+    
+    return StreamingResponse(
+        stream_batches(all_batches(), schema, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=_export_headers(format, name)
+    )
+
+
+@app.get("/api/v1/export/sales")
+async def export_sales(filters: Optional[str] = None, format: ExportFormat = EXPORT_FORMAT_QUERY):
+    """Export all sales from all branches as Arrow IPC or Parquet"""
+    _require_export()
+    return await _export_branches(
+        SALES_COLLECTIONS, SaleRecord, sales_batch, sales_schema(), filters, format, "sales"
+    )
+
+
+@app.get("/api/v1/export/billings")
+async def export_billings(filters: Optional[str] = None, format: ExportFormat = EXPORT_FORMAT_QUERY):
+    """Export all billings from all branches as Arrow IPC or Parquet"""
+    _require_export()
+    return await _export_branches(
+        BILLING_COLLECTIONS, BillingRecord, billings_batch, billings_schema(), filters, format, "billings"
+    )
+
+
+@app.get("/api/v1/export/deals")
+async def export_deals(format: ExportFormat = EXPORT_FORMAT_QUERY):
+    """Export active pipeline deals (the probability model's inputs) as Arrow IPC or Parquet"""
+    _require_export()
+    query = _active_deals_query(DEAL_TABLE_FIELDS)
+    try:
+        deals = await strapi_client.get_pipeline_deals(query=query)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error fetching deals: {str(e)}")
+    return await _export_response(lambda: deal_table_to_arrow(DealTable.from_deals(deals)), format, "deals")
+
+
+@app.get("/api/v1/export/forecast")
+async def export_forecast(
+    start_month: Optional[date] = Query(None, description="Start of forecast period"),
+    end_month: Optional[date] = Query(None, description="End of forecast period"),
+    currency: str = Query("THB", description="Base currency for aggregation"),
+    format: ExportFormat = EXPORT_FORMAT_QUERY
+):
+    """Export the base forecast's monthly totals as Arrow IPC or Parquet"""
+    _require_export()
+    try:
+        forecast = await forecast_service.compute_base_forecast(
+            start_month=start_month,
+            end_month=end_month,
+            currency=currency
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing forecast: {str(e)}")
+    return await _export_response(lambda: forecast_to_arrow(forecast), format, "forecast")
+
+
+@app.post("/api/v1/export/simulation")
+async def export_simulation_paths(request: SimulationExportRequest, format: ExportFormat = EXPORT_FORMAT_QUERY):
+    """Export Monte Carlo sample paths (one row per iteration, one column per month)"""
+    _require_export()
+    query = _active_deals_query(SIMULATION_FIELDS).in_("id", request.deal_ids)
+    try:
+        deals = await strapi_client.get_pipeline_deals(query=query) if request.deal_ids else []
+    except Exception:
+        deals = []
+    if not deals:
+        raise HTTPException(status_code=404, detail="No deals found with provided IDs")
+    
+    def build():
+        months, paths = monte_carlo.sample_paths(
+            deals,
+            request.start_month,
+            request.end_month,
+            iterations=request.iterations,
+            probability_model=probability_model,
+            workers=request.workers,
+            variance_reduction=request.variance_reduction
+        )
+        return sample_paths_to_arrow(months, paths)
+    
+    return await _export_response(build, format, "simulation-paths")
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -6,6 +6,7 @@ from decimal import Decimal
 from datetime import date, datetime, timedelta
 from collections import defaultdict
 from app.probability_model import ProbabilityModel
+from app.records import billing_records, deal_records
 
 
 class ModelCalibration:
@@ -20,29 +21,24 @@ class ModelCalibration:
         historical_billings: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """Analyze historical conversion rates by stage"""
-        # Map billings to deals
-        deal_billings = defaultdict(list)
-        for billing in historical_billings:
-            deal_id = billing.get("attributes", {}).get("deal", {}).get("data", {}).get("id")
-            if deal_id:
-                deal_billings[deal_id].append(billing)
+        # Deals with at least one billing have converted
+        billed_deal_ids = {
+            billing.deal_id for billing in billing_records(historical_billings) if billing.deal_id
+        }
         
         # Analyze by stage
         stage_stats = defaultdict(lambda: {"total": 0, "converted": 0, "total_value": Decimal("0"), "converted_value": Decimal("0")})
         
-        for deal in historical_deals:
-            deal_attrs = deal.get("attributes", {})
-            stage = deal_attrs.get("stage", "unknown")
-            deal_value = Decimal(str(deal_attrs.get("deal_value", 0)))
-            deal_id = deal.get("id")
+        for deal in deal_records(historical_deals):
+            stage = deal.stage or "unknown"
             
             stage_stats[stage]["total"] += 1
-            stage_stats[stage]["total_value"] += deal_value
+            stage_stats[stage]["total_value"] += deal.deal_value
             
             # Check if deal converted (has billings)
-            if deal_id in deal_billings and len(deal_billings[deal_id]) > 0:
+            if deal.id in billed_deal_ids:
                 stage_stats[stage]["converted"] += 1
-                stage_stats[stage]["converted_value"] += deal_value
+                stage_stats[stage]["converted_value"] += deal.deal_value
         
         # Calculate conversion rates
         calibration_results = {}
@@ -2,7 +2,7 @@
 Pydantic models for request/response validation
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import date, datetime
 from decimal import Decimal
 
@@ -35,12 +35,17 @@ class ForecastRunRequest(BaseModel):
 
 
 class ForecastRunResponse(BaseModel):
-    status: str
-    deals_processed: int
-    snapshots_created: int
-    execution_time_ms: int
-    started_at: datetime
-    completed_at: datetime
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    deals_processed: int = 0
+    snapshots_computed: int = 0
+    snapshots_created: int = 0
+    snapshots_failed: int = 0
+    execution_time_ms: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    error: Optional[str] = None
 
 
 class ScenarioRequest(BaseModel):
@@ -51,8 +56,21 @@ class ScenarioRequest(BaseModel):
 
 class MonteCarloRequest(BaseModel):
     deal_ids: List[int]
-    iterations: int = Field(default=10000, ge=1000, le=100000)
+    iterations: int = Field(default=10000, ge=100, le=1000000)
     confidence_levels: List[float] = Field(default=[0.5, 0.8, 0.95])
+    workers: Optional[int] = Field(default=None, ge=1, le=64, description="Process count hint for parallel sampling")
+    mode: Literal["sample", "analytic"] = Field(default="sample", description="Sample outcomes or compute the distribution analytically")
+    variance_reduction: Literal["none", "antithetic", "stratified", "sobol"] = "none"
+    target_precision: Optional[float] = Field(default=None, gt=0, description="Stop once the 95% half-width of the expected value is below this amount")
+
+
+class SimulationExportRequest(BaseModel):
+    deal_ids: List[int]
+    start_month: date
+    end_month: date
+    iterations: int = Field(default=10000, ge=100, le=200000)
+    workers: Optional[int] = Field(default=None, ge=1, le=64, description="Process count hint for parallel sampling")
+    variance_reduction: Literal["none", "antithetic", "stratified", "sobol"] = "none"
 
 
 class RiskHeatmapResponse(BaseModel):
@@ -1,20 +1,408 @@
 """
 Monte Carlo simulation for revenue forecasting
 """
-import random
-from typing import List, Dict, Any, Optional
+import math
+import multiprocessing
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from decimal import Decimal
-from datetime import date, datetime, timedelta
-from collections import defaultdict
+from datetime import date, timedelta
 import statistics
 
+import numpy as np
+
+from app.deal_table import DealTable, DEAL_TABLE_FIELDS
+from app.month_index import month_from_index, window_bounds
+from app.records import DealLike, DealRecord, deal_records
+from app.simulation_stats import RunningMoments, StatsAccumulator, make_accumulator
+
+# Upper bound on the number of Bernoulli draws held in memory at once
+# (iterations x deals); larger runs are processed in row chunks.
+MAX_DRAWS_PER_CHUNK = 2_000_000
+
+# Iterations are split into fixed-size blocks, each with its own spawned
+# random stream. The split does not depend on the worker count, so a given
+# seed reproduces the same result however many processes run the blocks.
+# A power of two keeps Sobol blocks balanced.
+BLOCK_ITERATIONS = 4_096
+
+# Variance reduction: supported sampling schemes, the minimum number of
+# independent blocks used to estimate their standard error, and the z-score
+# for the 95% half-width checked against target_precision.
+VARIANCE_REDUCTION_MODES = ("none", "antithetic", "stratified", "sobol")
+MIN_REPLICATES = 8
+Z_95 = 1.959963984540054
+
+# Analytic mode: largest value lattice convolved exactly, and the book size
+# above which the normal approximation replaces the bucketed convolution.
+MAX_ANALYTIC_BUCKETS = 65_536
+NORMAL_APPROXIMATION_MIN_DEALS = 2_000
+
+# Deal attributes a simulation reads (probability inputs plus recognition window)
+SIMULATION_FIELDS = DEAL_TABLE_FIELDS + ("recognition_start_month", "recognition_end_month")
+
+
+def _uniform_chunks(
+    rng: np.random.Generator,
+    iterations: int,
+    deals: int,
+    rows_per_chunk: int,
+    variance_reduction: str
+) -> Iterator[np.ndarray]:
+    """Yield rows x deals uniform draws for one block under the chosen sampling scheme"""
+    sobol = None
+    if variance_reduction == "sobol":
+        from scipy.stats import qmc
+        sobol = qmc.Sobol(d=deals, scramble=True, seed=rng)
+    
+    for start in range(0, iterations, rows_per_chunk):
+        rows = min(rows_per_chunk, iterations - start)
+        if variance_reduction == "antithetic":
+            # Pair every draw u with 1 - u
+            half = rng.random(((rows + 1) // 2, deals))
+            yield np.concatenate([half, 1.0 - half])[:rows]
+        elif variance_reduction == "stratified":
+            # Latin hypercube: each deal's draws cover every 1/rows stratum once
+            strata = rng.permuted(np.tile(np.arange(rows), (deals, 1)), axis=1).T
+            yield (strata + rng.random((rows, deals))) / rows
+        elif sobol is not None:
+            with warnings.catch_warnings():
+                # Chunks need not be powers of two; balance is kept over the block
+                warnings.simplefilter("ignore", UserWarning)
+                yield sobol.random(rows)
+        else:
+            yield rng.random((rows, deals))
+
+
+def _sample_chunks(
+    rng: np.random.Generator,
+    reduction: np.ndarray,
+    probabilities: np.ndarray,
+    iterations: int,
+    max_draws_per_chunk: int,
+    variance_reduction: str = "none"
+) -> Iterator[np.ndarray]:
+    """Draw iterations x deals Bernoulli outcomes in chunks and reduce each chunk
+    
+    reduction is either the deal value vector (portfolio totals per
+    iteration) or a deal x month allocation matrix (monthly totals).
+    """
+    if len(probabilities) == 0:
+        yield np.zeros((iterations,) + reduction.shape[1:], dtype=np.float64)
+        return
+    
+    # Even chunk sizes keep antithetic pairs together
+    rows_per_chunk = max(2, (max_draws_per_chunk // len(probabilities)) // 2 * 2)
+    for uniforms in _uniform_chunks(rng, iterations, len(probabilities), rows_per_chunk, variance_reduction):
+        closed = uniforms < probabilities
+        yield closed @ reduction
+
+
+def _simulate_block(
+    reduction: np.ndarray,
+    probabilities: np.ndarray,
+    iterations: int,
+    seed_sequence: np.random.SeedSequence,
+    accumulator: str,
+    rank_error: float,
+    max_draws_per_chunk: int,
+    variance_reduction: str = "none"
+) -> List[StatsAccumulator]:
+    """Run one block of iterations on its own stream (also used as the process-pool task)
+    
+    Returns one accumulator per reduction column (a single one for portfolio totals).
+    """
+    rng = np.random.default_rng(seed_sequence)
+    columns = 1 if reduction.ndim == 1 else reduction.shape[1]
+    stats = [make_accumulator(accumulator, rank_error=rank_error) for _ in range(columns)]
+    
+    chunks = _sample_chunks(
+        rng, reduction, probabilities, iterations, max_draws_per_chunk, variance_reduction
+    )
+    for chunk in chunks:
+        if chunk.ndim == 1:
+            stats[0].update(chunk)
+        else:
+            for col, column_stats in enumerate(stats):
+                column_stats.update(chunk[:, col])
+    
+    return stats
+
+
+def _simulate_blocks(
+    reduction: np.ndarray,
+    probabilities: np.ndarray,
+    blocks: List[Tuple[int, np.random.SeedSequence]],
+    accumulator: str,
+    rank_error: float,
+    max_draws_per_chunk: int,
+    variance_reduction: str = "none"
+) -> List[List[StatsAccumulator]]:
+    """Run a group of (iterations, seed sequence) blocks in order (the process-pool task)
+    
+    Each worker gets one contiguous group per round, so the deal arrays are
+    pickled once per worker rather than once per block.
+    """
+    return [
+        _simulate_block(
+            reduction, probabilities, size, seed_sequence,
+            accumulator, rank_error, max_draws_per_chunk, variance_reduction
+        )
+        for size, seed_sequence in blocks
+    ]
+
+
+def _contiguous_groups(items: List[Any], parts: int) -> List[List[Any]]:
+    """Split items into at most `parts` contiguous, nearly equal groups"""
+    bounds = np.linspace(0, len(items), min(parts, len(items)) + 1).astype(int)
+    return [items[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def _pool_context():
+    """Start method for simulation workers
+    
+    The service process runs an event loop, a threadpool and client locks,
+    so workers are never forked from it directly: forkserver (or spawn)
+    starts them from a clean process.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _standard_error(partials: List[List[StatsAccumulator]], variance_reduction: str) -> float:
+    """Standard error of the mean of the first column across completed blocks
+    
+    Plain sampling uses the i.i.d. formula. Variance-reduced draws are not
+    independent within a block, but every block is its own randomized design
+    (a fresh Latin hypercube or an independently scrambled Sobol sequence on
+    its own stream), so block means are independent replicates and their
+    spread, weighted by block size, gives the error. A design can reproduce
+    the mean exactly (a Latin hypercube of n rows when every p * n is whole);
+    the error is then zero, as is the spread of the mean across seeds.
+    """
+    blocks = [partial[0] for partial in partials if partial[0].count > 0]
+    total = sum(block.count for block in blocks)
+    if total == 0:
+        return 0.0
+    
+    if variance_reduction == "none" or len(blocks) < 2:
+        merged = RunningMoments()
+        for block in blocks:
+            merged.merge(block.moments)
+        return merged.std_dev / math.sqrt(total)
+    
+    weights = np.array([block.count for block in blocks], dtype=np.float64) / total
+    means = np.array([block.mean for block in blocks])
+    overall = float(weights @ means)
+    k = len(blocks)
+    return math.sqrt(k / (k - 1) * float((weights ** 2) @ ((means - overall) ** 2)))
+
+
+class _AnalyticDistribution:
+    """Portfolio outcome distribution exposing the same summary interface as an accumulator"""
+    
+    def __init__(
+        self,
+        mean: float,
+        std_dev: float,
+        minimum: float,
+        maximum: float,
+        support: Optional[np.ndarray] = None,
+        cdf: Optional[np.ndarray] = None
+    ):
+        self.mean = mean
+        self.std_dev = std_dev
+        self.min = minimum
+        self.max = maximum
+        self.support = support
+        self.cdf = cdf
+    
+    def percentiles(self, levels: List[float]) -> List[float]:
+        if self.support is None:
+            # Normal approximation, clamped to the attainable range
+            dist = statistics.NormalDist(self.mean, self.std_dev) if self.std_dev > 0 else None
+            values = [dist.inv_cdf(level / 100) if dist else self.mean for level in levels]
+            return [min(self.max, max(self.min, v)) for v in values]
+        
+        # Smallest outcome whose cumulative probability reaches the level
+        targets = np.asarray(levels, dtype=np.float64) / 100 - 1e-12
+        idx = np.searchsorted(self.cdf, targets, side="left")
+        return [float(v) for v in self.support[np.minimum(idx, len(self.support) - 1)]]
+
+
+def _poisson_binomial_pmf(units: np.ndarray, probabilities: np.ndarray, size: int) -> np.ndarray:
+    """Distribution of sum(units[i] * Bernoulli(p[i])) on the lattice 0..size-1"""
+    pmf = np.zeros(size, dtype=np.float64)
+    pmf[0] = 1.0
+    reach = 0
+    for unit, p in zip(units, probabilities):
+        if p <= 0 or unit == 0:
+            continue
+        # Only the reachable prefix of the lattice needs updating
+        upper = min(reach + unit, size - 1)
+        shifted = pmf[:upper + 1 - unit].copy()
+        pmf[:upper + 1] *= (1 - p)
+        pmf[unit:upper + 1] += p * shifted
+        reach = upper
+    return pmf
+
 
 class MonteCarloSimulation:
     """Monte Carlo simulation for deal outcomes"""
     
-    def __init__(self, seed: Optional[int] = None):
-        if seed is not None:
-            random.seed(seed)
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        max_draws_per_chunk: int = MAX_DRAWS_PER_CHUNK,
+        accumulator: str = "exact",
+        rank_error: float = 0.005,
+        max_workers: Optional[int] = None
+    ):
+        # Each call spawns an independent child stream from this sequence;
+        # the global random module is never touched.
+        self._seed_sequence = np.random.SeedSequence(seed)
+        self._seed_lock = threading.Lock()
+        self.max_draws_per_chunk = max_draws_per_chunk
+        # "exact" keeps every outcome; "sketch" uses constant memory (t-digest)
+        self.accumulator = accumulator
+        self.rank_error = rank_error
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Long-lived worker pool, started on the first parallel run
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+    
+    def _spawn_sequence(self) -> np.random.SeedSequence:
+        """Spawn the seed sequence for one simulation call"""
+        with self._seed_lock:
+            return self._seed_sequence.spawn(1)[0]
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_pool_context())
+            return self._pool
+    
+    def close(self) -> None:
+        """Shut down the worker pool; the next parallel run starts a new one"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+    
+    def _map_blocks(
+        self,
+        pool: Optional[ProcessPoolExecutor],
+        workers: int,
+        blocks: List[Tuple[int, np.random.SeedSequence]],
+        reduction: np.ndarray,
+        probabilities: np.ndarray,
+        *options: Any
+    ) -> List[List[StatsAccumulator]]:
+        """Run blocks in order, grouped per worker when a pool is used
+        
+        options are the remaining _simulate_blocks arguments (accumulator,
+        rank error, chunk bound, variance reduction).
+        """
+        if pool is None:
+            return _simulate_blocks(reduction, probabilities, blocks, *options)
+        try:
+            futures = [
+                pool.submit(_simulate_blocks, reduction, probabilities, group, *options)
+                for group in _contiguous_groups(blocks, workers)
+            ]
+            return [partial for future in futures for partial in future.result()]
+        except BrokenProcessPool:
+            # A worker died; drop the pool so the next run starts a fresh one
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+    
+    @staticmethod
+    def _block_size(iterations: int, variance_reduction: str) -> int:
+        """Iterations per block; variance-reduced runs use at least MIN_REPLICATES blocks"""
+        if variance_reduction == "none":
+            return BLOCK_ITERATIONS
+        size = min(BLOCK_ITERATIONS, max(64, iterations // MIN_REPLICATES))
+        if variance_reduction == "sobol":
+            size = 1 << (size.bit_length() - 1)
+        return size
+    
+    def _run_blocks(
+        self,
+        reduction: np.ndarray,
+        probabilities: np.ndarray,
+        iterations: int,
+        accumulator: Optional[str] = None,
+        workers: Optional[int] = None,
+        variance_reduction: str = "none",
+        target_precision: Optional[float] = None
+    ) -> Tuple[List[StatsAccumulator], Dict[str, Any]]:
+        """Run iteration blocks, optionally across the worker pool, and merge in block order
+        
+        With target_precision, blocks run in rounds of MIN_REPLICATES and
+        stop once the 95% half-width of the first column's mean is within
+        the target. Rounds do not depend on the worker count, so results
+        stay reproducible for a seed.
+        
+        Returns the merged accumulators and run info (iterations used,
+        standard error, whether the target was met).
+        """
+        if variance_reduction not in VARIANCE_REDUCTION_MODES:
+            raise ValueError(
+                f"Unknown variance reduction: {variance_reduction}. "
+                f"Expected one of {list(VARIANCE_REDUCTION_MODES)}"
+            )
+        kind = accumulator or self.accumulator
+        columns = 1 if reduction.ndim == 1 else reduction.shape[1]
+        if iterations <= 0:
+            empty = [make_accumulator(kind, rank_error=self.rank_error) for _ in range(columns)]
+            return empty, {"iterations": 0, "standard_error": 0.0, "converged": False}
+        
+        block_size = self._block_size(iterations, variance_reduction)
+        block_sizes = [
+            min(block_size, iterations - start)
+            for start in range(0, iterations, block_size)
+        ]
+        block_sequences = self._spawn_sequence().spawn(len(block_sizes))
+        round_size = MIN_REPLICATES if target_precision is not None else len(block_sizes)
+        
+        workers = min(workers or 1, self.max_workers, len(block_sizes))
+        pool = self._get_pool() if workers > 1 else None
+        partials: List[List[StatsAccumulator]] = []
+        converged = False
+        for start in range(0, len(block_sizes), round_size):
+            blocks = list(zip(
+                block_sizes[start:start + round_size],
+                block_sequences[start:start + round_size]
+            ))
+            partials.extend(self._map_blocks(
+                pool, workers, blocks, reduction, probabilities,
+                kind, self.rank_error, self.max_draws_per_chunk, variance_reduction
+            ))
+            
+            if target_precision is not None:
+                half_width = Z_95 * _standard_error(partials, variance_reduction)
+                if half_width <= target_precision:
+                    converged = True
+                    break
+        
+        # Block-level error must be read before the blocks are merged
+        run_info = {
+            "iterations": sum(partial[0].count for partial in partials),
+            "standard_error": _standard_error(partials, variance_reduction),
+            "converged": converged
+        }
+        
+        merged = partials[0]
+        for partial in partials[1:]:
+            for column_stats, other in zip(merged, partial):
+                column_stats.merge(other)
+        return merged, run_info
     
     def simulate_deal_outcome(
         self,
@@ -23,166 +411,208 @@ class MonteCarloSimulation:
         iterations: int = 1000
     ) -> Dict[str, Any]:
         """Simulate a single deal outcome"""
-        outcomes = []
-        for _ in range(iterations):
-            # Random draw: deal closes with given probability
-            if random.random() < float(probability):
-                # Deal closes - add full value
-                outcomes.append(float(deal_value))
-            else:
-                # Deal doesn't close
-                outcomes.append(0.0)
+        rng = np.random.default_rng(self._spawn_sequence())
+        # Random draw: deal closes with given probability and adds its full value
+        closed = rng.random(iterations) < float(probability)
+        outcomes = np.where(closed, float(deal_value), 0.0)
+        # One sort for all five percentiles
+        p5, p25, p50, p75, p95 = np.percentile(outcomes, [5, 25, 50, 75, 95]).tolist()
         
         return {
-            "expected_value": statistics.mean(outcomes),
-            "std_dev": statistics.stdev(outcomes) if len(outcomes) > 1 else 0.0,
-            "min": min(outcomes),
-            "max": max(outcomes),
-            "percentiles": {
-                "5": self._percentile(outcomes, 5),
-                "25": self._percentile(outcomes, 25),
-                "50": self._percentile(outcomes, 50),
-                "75": self._percentile(outcomes, 75),
-                "95": self._percentile(outcomes, 95)
-            }
+            "expected_value": float(outcomes.mean()),
+            "std_dev": float(outcomes.std(ddof=1)) if outcomes.size > 1 else 0.0,
+            "min": float(outcomes.min()),
+            "max": float(outcomes.max()),
+            "percentiles": {"5": p5, "25": p25, "50": p50, "75": p75, "95": p95}
         }
     
     def simulate_portfolio(
         self,
-        deals: List[Dict[str, Any]],
+        deals: List[DealLike],
         iterations: int = 10000,
-        probability_model=None
+        probability_model=None,
+        accumulator: Optional[str] = None,
+        workers: Optional[int] = None,
+        variance_reduction: str = "none",
+        target_precision: Optional[float] = None
     ) -> Dict[str, Any]:
-        """Simulate a portfolio of deals"""
-        portfolio_outcomes = []
+        """Simulate a portfolio of deals
         
-        for _ in range(iterations):
-            iteration_total = Decimal("0")
-            
-            for deal in deals:
-                deal_attrs = deal.get("attributes", {})
-                deal_value = Decimal(str(deal_attrs.get("deal_value", 0)))
-                
-                # Get probability (use model if provided, else use deal probability)
-                if probability_model:
-                    prob = probability_model.compute_deal_probability(deal_attrs)
-                else:
-                    prob = Decimal(str(deal_attrs.get("probability", 50))) / 100
-                
-                # Random draw
-                if random.random() < float(prob):
-                    iteration_total += deal_value
-            
-            portfolio_outcomes.append(float(iteration_total))
+        workers > 1 spreads the iteration blocks over a process pool; the
+        result for a given seed is the same for any worker count.
+        variance_reduction is one of "none", "antithetic", "stratified"
+        (Latin hypercube) or "sobol" (scrambled Sobol). With
+        target_precision, sampling stops early once the 95% half-width of
+        the expected value is at most that amount; iterations is then the
+        upper bound.
+        """
+        values, probabilities = self._deal_vectors(deal_records(deals), probability_model)
+        [stats], run_info = self._run_blocks(
+            values, probabilities, iterations, accumulator, workers,
+            variance_reduction, target_precision
+        )
+        result = self._portfolio_summary(stats, run_info["iterations"])
+        result["standard_error"] = run_info["standard_error"]
+        result["variance_reduction"] = variance_reduction
+        if target_precision is not None:
+            result["target_precision"] = target_precision
+            result["converged"] = run_info["converged"]
+        return result
+    
+    @staticmethod
+    def _portfolio_summary(stats: StatsAccumulator, iterations: int) -> Dict[str, Any]:
+        """Build the portfolio result dictionary from accumulated statistics"""
+        mean = stats.mean
+        std_dev = stats.std_dev
         
-        # Compute statistics
-        mean = statistics.mean(portfolio_outcomes)
-        std_dev = statistics.stdev(portfolio_outcomes) if len(portfolio_outcomes) > 1 else 0.0
+        levels = [2.5, 5, 10, 25, 50, 75, 90, 95, 97.5]
+        pct = dict(zip(levels, stats.percentiles(levels)))
         
         # Confidence intervals
-        sorted_outcomes = sorted(portfolio_outcomes)
         confidence_intervals = {
-            "50": [
-                self._percentile(sorted_outcomes, 25),
-                self._percentile(sorted_outcomes, 75)
-            ],
-            "80": [
-                self._percentile(sorted_outcomes, 10),
-                self._percentile(sorted_outcomes, 90)
-            ],
-            "95": [
-                self._percentile(sorted_outcomes, 2.5),
-                self._percentile(sorted_outcomes, 97.5)
-            ]
+            "50": [pct[25], pct[75]],
+            "80": [pct[10], pct[90]],
+            "95": [pct[2.5], pct[97.5]]
         }
         
         return {
             "expected_value": mean,
             "std_dev": std_dev,
-            "min": min(portfolio_outcomes),
-            "max": max(portfolio_outcomes),
+            "min": stats.min,
+            "max": stats.max,
             "confidence_intervals": confidence_intervals,
             "distribution": {
                 "mean": mean,
                 "std_dev": std_dev,
                 "percentiles": {
-                    "5": self._percentile(sorted_outcomes, 5),
-                    "25": self._percentile(sorted_outcomes, 25),
-                    "50": self._percentile(sorted_outcomes, 50),
-                    "75": self._percentile(sorted_outcomes, 75),
-                    "95": self._percentile(sorted_outcomes, 95)
+                    "5": pct[5],
+                    "25": pct[25],
+                    "50": pct[50],
+                    "75": pct[75],
+                    "95": pct[95]
                 }
             },
             "iterations": iterations
         }
     
+    def analytic_portfolio(
+        self,
+        deals: List[DealLike],
+        probability_model=None,
+        method: str = "auto"
+    ) -> Dict[str, Any]:
+        """Compute the portfolio outcome distribution without sampling
+        
+        method is "exact" (convolution over the gcd lattice of deal values),
+        "bucketed" (convolution with values rounded to a fixed bucket width),
+        "normal" (normal approximation) or "auto", which picks exact when the
+        lattice is small enough, bucketed for moderate books and normal for
+        large ones. The method used is reported in the result.
+        """
+        values, probabilities = self._deal_vectors(deal_records(deals), probability_model)
+        
+        mean = float(values @ probabilities)
+        std_dev = math.sqrt(float((values ** 2) @ (probabilities * (1 - probabilities))))
+        minimum = float(values[probabilities >= 1].sum())
+        maximum = float(values[probabilities > 0].sum())
+        
+        # Values in whole cents, reduced by their common divisor
+        cents = np.rint(values * 100).astype(np.int64)
+        active = (probabilities > 0) & (cents != 0)
+        unit = int(np.gcd.reduce(cents[active])) if active.any() else 1
+        lattice_size = int(cents[active].sum() // unit) + 1
+        
+        if method == "auto":
+            if lattice_size <= MAX_ANALYTIC_BUCKETS:
+                method = "exact"
+            elif len(values) < NORMAL_APPROXIMATION_MIN_DEALS:
+                method = "bucketed"
+            else:
+                method = "normal"
+        
+        if method == "normal":
+            distribution = _AnalyticDistribution(mean, std_dev, minimum, maximum)
+        elif method in ("exact", "bucketed"):
+            if method == "exact":
+                if lattice_size > MAX_ANALYTIC_BUCKETS:
+                    raise ValueError(
+                        f"Exact analytic mode needs {lattice_size} buckets; "
+                        f"the limit is {MAX_ANALYTIC_BUCKETS}"
+                    )
+                units = cents // unit
+                width = unit / 100
+            else:
+                width = maximum / (MAX_ANALYTIC_BUCKETS - 1) if maximum > 0 else 1.0
+                units = np.rint(values / width).astype(np.int64)
+            size = int(units[probabilities > 0].sum()) + 1
+            pmf = _poisson_binomial_pmf(units, probabilities, size)
+            distribution = _AnalyticDistribution(
+                mean, std_dev, minimum, maximum,
+                support=np.arange(size) * width,
+                cdf=np.cumsum(pmf)
+            )
+        else:
+            raise ValueError(f"Unknown analytic method: {method}")
+        
+        result = self._portfolio_summary(distribution, iterations=0)
+        result["method"] = method
+        return result
+    
+    @staticmethod
+    def _deal_vectors(
+        deals: List[DealRecord],
+        probability_model=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Deal values and closing probabilities as arrays"""
+        table = DealTable.from_deals(deals)
+        
+        # Get probabilities (use model if provided, else use deal probability)
+        if probability_model:
+            probabilities = probability_model.compute_deal_probabilities(table)
+        else:
+            probabilities = np.array([
+                float((deal.probability if deal.probability is not None else Decimal(50)) / 100)
+                for deal in deals
+            ], dtype=np.float64)
+        
+        return table.deal_value, probabilities
+    
     def simulate_with_timing(
         self,
-        deals: List[Dict[str, Any]],
+        deals: List[DealLike],
         start_date: date,
         end_date: date,
         iterations: int = 10000,
-        probability_model=None
+        probability_model=None,
+        accumulator: Optional[str] = None,
+        workers: Optional[int] = None,
+        variance_reduction: str = "none"
     ) -> Dict[str, Any]:
         """Simulate portfolio with revenue timing distribution"""
-        monthly_outcomes = defaultdict(list)
+        deals = deal_records(deals)
+        values, probabilities = self._deal_vectors(deals, probability_model)
+        months, allocation = self._allocation_matrix(deals, values, probabilities, start_date, end_date)
         
-        for _ in range(iterations):
-            monthly_totals = defaultdict(Decimal)
-            
-            for deal in deals:
-                deal_attrs = deal.get("attributes", {})
-                deal_value = Decimal(str(deal_attrs.get("deal_value", 0)))
-                
-                # Get probability
-                if probability_model:
-                    prob = probability_model.compute_deal_probability(deal_attrs)
-                else:
-                    prob = Decimal(str(deal_attrs.get("probability", 50))) / 100
-                
-                # Random draw
-                if random.random() < float(prob):
-                    # Determine recognition months
-                    rec_start = deal_attrs.get("recognition_start_month")
-                    rec_end = deal_attrs.get("recognition_end_month")
-                    
-                    if rec_start and rec_end:
-                        # Distribute across months
-                        start = datetime.strptime(rec_start, "%Y-%m-%d").date().replace(day=1)
-                        end = datetime.strptime(rec_end, "%Y-%m-%d").date().replace(day=1)
-                        
-                        months = []
-                        current = start
-                        while current <= end:
-                            if start_date <= current <= end_date:
-                                months.append(current)
-                            if current.month == 12:
-                                current = current.replace(year=current.year + 1, month=1)
-                            else:
-                                current = current.replace(month=current.month + 1)
-                        
-                        if months:
-                            monthly_amount = deal_value / len(months)
-                            for month in months:
-                                monthly_totals[month] += monthly_amount
-            
-            # Record this iteration's monthly totals
-            for month, amount in monthly_totals.items():
-                monthly_outcomes[month].append(float(amount))
+        # One accumulator per month; months a deal did not close in count as zero
+        monthly_stats_acc = []
+        if months:
+            monthly_stats_acc, _ = self._run_blocks(
+                allocation, probabilities, iterations, accumulator, workers, variance_reduction
+            )
         
         # Compute statistics per month
         monthly_stats = {}
-        for month in sorted(monthly_outcomes.keys()):
-            outcomes = monthly_outcomes[month]
+        for month, stats in zip(months, monthly_stats_acc):
+            pct = stats.percentiles([5, 25, 50, 75, 95])
             monthly_stats[month.isoformat()] = {
-                "mean": statistics.mean(outcomes),
-                "std_dev": statistics.stdev(outcomes) if len(outcomes) > 1 else 0.0,
+                "mean": stats.mean,
+                "std_dev": stats.std_dev,
                 "percentiles": {
-                    "5": self._percentile(outcomes, 5),
-                    "25": self._percentile(outcomes, 25),
-                    "50": self._percentile(outcomes, 50),
-                    "75": self._percentile(outcomes, 75),
-                    "95": self._percentile(outcomes, 95)
+                    "5": pct[0],
+                    "25": pct[1],
+                    "50": pct[2],
+                    "75": pct[3],
+                    "95": pct[4]
                 }
             }
         
@@ -191,6 +621,63 @@ class MonteCarloSimulation:
             "iterations": iterations
         }
     
+    def sample_paths(
+        self,
+        deals: List[DealLike],
+        start_date: date,
+        end_date: date,
+        iterations: int = 10000,
+        probability_model=None,
+        workers: Optional[int] = None,
+        variance_reduction: str = "none"
+    ) -> Tuple[List[date], List[np.ndarray]]:
+        """Simulated revenue of every iteration, month by month
+        
+        Returns the months and one array of `iterations` outcomes per month;
+        position i in every array belongs to the same simulated iteration.
+        Outcomes are kept in memory, whatever the configured accumulator.
+        """
+        deals = deal_records(deals)
+        values, probabilities = self._deal_vectors(deals, probability_model)
+        months, allocation = self._allocation_matrix(deals, values, probabilities, start_date, end_date)
+        if not months:
+            return [], []
+        
+        monthly, _ = self._run_blocks(allocation, probabilities, iterations, "exact", workers, variance_reduction)
+        return months, [stats.values for stats in monthly]
+    
+    @staticmethod
+    def _allocation_matrix(
+        deals: List[DealRecord],
+        values: np.ndarray,
+        probabilities: np.ndarray,
+        start_date: date,
+        end_date: date
+    ) -> Tuple[List[date], np.ndarray]:
+        """Build the deal x month revenue allocation matrix for the simulation window
+        
+        Each closing deal spreads its value evenly over the recognition months
+        that fall inside [start_date, end_date]. Only months that some deal can
+        contribute to are kept as columns.
+        """
+        # Integer month index bounds of the window
+        first, last = window_bounds(start_date, end_date)
+        
+        allocation = np.zeros((len(deals), max(0, last - first + 1)), dtype=np.float64)
+        for i, deal in enumerate(deals):
+            months = deal.recognition
+            if months is None:
+                continue
+            
+            lo = max(months[0], first)
+            hi = min(months[1], last)
+            if lo <= hi:
+                allocation[i, lo - first:hi - first + 1] = values[i] / (hi - lo + 1)
+        
+        touched = np.flatnonzero((allocation[probabilities > 0] != 0).any(axis=0))
+        months = [month_from_index(first + int(col)) for col in touched]
+        return months, allocation[:, touched]
+    
     @staticmethod
     def _percentile(data: List[float], percentile: float) -> float:
         """Calculate percentile of a list"""
@@ -0,0 +1,59 @@
+"""
+Integer month indices shared by the forecast and simulation paths
+
+A month is represented as year * 12 + month - 1, so stepping through
+months is integer arithmetic and recognition windows become index ranges.
+Date strings are parsed once and cached, and month start dates are only
+materialised when a response is formatted.
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+
+def month_index(value: date) -> int:
+    """Index of the month containing `value`"""
+    return value.year * 12 + value.month - 1
+
+
+@lru_cache(maxsize=4096)
+def month_from_index(index: int) -> date:
+    """First day of the month with the given index"""
+    return date(index // 12, index % 12 + 1, 1)
+
+
+@lru_cache(maxsize=65536)
+def parse_date(value: str) -> date:
+    """Parse an ISO date or timestamp string ("Z" suffix allowed) into a date
+    
+    Raises ValueError for strings that are not ISO formatted.
+    """
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+
+
+def parse_month_index(value: Any) -> int:
+    """Month index of an ISO date string or a date"""
+    return month_index(parse_date(value) if isinstance(value, str) else value)
+
+
+def window_bounds(start_month: date, end_month: date) -> Tuple[int, int]:
+    """Inclusive month index bounds of the months in [start_month, end_month]
+    
+    Months are keyed by their first day, so a mid-month start excludes that
+    month while any day of the end month includes it. The range is empty
+    (first > last) when the window contains no month start.
+    """
+    return month_index(start_month) + (start_month.day > 1), month_index(end_month)
+
+
+def recognition_range(deal_attrs: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """Inclusive month index range of a deal's recognition window
+    
+    Returns None when either bound is missing or the window is empty.
+    """
+    rec_start = deal_attrs.get("recognition_start_month")
+    rec_end = deal_attrs.get("recognition_end_month")
+    if not (rec_start and rec_end):
+        return None
+    first, last = parse_month_index(rec_start), parse_month_index(rec_end)
+    return (first, last) if first <= last else None
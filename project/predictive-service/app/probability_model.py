@@ -4,6 +4,11 @@ Stage-based probability rules and probability adjustment logic
 from typing import Dict, Any, Optional
 from decimal import Decimal
 from datetime import date, datetime, timedelta
+import time
+
+import numpy as np
+
+from app.deal_table import DealTable
 
 
 class ProbabilityModel:
@@ -114,6 +119,58 @@ class ProbabilityModel:
         
         return adjusted_prob
     
+    @classmethod
+    def compute_deal_probabilities(
+        cls,
+        table: DealTable,
+        use_override: bool = True,
+        now: Optional[float] = None,
+        repeat_client: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Compute final probabilities for a whole deal table in one vectorized pass
+        
+        Mirrors compute_deal_probability for every row. "now" (epoch
+        seconds) is captured once for the batch. Results are rounded to
+        1e-10, which reproduces the Decimal path exactly for inputs with up
+        to eight decimal places.
+        """
+        if now is None:
+            now = time.time()
+        factors = {name: float(value) for name, value in cls.ADJUSTMENT_FACTORS.items()}
+        
+        # Base probability: explicit probability, else stage rule
+        stage_probs = np.array(
+            [float(cls.get_base_probability(stage)) for stage in table.stages] or [0.5]
+        )
+        base = np.where(
+            np.isnan(table.probability),
+            stage_probs[table.stage_codes],
+            table.probability / 100
+        )
+        
+        # Adjustments
+        adjusted = base + np.where(table.deal_value > 1000000, factors["high_value"], 0.0)
+        with np.errstate(invalid="ignore"):
+            days_since_activity = np.floor((now - table.last_activity_at) / 86400)
+            adjusted += np.where(days_since_activity > 30, factors["low_activity"], 0.0)
+            adjusted += np.where(table.complexity_score >= 8, factors["complexity_high"], 0.0)
+        adjusted += np.where(table.high_risk, factors["risk_flags"], 0.0)
+        if repeat_client is not None:
+            adjusted += np.where(repeat_client, factors["repeat_client"], 0.0)
+        
+        # Clamp between 0 and 1
+        adjusted = np.clip(adjusted, 0.0, 1.0)
+        
+        # Override bypasses all adjustments
+        if use_override:
+            adjusted = np.where(
+                np.isnan(table.confidence_override),
+                adjusted,
+                table.confidence_override / 100
+            )
+        
+        return np.round(adjusted, 10)
+    
     @classmethod
     def get_scenario_probability(
         cls,
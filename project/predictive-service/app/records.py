@@ -0,0 +1,258 @@
+"""
+Compact typed records for Strapi deal, sale and billing entries
+
+Strapi entries are nested dicts ({"id": ..., "attributes": {..., "project":
+{"data": {...}}}}) whose values arrive as strings or numbers. Records parse
+them once, when they are read, into __slots__ objects with Decimal amounts,
+parsed dates, month indices and flattened relations, so the forecast,
+probability, simulation and calibration code no longer re-parses the same
+fields in every loop.
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from app.month_index import month_index, parse_date, recognition_range
+
+
+def _attributes(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Entry attributes; Strapi v5 entries are flat"""
+    return entry.get("attributes", entry)
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    """Decimal of a set numeric value; None, "" and unparsable values give None"""
+    if value is None or value == "":
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return None
+
+
+def _date(value: Any) -> Optional[date]:
+    if isinstance(value, str):
+        try:
+            return parse_date(value)
+        except ValueError:
+            return None
+    return value or None
+
+
+def _relation(value: Any) -> Optional[Dict[str, Any]]:
+    """Populated to-one relation ({"data": {...}} or a flat v5 object)"""
+    if isinstance(value, dict) and "data" in value:
+        value = value["data"]
+    return value if isinstance(value, dict) else None
+
+
+def _relation_list(value: Any) -> List[Dict[str, Any]]:
+    """Populated to-many relation ({"data": [...]} or a flat v5 list)"""
+    if isinstance(value, dict):
+        value = value.get("data")
+    return [item for item in value or [] if isinstance(item, dict)]
+
+
+class DealRecord:
+    """A pipeline deal with parsed values and flattened project / risk flag relations
+    
+    Unset optional numbers and a missing stage are None; callers apply
+    their own defaults. A probability or confidence override of 0 is kept
+    as Decimal(0). has_probability and has_override record whether the raw
+    value was truthy, which is what the scalar probability path checks: a
+    numeric 0 is unset there, while the string "0" Strapi sends for decimal
+    columns is set.
+    """
+    
+    __slots__ = (
+        "id", "name", "status", "stage", "deal_value", "probability", "confidence_override",
+        "last_activity_at", "recognition", "risk_flag_count", "high_risk", "complexity_score",
+        "has_probability", "has_override"
+    )
+    
+    def __init__(
+        self,
+        id: Any = None,
+        name: Optional[str] = None,
+        status: Optional[str] = None,
+        stage: Optional[str] = None,
+        deal_value: Decimal = Decimal(0),
+        probability: Optional[Decimal] = None,
+        confidence_override: Optional[Decimal] = None,
+        last_activity_at: Optional[datetime] = None,
+        recognition: Optional[Tuple[int, int]] = None,
+        risk_flag_count: int = 0,
+        high_risk: bool = False,
+        complexity_score: Optional[float] = None,
+        has_probability: Optional[bool] = None,
+        has_override: Optional[bool] = None
+    ):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.stage = stage
+        self.deal_value = deal_value
+        self.probability = probability
+        self.confidence_override = confidence_override
+        self.last_activity_at = last_activity_at
+        self.recognition = recognition
+        self.risk_flag_count = risk_flag_count
+        self.high_risk = high_risk
+        self.complexity_score = complexity_score
+        self.has_probability = bool(probability) if has_probability is None else has_probability
+        self.has_override = bool(confidence_override) if has_override is None else has_override
+    
+    @classmethod
+    def from_attributes(cls, deal_id: Any, deal_attrs: Dict[str, Any]) -> "DealRecord":
+        """Build a record from a deal id and its Strapi attributes"""
+        flags = _relation_list(deal_attrs.get("risk_flags"))
+        project = _relation(deal_attrs.get("project"))
+        complexity_score = None
+        if project:
+            complexity_score = float(_attributes(project).get("complexity_score", 5))
+        
+        return cls(
+            id=deal_id,
+            name=deal_attrs.get("name"),
+            status=deal_attrs.get("status"),
+            stage=deal_attrs.get("stage"),
+            deal_value=_decimal(deal_attrs.get("deal_value", 0)) or Decimal(0),
+            probability=_decimal(deal_attrs.get("probability")),
+            confidence_override=_decimal(deal_attrs.get("confidence_override")),
+            last_activity_at=_timestamp(deal_attrs.get("last_activity_at")),
+            recognition=recognition_range(deal_attrs),
+            risk_flag_count=len(flags),
+            high_risk=any(_attributes(flag).get("severity") == "high" for flag in flags),
+            complexity_score=complexity_score,
+            has_probability=bool(deal_attrs.get("probability")),
+            has_override=bool(deal_attrs.get("confidence_override"))
+        )
+    
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any]) -> "DealRecord":
+        """Build a record from a Strapi entry ({"id": ..., "attributes": {...}})"""
+        return cls.from_attributes(entry.get("id"), _attributes(entry))
+    
+    def with_probability(self, probability: Any) -> "DealRecord":
+        """Copy of the record with the probability (percent) replaced"""
+        record = DealRecord(*(getattr(self, name) for name in DealRecord.__slots__))
+        record.probability = _decimal(probability)
+        record.has_probability = bool(probability)
+        return record
+    
+    def __repr__(self) -> str:
+        return f"DealRecord(id={self.id!r}, stage={self.stage!r}, deal_value={self.deal_value!r})"
+
+
+class SaleRecord:
+    """A sale with its amount, status and sale date (falling back to createdAt) parsed"""
+    
+    __slots__ = ("id", "client", "status", "amount", "sale_date")
+    
+    def __init__(
+        self,
+        id: Any = None,
+        client: str = "Unknown",
+        status: str = "Pending",
+        amount: Decimal = Decimal(0),
+        sale_date: Optional[date] = None
+    ):
+        self.id = id
+        self.client = client
+        self.status = status
+        self.amount = amount
+        self.sale_date = sale_date
+    
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any]) -> "SaleRecord":
+        attrs = _attributes(entry)
+        return cls(
+            id=entry.get("id") or entry.get("documentId", "unknown"),
+            client=attrs.get("client") or attrs.get("customer", "Unknown"),
+            status=attrs.get("status", "Pending"),
+            amount=_decimal(attrs.get("sale_amount", attrs.get("amount"))) or Decimal(0),
+            sale_date=_date(attrs.get("sale_date") or attrs.get("createdAt"))
+        )
+    
+    def __repr__(self) -> str:
+        return f"SaleRecord(id={self.id!r}, status={self.status!r}, amount={self.amount!r})"
+
+
+class BillingRecord:
+    """A billing with its amount, billing month index and the id of its deal"""
+    
+    __slots__ = ("id", "deal_id", "amount", "month_index", "collected")
+    
+    def __init__(
+        self,
+        id: Any = None,
+        deal_id: Any = None,
+        amount: Decimal = Decimal(0),
+        month_index: Optional[int] = None,
+        collected: bool = False
+    ):
+        self.id = id
+        self.deal_id = deal_id
+        self.amount = amount
+        self.month_index = month_index
+        self.collected = collected
+    
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any]) -> "BillingRecord":
+        """Build a record; the invoice date takes precedence over month/year fields"""
+        attrs = _attributes(entry)
+        billing_index = None
+        if attrs.get("month") and attrs.get("year"):
+            try:
+                billing_index = month_index(date(int(attrs["year"]), int(attrs["month"]), 1))
+            except (TypeError, ValueError):
+                billing_index = None
+        
+        invoice_date = attrs.get("invoice_date")
+        if invoice_date and isinstance(invoice_date, str):
+            try:
+                billing_index = month_index(parse_date(invoice_date))
+            except ValueError:
+                pass
+        
+        deal = _relation(attrs.get("deal"))
+        return cls(
+            id=entry.get("id"),
+            deal_id=deal.get("id") if deal else None,
+            amount=_decimal(attrs.get("amount")) or Decimal(0),
+            month_index=billing_index,
+            collected=bool(attrs.get("collected_date"))
+        )
+    
+    def __repr__(self) -> str:
+        return f"BillingRecord(id={self.id!r}, deal_id={self.deal_id!r}, amount={self.amount!r})"
+
+
+DealLike = Union[DealRecord, Dict[str, Any]]
+
+
+def deal_records(deals: Iterable[DealLike]) -> List[DealRecord]:
+    """Normalize Strapi deal entries; records already built are passed through"""
+    return [deal if isinstance(deal, DealRecord) else DealRecord.from_entry(deal) for deal in deals]
+
+
+def sale_records(sales: Iterable[Union[SaleRecord, Dict[str, Any]]]) -> List[SaleRecord]:
+    return [sale if isinstance(sale, SaleRecord) else SaleRecord.from_entry(sale) for sale in sales]
+
+
+def billing_records(billings: Iterable[Union[BillingRecord, Dict[str, Any]]]) -> List[BillingRecord]:
+    return [
+        billing if isinstance(billing, BillingRecord) else BillingRecord.from_entry(billing)
+        for billing in billings
+    ]
@@ -0,0 +1,251 @@
+"""
+Local SQLite replica of Strapi collections
+"""
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from app import json_codec
+from app.strapi_client import StrapiClient
+
+logger = logging.getLogger(__name__)
+
+# Replicated collections and the relations forecasts need populated
+REPLICATED_COLLECTIONS = {
+    "pipeline-deals": "project,risk_flags",
+    "billings": None,
+    "clients": None,
+    "projects": None,
+    "construction-sales": None,
+    "construction-billings": None,
+    "loose-furniture-sales": None,
+    "loose-furniture-billings": None,
+    "interior-design-sales": None,
+    "interior-design-billings": None,
+}
+
+SALES_COLLECTIONS = {
+    "construction": "construction-sales",
+    "loose_furniture": "loose-furniture-sales",
+    "interior_design": "interior-design-sales",
+}
+
+BILLING_COLLECTIONS = {
+    "general": "billings",
+    "construction": "construction-billings",
+    "loose_furniture": "loose-furniture-billings",
+    "interior_design": "interior-design-billings",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    collection TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    updated_at TEXT,
+    attributes TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    collection TEXT PRIMARY KEY,
+    last_synced_at TEXT NOT NULL,
+    high_watermark TEXT
+);
+"""
+
+
+class ReplicaStore:
+    """Embedded store holding Strapi entries ({"id": ..., "attributes": {...}})
+    
+    Entries are kept per collection with their updatedAt so syncs only need
+    to pull what changed since the last one. A collection is served from the
+    replica once it has been synced at least once.
+    """
+    
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+    
+    @classmethod
+    def from_env(cls) -> "ReplicaStore":
+        """Open the replica at REPLICA_DB_PATH (in-memory by default)"""
+        return cls(os.getenv("REPLICA_DB_PATH", ":memory:"))
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+    
+    def upsert(self, collection: str, entries: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace entries; returns the number written"""
+        rows = [
+            (
+                collection,
+                int(entry["id"]),
+                (entry.get("attributes") or {}).get("updatedAt"),
+                json_codec.dumps(entry.get("attributes") or {}).decode()
+            )
+            for entry in entries
+            if entry.get("id") is not None
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (collection, id, updated_at, attributes) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+    
+    def delete(self, collection: str, ids: Iterable[int]) -> int:
+        """Remove entries by id; returns the number removed"""
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                "DELETE FROM entries WHERE collection = ? AND id = ?",
+                [(collection, int(entry_id)) for entry_id in ids]
+            )
+            return cursor.rowcount
+    
+    def get(self, collection: str, entry_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, attributes FROM entries WHERE collection = ? AND id = ?",
+                (collection, int(entry_id))
+            ).fetchone()
+        return {"id": row[0], "attributes": json_codec.loads(row[1])} if row else None
+    
+    def iter_entries(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield entries in id order, optionally filtered on attribute equality"""
+        sql = "SELECT id, attributes FROM entries WHERE collection = ?"
+        params: List[Any] = [collection]
+        for key, value in (filters or {}).items():
+            sql += " AND json_extract(attributes, ?) = ?"
+            params.extend([f"$.{key}", value])
+        sql += " AND id > ? ORDER BY id LIMIT ?"
+        
+        # Keyset pagination keeps memory bounded without holding the lock while yielding
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, [*params, last_id, batch_size]).fetchall()
+            for entry_id, attributes in rows:
+                yield {"id": entry_id, "attributes": json_codec.loads(attributes)}
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+    
+    def entries(self, collection: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return list(self.iter_entries(collection, filters))
+    
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+    
+    def is_synced(self, collection: str) -> bool:
+        """Whether the collection has been synced and can be served locally"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sync_state WHERE collection = ?", (collection,)
+            ).fetchone()
+        return row is not None
+    
+    def high_watermark(self, collection: str) -> Optional[str]:
+        """Latest updatedAt pulled for the collection"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT high_watermark FROM sync_state WHERE collection = ?", (collection,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def _mark_synced(self, collection: str, high_watermark: Optional[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO sync_state (collection, last_synced_at, high_watermark) VALUES (?, ?, ?)
+                ON CONFLICT(collection) DO UPDATE SET
+                    last_synced_at = excluded.last_synced_at,
+                    high_watermark = COALESCE(excluded.high_watermark, sync_state.high_watermark)
+                """,
+                (collection, datetime.utcnow().isoformat(), high_watermark)
+            )
+    
+    async def sync(
+        self,
+        strapi: StrapiClient,
+        collection: str,
+        since: Optional[Union[datetime, str]] = None,
+        full_sync: bool = False
+    ) -> int:
+        """Pull a collection from Strapi into the replica
+        
+        Incremental syncs request entries with updatedAt at or after `since`
+        (default: the stored high watermark). Re-pulling entries that share the
+        watermark timestamp is harmless because writes are upserts. A full
+        sync pulls everything and drops entries that no longer exist.
+        
+        Returns the number of entries pulled.
+        """
+        if collection not in REPLICATED_COLLECTIONS:
+            raise ValueError(f"Unknown collection: {collection}")
+        
+        if isinstance(since, datetime):
+            since = since.isoformat()
+        if since is None and not full_sync:
+            since = self.high_watermark(collection)
+        
+        pulled = 0
+        seen_ids = set()
+        high_watermark = None
+        batch: List[Dict[str, Any]] = []
+        async for entry in strapi.iter_collection(
+            f"/{collection}",
+            populate=REPLICATED_COLLECTIONS[collection],
+            updated_since=None if full_sync else since
+        ):
+            batch.append(entry)
+            updated_at = (entry.get("attributes") or {}).get("updatedAt")
+            if updated_at and (high_watermark is None or updated_at > high_watermark):
+                high_watermark = updated_at
+            if len(batch) >= 500:
+                pulled += self.upsert(collection, batch)
+                seen_ids.update(e["id"] for e in batch)
+                batch = []
+        pulled += self.upsert(collection, batch)
+        seen_ids.update(e["id"] for e in batch)
+        
+        if full_sync:
+            with self._lock:
+                stored = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM entries WHERE collection = ?", (collection,)
+                )]
+            self.delete(collection, [entry_id for entry_id in stored if entry_id not in seen_ids])
+        
+        self._mark_synced(collection, high_watermark)
+        logger.info(f"Replica sync of {collection}: {pulled} entries pulled")
+        return pulled
+    
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT collection, COUNT(*) FROM entries GROUP BY collection"
+            ).fetchall())
+            states = self._conn.execute(
+                "SELECT collection, last_synced_at, high_watermark FROM sync_state"
+            ).fetchall()
+        return {
+            collection: {
+                "entries": counts.get(collection, 0),
+                "last_synced_at": last_synced_at,
+                "high_watermark": high_watermark
+            }
+            for collection, last_synced_at, high_watermark in states
+        }
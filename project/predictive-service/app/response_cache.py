@@ -0,0 +1,139 @@
+"""
+Server-side result cache with strong ETags for read-only endpoints
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app import json_codec
+
+
+class ResponseCache:
+    """LRU cache of rendered JSON responses keyed by endpoint, parameters and data version
+    
+    The data version is bumped whenever the underlying data changes (Strapi
+    sync, webhooks), which retires every cached response at
+    once. ETags are content hashes of the cached body, so clients revalidating
+    with If-None-Match get a 304 until the data changes or the entry expires.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Distinguishes versions across restarts so old ETags never match
+        self._epoch = uuid.uuid4().hex[:8]
+        self._version = 0
+        self._entries: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+    
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Create a cache sized by RESPONSE_CACHE_SIZE and RESPONSE_CACHE_TTL"""
+        return cls(
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+        )
+    
+    @property
+    def data_version(self) -> str:
+        return f"{self._epoch}-{self._version}"
+    
+    def bump_version(self) -> str:
+        """Mark the underlying data as changed and drop every cached response"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+        return self.data_version
+    
+    def make_key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        # Default forecast windows start at the current month, so the day is part of the key
+        payload = {
+            "endpoint": endpoint,
+            "params": params,
+            "version": self.data_version,
+            "day": date.today().isoformat()
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+    
+    def _get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+    
+    def _put(self, key: str, etag: str, body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    @staticmethod
+    def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # If-None-Match uses weak comparison (RFC 9110)
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    
+    async def respond(
+        self,
+        request: Request,
+        endpoint: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Response:
+        """Serve a cached JSON response, a 304, or compute and cache a fresh one"""
+        key = self.make_key(endpoint, params)
+        cached = self._get(key)
+        if cached is not None:
+            self.hits += 1
+            etag, body = cached
+        else:
+            self.misses += 1
+            result = await compute()
+            body = json_codec.dumps(result)
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            self._put(key, etag, body)
+        
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "X-Data-Version": self.data_version
+        }
+        if self._etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "data_version": self.data_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
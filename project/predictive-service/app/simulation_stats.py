@@ -0,0 +1,247 @@
+"""
+Streaming statistics accumulators for Monte Carlo outcomes
+"""
+import math
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max using Welford's method
+    
+    Batches are folded in with Chan's pairwise update, so partial results
+    from separate chunks or workers can be merged exactly.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def update(self, values: np.ndarray) -> None:
+        """Fold a batch of observations into the running moments"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        batch = RunningMoments()
+        batch.count = int(values.size)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        self.merge(batch)
+    
+    def merge(self, other: "RunningMoments") -> None:
+        """Combine another set of moments into this one"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    @property
+    def variance(self) -> float:
+        """Sample variance (n - 1 denominator)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std_dev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class TDigest:
+    """Mergeable t-digest quantile sketch
+    
+    Centroids are grouped with the arcsine scale function, which keeps
+    tails tight and bounds the rank error near the median by roughly
+    pi / (2 * compression). Memory is O(compression) regardless of how
+    many values are added.
+    """
+    
+    def __init__(self, compression: float = 200.0):
+        self.compression = compression
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+    
+    @classmethod
+    def for_rank_error(cls, rank_error: float) -> "TDigest":
+        """Create a digest sized for a target rank error (e.g. 0.005 for 0.5%)"""
+        if rank_error <= 0:
+            raise ValueError("rank_error must be positive")
+        return cls(compression=math.ceil(math.pi / (2 * rank_error)))
+    
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+    
+    def update(self, values: np.ndarray) -> None:
+        """Add a batch of observations"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(values.size)])
+        )
+    
+    def merge(self, other: "TDigest") -> None:
+        """Combine another digest into this one"""
+        if other.weights.size == 0:
+            return
+        self._compress(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights])
+        )
+    
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="mergesort")
+        means = means[order]
+        weights = weights[order]
+        
+        # Bucket centroids by the integer part of the scale function at their midpoint
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression * (np.arcsin(np.clip(2 * q - 1, -1.0, 1.0)) / np.pi + 0.5)
+        buckets = np.floor(k).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+    
+    def quantiles(self, qs: Sequence[float], minimum: float, maximum: float) -> np.ndarray:
+        """Estimate quantiles (0-1) using the same linear rule as numpy.percentile"""
+        if self.weights.size == 0:
+            return np.zeros(len(qs))
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        # Interpolate between centroid midpoints, anchored at the exact extremes
+        ranks = np.r_[0.5, centers, total - 0.5]
+        knots = np.r_[minimum, self.means, maximum]
+        targets = np.asarray(qs, dtype=np.float64) * (total - 1) + 0.5
+        return np.interp(targets, ranks, knots)
+
+
+class StatsAccumulator(ABC):
+    """Interface for Monte Carlo outcome statistics"""
+    
+    def __init__(self):
+        self.moments = RunningMoments()
+    
+    def update(self, values: np.ndarray) -> None:
+        self.moments.update(values)
+    
+    def merge(self, other: "StatsAccumulator") -> None:
+        self.moments.merge(other.moments)
+    
+    @property
+    def count(self) -> int:
+        return self.moments.count
+    
+    @property
+    def mean(self) -> float:
+        return self.moments.mean
+    
+    @property
+    def std_dev(self) -> float:
+        return self.moments.std_dev
+    
+    @property
+    def min(self) -> float:
+        return self.moments.min if self.moments.count else 0.0
+    
+    @property
+    def max(self) -> float:
+        return self.moments.max if self.moments.count else 0.0
+    
+    @abstractmethod
+    def percentiles(self, levels: Sequence[float]) -> List[float]:
+        """Percentiles for levels given on a 0-100 scale"""
+
+
+class ExactAccumulator(StatsAccumulator):
+    """Keeps every outcome and computes exact percentiles"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[np.ndarray] = []
+        self._sorted: Optional[np.ndarray] = None
+    
+    def update(self, values: np.ndarray) -> None:
+        super().update(values)
+        self._chunks.append(np.asarray(values, dtype=np.float64).ravel())
+        self._sorted = None
+    
+    def merge(self, other: "StatsAccumulator") -> None:
+        if not isinstance(other, ExactAccumulator):
+            raise TypeError("ExactAccumulator can only merge with another ExactAccumulator")
+        super().merge(other)
+        self._chunks.extend(other._chunks)
+        self._sorted = None
+    
+    @property
+    def values(self) -> np.ndarray:
+        """All outcomes in the order they were added"""
+        if not self._chunks:
+            return np.empty(0, dtype=np.float64)
+        return np.concatenate(self._chunks)
+    
+    def percentiles(self, levels: Sequence[float]) -> List[float]:
+        if self.count == 0:
+            return [0.0] * len(levels)
+        if self._sorted is None:
+            # Sort once; every later percentile lookup reuses the sorted array
+            self._sorted = np.sort(self.values)
+        return [float(v) for v in np.percentile(self._sorted, levels)]
+
+
+class SketchAccumulator(StatsAccumulator):
+    """Constant-memory accumulator backed by a t-digest"""
+    
+    def __init__(self, rank_error: float = 0.005):
+        super().__init__()
+        self.digest = TDigest.for_rank_error(rank_error)
+    
+    def update(self, values: np.ndarray) -> None:
+        super().update(values)
+        self.digest.update(values)
+    
+    def merge(self, other: "StatsAccumulator") -> None:
+        if not isinstance(other, SketchAccumulator):
+            raise TypeError("SketchAccumulator can only merge with another SketchAccumulator")
+        super().merge(other)
+        self.digest.merge(other.digest)
+    
+    def percentiles(self, levels: Sequence[float]) -> List[float]:
+        if self.count == 0:
+            return [0.0] * len(levels)
+        qs = [level / 100 for level in levels]
+        return [float(v) for v in self.digest.quantiles(qs, self.moments.min, self.moments.max)]
+
+
+ACCUMULATORS = {
+    "exact": ExactAccumulator,
+    "sketch": SketchAccumulator,
+}
+
+
+def make_accumulator(kind: str = "exact", rank_error: float = 0.005) -> StatsAccumulator:
+    """Create a statistics accumulator by name ("exact" or "sketch")"""
+    if kind == "exact":
+        return ExactAccumulator()
+    if kind == "sketch":
+        return SketchAccumulator(rank_error=rank_error)
+    raise ValueError(f"Unknown accumulator: {kind}. Expected one of {sorted(ACCUMULATORS)}")
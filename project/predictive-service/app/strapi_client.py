@@ -1,50 +1,296 @@
 """
 Strapi API client for fetching data
 """
+import asyncio
 import httpx
+import logging
 import os
-from typing import Optional, Dict, Any, List
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable, Awaitable, AsyncIterator, Deque, Tuple
 from datetime import datetime
+from app import json_codec
+from app.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from app.retry_logic import RetryConfig, retry_async
+from app.single_flight import SingleFlight
+from app.strapi_query import StrapiQuery
+
+logger = logging.getLogger(__name__)
+
+
+class StrapiOverloadedError(Exception):
+    """Strapi answered 429 or 5xx; the request can be retried"""
+    
+    def __init__(self, status_code: int):
+        super().__init__(f"Strapi responded with HTTP {status_code}")
+        self.status_code = status_code
 
 
 class StrapiClient:
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.base_url = os.getenv("STRAPI_URL", "http://localhost:1337/api")
         self.api_token = os.getenv("STRAPI_API_TOKEN")
         self.timeout = 30.0
-        
+        self.http2 = os.getenv("STRAPI_HTTP2", "false").lower() == "true"
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("STRAPI_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("STRAPI_MAX_KEEPALIVE_CONNECTIONS", "10")),
+            keepalive_expiry=float(os.getenv("STRAPI_KEEPALIVE_EXPIRY", "30"))
+        )
+        self.page_size = int(os.getenv("STRAPI_PAGE_SIZE", "100"))
+        self.page_prefetch = int(os.getenv("STRAPI_PAGE_PREFETCH", "4"))
+        self.fanout_concurrency = max(1, int(os.getenv("STRAPI_FANOUT_CONCURRENCY", "4")))
+        # Bulk writes start at the last learned concurrency and adapt within [1, max]
+        self.bulk_concurrency = max(1, int(os.getenv("STRAPI_BULK_CONCURRENCY", "4")))
+        self.bulk_max_concurrency = max(1, int(os.getenv("STRAPI_BULK_MAX_CONCURRENCY", "16")))
+        self.bulk_retry = RetryConfig(
+            max_retries=int(os.getenv("STRAPI_BULK_RETRIES", "3")),
+            initial_delay=0.5,
+            max_delay=10.0,
+            retryable_exceptions=(StrapiOverloadedError, httpx.TransportError)
+        )
+        self._transport = transport
+        self.single_flight = SingleFlight()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._retiring: set = set()
+    
     def _get_headers(self) -> Dict[str, str]:
         headers = {"Content-Type": "application/json"}
         if self.api_token:
             headers["Authorization"] = f"Bearer {self.api_token}"
         return headers
     
-    async def get_pipeline_deals(
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared pooled client, creating it on first use
+        
+        Pooled connections belong to the event loop that opened them, so a
+        new client is created if the running loop has changed, and the old
+        one is closed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                self._retire_client(self._client, self._client_loop)
+            self._client = self._create_client()
+            self._client_loop = loop
+        return self._client
+    
+    def _retire_client(self, client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Close a client that belongs to another event loop
+        
+        A loop still running elsewhere closes the client itself. Otherwise it
+        is closed from the current loop: the pool is emptied and its sockets
+        released, although a stopped loop cannot finish closing the transports.
+        """
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        task = asyncio.get_running_loop().create_task(self._close_quietly(client))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+    
+    @staticmethod
+    async def _close_quietly(client: httpx.AsyncClient) -> None:
+        try:
+            await client.aclose()
+        except RuntimeError as e:
+            logger.debug(f"Closed pooled Strapi client from a stopped event loop: {e}")
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        options = {"timeout": self.timeout, "limits": self.limits, "transport": self._transport}
+        if self.http2:
+            try:
+                return httpx.AsyncClient(http2=True, **options)
+            except ImportError:
+                # HTTP/2 needs the optional "h2" package
+                logger.warning("STRAPI_HTTP2 is enabled but h2 is not installed; using HTTP/1.1")
+        return httpx.AsyncClient(**options)
+    
+    async def aclose(self) -> None:
+        """Close the shared client and its pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+    
+    async def _get_page(
         self,
+        path: str,
+        params: Dict[str, Any],
+        page: int,
+        page_size: int,
+        not_found_ok: bool = True
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """GET one page of a collection and return (data, page count)
+        
+        With not_found_ok, a 404 (content type not deployed) yields an empty page.
+        Concurrent requests for the same page share one upstream fetch.
+        """
+        key = (path, tuple(sorted((k, str(v)) for k, v in params.items())), page, page_size, not_found_ok)
+        return await self.single_flight.do(
+            key, lambda: self._fetch_page(path, params, page, page_size, not_found_ok)
+        )
+    
+    async def _fetch_page(
+        self,
+        path: str,
+        params: Dict[str, Any],
+        page: int,
+        page_size: int,
+        not_found_ok: bool
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        page_params = {**params, "pagination[page]": page, "pagination[pageSize]": page_size}
+        page_params.setdefault("sort", "id:asc")  # stable order across pages
+        try:
+            response = await self._get_client().get(
+                f"{self.base_url}{path}",
+                headers=self._get_headers(),
+                params=page_params
+            )
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            if not_found_ok and e.response.status_code == 404:
+                return [], 1
+            raise
+        
+        data = json_codec.loads(response.content)
+        pagination = (data.get("meta") or {}).get("pagination") or {}
+        return data.get("data", []), int(pagination.get("pageCount", 1) or 1)
+    
+    async def _iter_pages(
+        self,
+        path: str,
+        params: Dict[str, Any],
+        not_found_ok: bool = True,
+        page_size: Optional[int] = None,
+        prefetch: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield the entries of a collection one page at a time, walking pagination[page]
+        
+        The first page gives the page count; later pages are requested up to
+        `prefetch` at a time and yielded in order, so at most
+        prefetch * page_size entries are held in memory.
+        """
+        page_size = page_size or self.page_size
+        prefetch = max(1, prefetch or self.page_prefetch)
+        
+        entries, page_count = await self._get_page(path, params, 1, page_size, not_found_ok)
+        yield entries
+        
+        pending: Deque[asyncio.Task] = deque()
+        next_page = 2
+        try:
+            while next_page <= page_count or pending:
+                while next_page <= page_count and len(pending) < prefetch:
+                    pending.append(asyncio.ensure_future(
+                        self._get_page(path, params, next_page, page_size, not_found_ok)
+                    ))
+                    next_page += 1
+                entries, _ = await pending.popleft()
+                yield entries
+        finally:
+            # Consumer stopped early or a page failed
+            for task in pending:
+                task.cancel()
+    
+    async def _iter_collection(
+        self,
+        path: str,
+        params: Dict[str, Any],
+        not_found_ok: bool = True,
+        page_size: Optional[int] = None,
+        prefetch: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every entry of a collection, page by page"""
+        async for entries in self._iter_pages(path, params, not_found_ok, page_size, prefetch):
+            for entry in entries:
+                yield entry
+    
+    async def _get_collection(
+        self,
+        path: str,
+        params: Dict[str, Any],
+        not_found_ok: bool = True
+    ) -> List[Dict[str, Any]]:
+        """GET every page of a collection endpoint and return the entries"""
+        return [entry async for entry in self._iter_collection(path, params, not_found_ok)]
+    
+    @staticmethod
+    def _query_params(
         filters: Optional[Dict[str, Any]] = None,
         populate: Optional[str] = None,
-        sort: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Fetch pipeline deals from Strapi"""
+        sort: Optional[str] = None,
+        query: Optional[StrapiQuery] = None
+    ) -> Dict[str, Any]:
         params = {}
         if filters:
-            # Convert filters dict to Strapi query format
             for key, value in filters.items():
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
         if sort:
             params["sort"] = sort
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(
-                f"{self.base_url}/pipeline-deals",
-                headers=self._get_headers(),
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("data", [])
+        if query is not None:
+            params.update(query.to_params())
+        return params
+    
+    def iter_collection(
+        self,
+        path: str,
+        filters: Optional[Dict[str, Any]] = None,
+        populate: Optional[str] = None,
+        sort: Optional[str] = None,
+        page_size: Optional[int] = None,
+        updated_since: Optional[str] = None,
+        query: Optional[StrapiQuery] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream entries of any collection (e.g. "/billings") page by page
+        
+        updated_since limits the stream to entries with updatedAt at or after it.
+        """
+        params = self._query_params(filters, populate, sort, query)
+        if updated_since:
+            params["filters[updatedAt][$gte]"] = updated_since
+        return self._iter_collection(path, params, page_size=page_size)
+    
+    def iter_pipeline_deals(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        populate: Optional[str] = None,
+        sort: Optional[str] = None,
+        query: Optional[StrapiQuery] = None,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream pipeline deals from Strapi page by page
+        
+        A StrapiQuery adds server-side filters and field/relation projections.
+        """
+        return self._iter_collection(
+            "/pipeline-deals",
+            self._query_params(filters, populate, sort, query),
+            not_found_ok=False,
+            page_size=page_size
+        )
+    
+    def iter_billings(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        populate: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream billing records from Strapi page by page"""
+        return self.iter_collection("/billings", filters=filters, populate=populate)
+    
+    async def get_pipeline_deals(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        populate: Optional[str] = None,
+        sort: Optional[str] = None,
+        query: Optional[StrapiQuery] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch pipeline deals from Strapi"""
+        # Convert filters dict (and any typed query) to Strapi query format
+        params = self._query_params(filters, populate, sort, query)
+        return await self._get_collection("/pipeline-deals", params, not_found_ok=False)
     
     async def get_forecast_snapshots(
         self,
@@ -58,41 +304,92 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(
-                f"{self.base_url}/forecast-snapshots",
-                headers=self._get_headers(),
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("data", [])
+        
+        return await self._get_collection("/forecast-snapshots", params, not_found_ok=False)
     
     async def create_forecast_snapshot(self, snapshot_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a forecast snapshot in Strapi"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/forecast-snapshots",
+        response = await self._get_client().post(
+            f"{self.base_url}/forecast-snapshots",
+            headers=self._get_headers(),
+            json={"data": snapshot_data}
+        )
+        response.raise_for_status()
+        return json_codec.loads(response.content)
+    
+    async def _post_limited(
+        self,
+        path: str,
+        data: Dict[str, Any],
+        limiter: AdaptiveConcurrencyLimiter
+    ) -> Dict[str, Any]:
+        """POST one entry within the limiter, reporting overload (429/5xx/transport errors)"""
+        started = await limiter.acquire()
+        overloaded = False
+        try:
+            response = await self._get_client().post(
+                f"{self.base_url}{path}",
                 headers=self._get_headers(),
-                json={"data": snapshot_data}
+                json={"data": data}
             )
+            if response.status_code == 429 or response.status_code >= 500:
+                overloaded = True
+                raise StrapiOverloadedError(response.status_code)
             response.raise_for_status()
-            return response.json()
+            return json_codec.loads(response.content)
+        except httpx.TransportError:
+            overloaded = True
+            raise
+        finally:
+            await limiter.release(started, overloaded)
     
     async def bulk_create_snapshots(self, snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Bulk create forecast snapshots"""
-        # Note: Strapi doesn't have native bulk create, so we'll do sequential
-        # In production, you might want to batch these
-        results = []
-        for snapshot in snapshots:
+        """Create forecast snapshots concurrently with adaptive backpressure
+        
+        Strapi has no bulk create endpoint, so entries are POSTed individually
+        by a pool of workers. The AIMD limiter raises concurrency while
+        latency stays flat and halves it on 429/5xx, timeouts or latency
+        spikes; those failures are retried with backoff. Returns counts and
+        one outcome per input snapshot, in input order.
+        """
+        limiter = AdaptiveConcurrencyLimiter(
+            initial=self.bulk_concurrency,
+            max_limit=self.bulk_max_concurrency
+        )
+        outcomes: List[Optional[Dict[str, Any]]] = [None] * len(snapshots)
+        pending = iter(enumerate(snapshots))
+        
+        async def write(index: int, snapshot: Dict[str, Any]) -> None:
+            attempts = 0
+            
+            async def attempt() -> Dict[str, Any]:
+                nonlocal attempts
+                attempts += 1
+                return await self._post_limited("/forecast-snapshots", snapshot, limiter)
+            
             try:
-                result = await self.create_forecast_snapshot(snapshot)
-                results.append(result)
+                result = await retry_async(attempt, config=self.bulk_retry)
+                entry_id = (result.get("data") or {}).get("id") if isinstance(result, dict) else None
+                outcomes[index] = {"index": index, "status": "created", "id": entry_id, "attempts": attempts}
             except Exception as e:
-                # Log error but continue
-                print(f"Error creating snapshot: {e}")
-        return {"created": len(results), "results": results}
+                outcomes[index] = {"index": index, "status": "failed", "error": str(e), "attempts": attempts}
+        
+        async def worker() -> None:
+            for index, snapshot in pending:
+                await write(index, snapshot)
+        
+        # Workers beyond the current limit wait on the limiter, so the pool
+        # size only caps how far concurrency can grow
+        await asyncio.gather(*(worker() for _ in range(min(self.bulk_max_concurrency, len(snapshots)))))
+        self.bulk_concurrency = max(1, int(limiter.limit))
+        
+        created = sum(1 for outcome in outcomes if outcome["status"] == "created")
+        return {
+            "created": created,
+            "failed": len(outcomes) - created,
+            "results": outcomes,
+            "concurrency": limiter.stats()
+        }
     
     async def get_billings(
         self,
@@ -106,21 +403,8 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-                
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/billings",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+        
+        return await self._get_collection("/billings", params)
     
     async def get_clients(
         self,
@@ -134,21 +418,8 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/clients",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+        
+        return await self._get_collection("/clients", params)
     
     async def get_construction_sales(
         self,
@@ -162,21 +433,8 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/construction-sales",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+        
+        return await self._get_collection("/construction-sales", params)
     
     async def get_construction_billings(
         self,
@@ -190,21 +448,8 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/construction-billings",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+        
+        return await self._get_collection("/construction-billings", params)
     
     async def get_loose_furniture_sales(
         self,
@@ -218,21 +463,8 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/loose-furniture-sales",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+        
+        return await self._get_collection("/loose-furniture-sales", params)
     
     async def get_loose_furniture_billings(
         self,
@@ -246,21 +478,8 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/loose-furniture-billings",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+        
+        return await self._get_collection("/loose-furniture-billings", params)
     
     async def get_interior_design_sales(
         self,
@@ -274,21 +493,8 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/interior-design-sales",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+        
+        return await self._get_collection("/interior-design-sales", params)
     
     async def get_interior_design_billings(
         self,
@@ -302,74 +508,102 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        
+        return await self._get_collection("/interior-design-billings", params)
+    
+    async def _fetch_branches(
+        self,
+        fetchers: Dict[str, Callable[[], Awaitable[List[Dict[str, Any]]]]]
+    ) -> Dict[str, Any]:
+        """Run branch fetchers concurrently and merge their results
+        
+        At most fanout_concurrency requests are in flight at once. A failing
+        branch contributes an empty list and an entry under "errors" instead
+        of failing the whole result.
+        """
+        semaphore = asyncio.Semaphore(self.fanout_concurrency)
+        
+        async def fetch(fetcher):
+            async with semaphore:
+                return await fetcher()
+        
+        names = list(fetchers)
+        outcomes = await asyncio.gather(
+            *(fetch(fetchers[name]) for name in names),
+            return_exceptions=True
+        )
+        
+        result: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        total: List[Dict[str, Any]] = []
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, Exception):
+                    raise outcome
+                logger.warning(f"Error fetching {name}: {outcome}")
+                errors[name] = str(outcome) or type(outcome).__name__
+                outcome = []
+            result[name] = outcome
+            total += outcome
+        
+        result["total"] = total
+        result["errors"] = errors
+        return result
+    
+    async def iter_branch_pages(
+        self,
+        paths: Dict[str, str],
+        filters: Optional[Dict[str, Any]] = None,
+        errors: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Stream (branch, page entries) pairs from several collections, one branch after another
+        
+        Nothing is accumulated, so memory stays bounded by the page prefetch.
+        As with _fetch_branches, a failing branch is recorded in `errors`
+        and skipped; pages it yielded before failing have already been sent.
+        """
+        for name, path in paths.items():
             try:
-                response = await client.get(
-                    f"{self.base_url}/interior-design-billings",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+                async for entries in self._iter_pages(path, self._query_params(filters)):
+                    yield name, entries
+            except Exception as e:
+                logger.warning(f"Error fetching {name}: {e}")
+                if errors is not None:
+                    errors[name] = str(e) or type(e).__name__
+    
+    async def iter_branches(
+        self,
+        paths: Dict[str, str],
+        filters: Optional[Dict[str, Any]] = None,
+        errors: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Stream (branch, entry) pairs from several collections, as iter_branch_pages"""
+        async for name, entries in self.iter_branch_pages(paths, filters=filters, errors=errors):
+            for entry in entries:
+                yield name, entry
     
     async def get_all_sales(
         self,
         filters: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, List[Dict[str, Any]]]:
-        """Fetch all sales data from all branches"""
-        try:
-            construction = await self.get_construction_sales(filters=filters)
-            loose_furniture = await self.get_loose_furniture_sales(filters=filters)
-            interior_design = await self.get_interior_design_sales(filters=filters)
-            
-            return {
-                "construction": construction,
-                "loose_furniture": loose_furniture,
-                "interior_design": interior_design,
-                "total": construction + loose_furniture + interior_design
-            }
-        except Exception as e:
-            print(f"Error fetching all sales: {e}")
-            return {
-                "construction": [],
-                "loose_furniture": [],
-                "interior_design": [],
-                "total": []
-            }
+    ) -> Dict[str, Any]:
+        """Fetch all sales data from all branches concurrently"""
+        return await self._fetch_branches({
+            "construction": lambda: self.get_construction_sales(filters=filters),
+            "loose_furniture": lambda: self.get_loose_furniture_sales(filters=filters),
+            "interior_design": lambda: self.get_interior_design_sales(filters=filters)
+        })
     
     async def get_all_billings(
         self,
         filters: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, List[Dict[str, Any]]]:
-        """Fetch all billings data from all branches"""
-        try:
-            general = await self.get_billings(filters=filters)
-            construction = await self.get_construction_billings(filters=filters)
-            loose_furniture = await self.get_loose_furniture_billings(filters=filters)
-            interior_design = await self.get_interior_design_billings(filters=filters)
-            
-            return {
-                "general": general,
-                "construction": construction,
-                "loose_furniture": loose_furniture,
-                "interior_design": interior_design,
-                "total": general + construction + loose_furniture + interior_design
-            }
-        except Exception as e:
-            print(f"Error fetching all billings: {e}")
-            return {
-                "general": [],
-                "construction": [],
-                "loose_furniture": [],
-                "interior_design": [],
-                "total": []
-            }
+    ) -> Dict[str, Any]:
+        """Fetch all billings data from all branches concurrently"""
+        return await self._fetch_branches({
+            "general": lambda: self.get_billings(filters=filters),
+            "construction": lambda: self.get_construction_billings(filters=filters),
+            "loose_furniture": lambda: self.get_loose_furniture_billings(filters=filters),
+            "interior_design": lambda: self.get_interior_design_billings(filters=filters)
+        })
     
     async def get_projects(
         self,
@@ -383,36 +617,26 @@ class StrapiClient:
                 params[f"filters[{key}]"] = value
         if populate:
             params["populate"] = populate
-            
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/projects",
-                    headers=self._get_headers(),
-                    params=params
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("data", [])
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return []
-                raise
+        
+        return await self._get_collection("/projects", params)
     
     async def health_check(self) -> bool:
         """Check if Strapi is accessible"""
+        client = self._get_client()
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                # Try to access the admin endpoint or a simple API endpoint
-                base_url = self.base_url.replace('/api', '')
-                response = await client.get(f"{base_url}/admin", headers=self._get_headers())
-                return response.status_code < 500
+            # Try to access the admin endpoint or a simple API endpoint
+            base_url = self.base_url.replace('/api', '')
+            response = await client.get(f"{base_url}/admin", headers=self._get_headers(), timeout=5.0)
+            return response.status_code < 500
         except:
             # If admin endpoint fails, try a simple API endpoint
             try:
-                async with httpx.AsyncClient(timeout=5.0) as client:
-                    response = await client.get(f"{self.base_url}/clients?pagination[limit]=1", headers=self._get_headers())
-                    return response.status_code < 500
+                response = await client.get(
+                    f"{self.base_url}/clients?pagination[limit]=1",
+                    headers=self._get_headers(),
+                    timeout=5.0
+                )
+                return response.status_code < 500
             except:
                 return False
 
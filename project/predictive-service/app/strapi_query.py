@@ -0,0 +1,140 @@
+"""
+Typed builder for Strapi REST query parameters (filters, fields, populate, sort)
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+def _param(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _comparable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return Decimal(str(value))
+    return value
+
+
+def _matches(actual: Any, operator: str, expected: Any) -> bool:
+    if operator == "$in":
+        return actual in expected or str(actual) in {str(v) for v in expected}
+    if actual is None:
+        return False
+    expected = _comparable(expected)
+    if isinstance(expected, Decimal):
+        # Strapi returns decimal columns as strings in some databases
+        try:
+            actual = Decimal(str(actual))
+        except InvalidOperation:
+            return False
+    else:
+        actual = _comparable(actual)
+    if operator == "$eq":
+        return actual == expected
+    if operator == "$gte":
+        return actual >= expected
+    return actual <= expected
+
+
+class StrapiQuery:
+    """Filters and projections pushed down to Strapi instead of applied after download
+    
+    Methods return the query so they can be chained:
+        
+        StrapiQuery().eq("status", "active").gte("deal_value", 100000).fields("name", "deal_value")
+    
+    The same conditions can be evaluated locally with `matches`, so callers
+    reading the replica get identical results.
+    """
+    
+    def __init__(self):
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.selected_fields: List[str] = []
+        self.populated: Dict[str, Optional[List[str]]] = {}
+        self.sort_keys: List[str] = []
+    
+    def _where(self, field: str, operator: str, value: Any) -> "StrapiQuery":
+        self.filters.append((field, operator, value))
+        return self
+    
+    def eq(self, field: str, value: Any) -> "StrapiQuery":
+        return self._where(field, "$eq", value)
+    
+    def in_(self, field: str, values: Iterable[Any]) -> "StrapiQuery":
+        return self._where(field, "$in", list(values))
+    
+    def gte(self, field: str, value: Any) -> "StrapiQuery":
+        return self._where(field, "$gte", value)
+    
+    def lte(self, field: str, value: Any) -> "StrapiQuery":
+        return self._where(field, "$lte", value)
+    
+    def between(self, field: str, start: Optional[Any] = None, end: Optional[Any] = None) -> "StrapiQuery":
+        """Inclusive range; either bound may be omitted"""
+        if start is not None:
+            self.gte(field, start)
+        if end is not None:
+            self.lte(field, end)
+        return self
+    
+    def fields(self, *names: str) -> "StrapiQuery":
+        """Only return these attributes (plus id); relations are requested with populate"""
+        self.selected_fields.extend(name for name in names if name not in self.selected_fields)
+        return self
+    
+    def populate(self, relation: str, fields: Optional[Sequence[str]] = None) -> "StrapiQuery":
+        """Include a relation, optionally restricted to some of its attributes"""
+        self.populated[relation] = list(fields) if fields is not None else None
+        return self
+    
+    def sort(self, *keys: str) -> "StrapiQuery":
+        self.sort_keys.extend(keys)
+        return self
+    
+    def to_params(self) -> Dict[str, Any]:
+        """Flatten into Strapi's bracketed query-string parameters"""
+        params: Dict[str, Any] = {}
+        for field, operator, value in self.filters:
+            key = "filters" + "".join(f"[{part}]" for part in field.split(".")) + f"[{operator}]"
+            if operator == "$in":
+                for i, item in enumerate(value):
+                    params[f"{key}[{i}]"] = _param(item)
+            else:
+                params[key] = _param(value)
+        for i, name in enumerate(self.selected_fields):
+            params[f"fields[{i}]"] = name
+        for relation, fields in self.populated.items():
+            if fields is None:
+                params[f"populate[{relation}]"] = "true"
+            else:
+                for i, name in enumerate(fields):
+                    params[f"populate[{relation}][fields][{i}]"] = name
+        if self.sort_keys:
+            params["sort"] = ",".join(self.sort_keys)
+        return params
+    
+    def equalities(self) -> Dict[str, Any]:
+        """Top-level $eq conditions, e.g. for the replica's indexed attribute filters"""
+        return {
+            field: value
+            for field, operator, value in self.filters
+            if operator == "$eq" and field != "id" and "." not in field
+        }
+    
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        """Evaluate the filters against an entry ({"id": ..., "attributes": {...}})"""
+        attributes = entry.get("attributes", {})
+        for field, operator, value in self.filters:
+            actual: Any = entry.get("id") if field == "id" else attributes
+            if field != "id":
+                for part in field.split("."):
+                    actual = actual.get(part) if isinstance(actual, dict) else None
+            if not _matches(actual, operator, value):
+                return False
+        return True
@@ -0,0 +1,76 @@
+"""
+Incremental NDJSON / JSON encoding for streamed responses
+"""
+from typing import Any, AsyncIterator, Dict
+
+from app import json_codec
+
+# Encoded rows are sent in chunks of about this size rather than one write per row
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Yielded by a row source to send everything encoded so far, e.g. at the end of an upstream page
+FLUSH = object()
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json"
+}
+
+
+async def _chunked(parts: AsyncIterator[bytes], chunk_bytes: int) -> AsyncIterator[bytes]:
+    """Join parts into chunks of about chunk_bytes
+    
+    The first part is sent on its own so the client sees the response start
+    at once; an empty part (from FLUSH) sends whatever is buffered.
+    """
+    buffer = bytearray()
+    started = False
+    async for part in parts:
+        buffer += part
+        if buffer and (not started or not part or len(buffer) >= chunk_bytes):
+            yield bytes(buffer)
+            buffer.clear()
+            started = True
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _ndjson_parts(rows: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield b"" if row is FLUSH else json_codec.dumps(row) + b"\n"
+
+
+async def _json_document_parts(rows: AsyncIterator[Any], summary: Dict[str, Any]) -> AsyncIterator[bytes]:
+    separator = b""
+    yield b'{"data":['
+    async for row in rows:
+        if row is FLUSH:
+            yield b""
+            continue
+        yield separator + json_codec.dumps(row)
+        separator = b","
+    # The summary is complete once every row has been produced
+    yield b'],"summary":' + json_codec.dumps(summary) + b"}"
+
+
+def ndjson_stream(rows: AsyncIterator[Any], chunk_bytes: int = STREAM_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """Encode rows as newline-delimited JSON, one row per line
+    
+    The first row is sent immediately; after that rows are sent in chunks
+    of about chunk_bytes, or earlier when the row source yields FLUSH.
+    """
+    return _chunked(_ndjson_parts(rows), chunk_bytes)
+
+
+def json_document_stream(
+    rows: AsyncIterator[Any],
+    summary: Dict[str, Any],
+    chunk_bytes: int = STREAM_CHUNK_BYTES
+) -> AsyncIterator[bytes]:
+    """Encode rows as {"data": [...], "summary": {...}}
+    
+    `summary` is written last, so the row producer can keep filling it in
+    (counts, failures) while rows are streamed. The opening of the document
+    is sent immediately and rows are chunked as in ndjson_stream.
+    """
+    return _chunked(_json_document_parts(rows, summary), chunk_bytes)
@@ -4,16 +4,31 @@ Webhook handler for Strapi events
 import hmac
 import hashlib
 import json
-from typing import Dict, Any, Optional
-from fastapi import Request, HTTPException, Header
+from typing import Dict, Any, List, Optional
+from fastapi import Request, HTTPException
 from app.strapi_client import StrapiClient
 from app.forecast_service import ForecastService
 from app.probability_model import ProbabilityModel
+from app.replica_store import REPLICATED_COLLECTIONS
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Strapi webhook entity (model uid) -> replicated collection
+WEBHOOK_COLLECTIONS = {
+    "pipeline-deal": "pipeline-deals",
+    "billing": "billings",
+    "client": "clients",
+    "project": "projects",
+    "construction-sale": "construction-sales",
+    "construction-billing": "construction-billings",
+    "loose-furniture-sale": "loose-furniture-sales",
+    "loose-furniture-billing": "loose-furniture-billings",
+    "interior-design-sale": "interior-design-sales",
+    "interior-design-billing": "interior-design-billings",
+}
+
 class WebhookHandler:
     def __init__(self, strapi_client: StrapiClient, forecast_service: ForecastService):
         self.strapi = strapi_client
@@ -37,11 +52,15 @@ class WebhookHandler:
     async def handle_webhook(
         self,
         request: Request,
-        x_strapi_event: Optional[str] = Header(None),
-        x_strapi_entity: Optional[str] = Header(None),
-        x_strapi_signature: Optional[str] = Header(None)
+        x_strapi_event: Optional[str] = None,
+        x_strapi_entity: Optional[str] = None,
+        x_strapi_signature: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Handle incoming webhook from Strapi"""
+        """Handle incoming webhook from Strapi
+        
+        Headers are passed in by the route; the payload's event and model
+        are used when the X-Strapi-* headers are absent.
+        """
         try:
             # Read raw body for signature verification
             body = await request.body()
@@ -55,20 +74,23 @@ class WebhookHandler:
             # Parse JSON payload
             payload = json.loads(body.decode())
             event = x_strapi_event or payload.get("event")
-            entity = x_strapi_entity or payload.get("entity")
+            entity = x_strapi_entity or payload.get("entity") or payload.get("model")
             
             logger.info(f"Received webhook: {event} for {entity}")
             
             # Handle different event types
+            collection = WEBHOOK_COLLECTIONS.get(entity)
             if event == "entry.create" or event == "entry.update":
                 if entity == "pipeline-deal":
                     return await self._handle_deal_change(payload)
-                elif entity == "billing":
-                    return await self._handle_billing_change(payload)
+                elif collection:
+                    return await self._handle_entry_change(collection, payload)
             
             elif event == "entry.delete":
                 if entity == "pipeline-deal":
                     return await self._handle_deal_delete(payload)
+                elif collection:
+                    return await self._handle_entry_delete(collection, payload)
             
             return {
                 "status": "processed",
@@ -76,7 +98,7 @@ class WebhookHandler:
                 "entity": entity,
                 "message": "Event processed but no action taken"
             }
-            
+        
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON in webhook payload: {e}")
             raise HTTPException(status_code=400, detail="Invalid JSON payload")
@@ -84,8 +106,17 @@ class WebhookHandler:
             logger.error(f"Error processing webhook: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Error processing webhook: {str(e)}")
     
+    @staticmethod
+    def _entry_to_record(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a flat webhook entry into the {"id", "attributes"} shape of the REST API"""
+        return {"id": entry.get("id"), "attributes": {k: v for k, v in entry.items() if k != "id"}}
+    
     async def _handle_deal_change(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle pipeline deal create/update"""
+        """Handle pipeline deal create/update
+        
+        The changed deal is written to the replica and only the forecast months
+        covered by its old and new recognition windows are patched.
+        """
         entry = payload.get("entry", {})
         deal_id = entry.get("id")
         
@@ -94,22 +125,28 @@ class WebhookHandler:
         
         logger.info(f"Processing deal change for deal ID: {deal_id}")
         
-        # Trigger forecast recompute for this deal
-        # In production, this would be more sophisticated
         try:
-            # Fetch updated deal
-            deals = await self.strapi.get_pipeline_deals(filters={"id": deal_id})
+            # Fetch the updated deal with the relations the replica keeps;
+            # fall back to the webhook entry if Strapi cannot be reached
+            try:
+                deals = await self.strapi.get_pipeline_deals(
+                    filters={"id": deal_id},
+                    populate=REPLICATED_COLLECTIONS["pipeline-deals"]
+                )
+            except Exception as e:
+                logger.warning(f"Could not fetch deal {deal_id}, using webhook entry: {e}")
+                deals = [self._entry_to_record(entry)]
             if not deals:
                 return {"status": "skipped", "reason": "Deal not found"}
+            deal = deals[0]
             
-            # For now, just log the change
-            # In production, this would trigger a forecast recompute
-            logger.info(f"Deal {deal_id} changed, forecast recompute would be triggered")
+            months_touched = self._apply_to_replica("pipeline-deals", deal_id, deal)
             
             return {
                 "status": "processed",
                 "deal_id": deal_id,
-                "action": "forecast_recompute_queued"
+                "action": "forecast_patched" if months_touched is not None else "replica_updated",
+                "months_touched": [m.isoformat() for m in months_touched or []]
             }
         except Exception as e:
             logger.error(f"Error handling deal change: {e}")
@@ -119,19 +156,21 @@ class WebhookHandler:
                 "error": str(e)
             }
     
-    async def _handle_billing_change(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle billing create/update"""
+    async def _handle_entry_change(self, collection: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle create/update of other replicated entities (billings, sales, ...)"""
         entry = payload.get("entry", {})
-        billing_id = entry.get("id")
+        entry_id = entry.get("id")
         
-        logger.info(f"Processing billing change for billing ID: {billing_id}")
+        logger.info(f"Processing {collection} change for ID: {entry_id}")
+        
+        if entry_id and self.forecast_service.replica is not None:
+            self.forecast_service.replica.upsert(collection, [self._entry_to_record(entry)])
         
-        # Billing changes might affect historical data used for calibration
-        # In production, this would trigger calibration update
         return {
             "status": "processed",
-            "billing_id": billing_id,
-            "action": "calibration_update_queued"
+            "entity_id": entry_id,
+            "collection": collection,
+            "action": "replica_updated"
         }
     
     async def _handle_deal_delete(self, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -141,13 +180,53 @@ class WebhookHandler:
         
         logger.info(f"Processing deal delete for deal ID: {deal_id}")
         
-        # Remove forecast snapshots for deleted deal
-        # In production, this would clean up related data
+        if not deal_id:
+            return {"status": "skipped", "reason": "No deal ID in payload"}
+        
+        months_touched = self._apply_to_replica("pipeline-deals", deal_id, None)
+        
         return {
             "status": "processed",
             "deal_id": deal_id,
-            "action": "cleanup_queued"
+            "action": "forecast_patched" if months_touched is not None else "replica_updated",
+            "months_touched": [m.isoformat() for m in months_touched or []]
         }
+    
+    async def _handle_entry_delete(self, collection: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle delete of other replicated entities"""
+        entry_id = payload.get("entry", {}).get("id")
+        
+        if entry_id and self.forecast_service.replica is not None:
+            self.forecast_service.replica.delete(collection, [entry_id])
+        
+        return {
+            "status": "processed",
+            "entity_id": entry_id,
+            "collection": collection,
+            "action": "replica_updated"
+        }
+    
+    def _apply_to_replica(
+        self,
+        collection: str,
+        entry_id: Any,
+        record: Optional[Dict[str, Any]]
+    ) -> Optional[List[Any]]:
+        """Write (or delete, when record is None) a deal in the replica and patch forecasts
+        
+        Returns the patched months, or None when no forecast aggregate is cached.
+        """
+        replica = self.forecast_service.replica
+        if replica is not None:
+            if record is not None:
+                replica.upsert(collection, [record])
+            else:
+                replica.delete(collection, [entry_id])
+        
+        return self.forecast_service.apply_deal_change(
+            entry_id,
+            record.get("attributes") if record else None
+        )
 
 
 
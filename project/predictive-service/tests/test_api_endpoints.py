@@ -1,6 +1,7 @@
 """
 Tests for API endpoints
 """
+import json
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -56,6 +57,19 @@ class TestForecastEndpoints:
             assert "heatmap" in data
             assert "top_risks" in data
             assert "summary" in data
+    
+    def test_forecast_run_is_queued(self):
+        """Test that a recompute is accepted as a job and queryable by id"""
+        response = client.post("/api/v1/models/forecast/run", json={"write_snapshots": False})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] in ["queued", "running", "completed", "failed"]
+        
+        status = client.get(f"/api/v1/models/forecast/run/{job['job_id']}")
+        assert status.status_code == 200
+        assert status.json()["job_id"] == job["job_id"]
+        
+        assert client.get("/api/v1/models/forecast/run/unknown").status_code == 404
 
 
 class TestWebhookEndpoints:
@@ -67,6 +81,28 @@ class TestWebhookEndpoints:
         assert response.status_code != 404
 
 
+class TestDataEndpoints:
+    def test_stream_all_billings(self):
+        """Test streamed billings in NDJSON and JSON document form"""
+        response = client.get("/api/v1/data/billings/all/stream")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        # Every line is a JSON object (entries, or per-branch errors without Strapi)
+        assert all("branch" in json.loads(line) for line in response.text.splitlines())
+        
+        response = client.get("/api/v1/data/billings/all/stream", params={"format": "json"})
+        assert response.status_code == 200
+        assert set(response.json()) == {"data", "summary"}
+        
+        assert client.get("/api/v1/data/billings/all/stream", params={"format": "csv"}).status_code == 422
+    
+    def test_stream_rejects_non_json_filters(self):
+        """Test that stream filters must be a JSON object and are never evaluated"""
+        for filters in ("__import__('os').getcwd()", "[1, 2]", "{'status': 'Closed'}"):
+            response = client.get("/api/v1/data/sales/all/stream", params={"filters": filters})
+            assert response.status_code == 422
+
+
 class TestAlertEndpoints:
     def test_get_alerts(self):
         """Test alerts endpoint"""
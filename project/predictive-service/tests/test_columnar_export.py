@@ -0,0 +1,164 @@
+"""
+Tests for Arrow IPC / Parquet export
+"""
+import io
+import httpx
+import pytest
+from datetime import date
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from app import columnar_export, main
+from app.columnar_export import (
+    BatchWriter,
+    billings_batch,
+    deal_table_to_arrow,
+    forecast_to_arrow,
+    iter_table,
+    sales_batch,
+    sample_paths_to_arrow
+)
+from app.deal_table import DealTable
+from app.monte_carlo import MonteCarloSimulation
+from app.records import BillingRecord, SaleRecord
+from app.strapi_client import StrapiClient
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+
+client = TestClient(main.app)
+
+DEALS = [
+    {
+        "id": 1,
+        "attributes": {
+            "stage": "negotiation",
+            "deal_value": "100000",
+            "probability": 60,
+            "last_activity_at": "2025-01-10T00:00:00Z",
+            "expected_close_date": "2025-01-15",
+            "recognition_start_month": "2025-02-01",
+            "recognition_end_month": "2025-03-01",
+            "risk_flags": {"data": [{"attributes": {"severity": "high"}}]}
+        }
+    },
+    {
+        "id": 2,
+        "attributes": {
+            "stage": "proposal",
+            "deal_value": 50000,
+            "expected_close_date": "2025-02-10"
+        }
+    }
+]
+
+
+def _read_stream(body):
+    return pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+
+
+def _sales_transport(failing=()):
+    """Two sales per branch collection; collections in `failing` answer 500"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        collection = request.url.path.rsplit("/", 1)[-1]
+        if collection in failing:
+            return httpx.Response(500)
+        data = [
+            {"id": i, "attributes": {"client": collection, "status": "Closed", "sale_amount": "100.5",
+                                     "sale_date": "2025-01-05"}}
+            for i in (1, 2)
+        ]
+        return httpx.Response(200, json={"data": data, "meta": {"pagination": {"pageCount": 1}}})
+    return httpx.MockTransport(handler)
+
+
+class TestColumnarExport:
+    def test_deal_table_round_trip(self):
+        """Test that deal columns, nulls and dictionary-encoded stages survive Arrow IPC"""
+        table = _read_stream(b"".join(iter_table(deal_table_to_arrow(DealTable.from_deals(DEALS)), "arrow")))
+        
+        assert table.column("id").to_pylist() == [1, 2]
+        assert table.column("stage").to_pylist() == ["negotiation", "proposal"]
+        assert pa.types.is_dictionary(table.schema.field("stage").type)
+        assert table.column("deal_value").to_pylist() == [100000.0, 50000.0]
+        assert table.column("probability").to_pylist()[1] is None
+        assert table.column("high_risk").to_pylist() == [True, False]
+        assert table.column("last_activity_at").to_pylist()[0].year == 2025
+        assert table.column("last_activity_at").to_pylist()[1] is None
+    
+    def test_records_keep_exact_amounts(self):
+        """Test that sale and billing amounts are exported as decimals"""
+        sales = sales_batch([
+            ("construction", SaleRecord(id=1, client="A", status="Closed", amount=Decimal("1234.565"),
+                                        sale_date=date(2025, 1, 5)))
+        ])
+        assert sales.column("amount").to_pylist() == [Decimal("1234.56")]
+        assert sales.column("branch").to_pylist() == ["construction"]
+        
+        billings = billings_batch([
+            ("construction", BillingRecord(id=7, deal_id=1, amount=Decimal("10.10"), month_index=None)),
+            ("construction", BillingRecord.from_entry({
+                "id": 8, "attributes": {"amount": "5", "month": 3, "year": 2025, "collected_date": "2025-03-20"}
+            }))
+        ])
+        assert billings.column("month").to_pylist() == [None, date(2025, 3, 1)]
+        assert billings.column("collected").to_pylist() == [False, True]
+        assert billings.column("amount").to_pylist() == [Decimal("10.10"), Decimal("5.00")]
+    
+    def test_sample_paths_and_parquet(self):
+        """Test that sample paths have one row per iteration and survive Parquet"""
+        sim = MonteCarloSimulation(seed=42)
+        months, paths = sim.sample_paths(DEALS, date(2025, 1, 1), date(2025, 3, 1), iterations=200)
+        
+        chunks = list(iter_table(sample_paths_to_arrow(months, paths), "parquet", batch_rows=64))
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+        table = parquet.read()
+        
+        # Header, one chunk per row group, then the footer
+        assert len(chunks) == 6 and parquet.num_row_groups == 4
+        assert table.num_rows == 200
+        assert table.column_names == ["iteration"] + [month.isoformat() for month in months] + ["total"]
+        totals = table.column("total").to_numpy()
+        assert totals == pytest.approx(sum(table.column(month.isoformat()).to_numpy() for month in months))
+    
+    def test_forecast_and_unknown_format(self):
+        """Test forecast monthly totals export and that unknown formats are rejected"""
+        table = forecast_to_arrow({"forecast": {"monthly_totals": [
+            {"month": "2025-01-01", "confirmed": 10.0, "tentative": 5.0, "total": 15.0}
+        ]}})
+        assert table.column("month").to_pylist() == [date(2025, 1, 1)]
+        assert table.column("total").to_pylist() == [15.0]
+        
+        with pytest.raises(ValueError):
+            BatchWriter(table.schema, "csv")
+    
+    def test_export_endpoints(self, monkeypatch):
+        """Test streamed exports across record batches, and 501 when pyarrow is not installed"""
+        monkeypatch.setattr(main, "strapi_client", StrapiClient(transport=_sales_transport()))
+        monkeypatch.setattr(main, "RECORD_BATCH_ROWS", 4)
+        
+        response = client.get("/api/v1/export/sales")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+        table = _read_stream(response.content)
+        assert table.num_rows == 6
+        branches = ["construction", "loose_furniture", "interior_design"]
+        assert table.column("branch").to_pylist() == [branch for branch in branches for _ in (1, 2)]
+        assert table.column("amount").to_pylist() == [Decimal("100.50")] * 6
+        
+        response = client.get("/api/v1/export/sales", params={"format": "parquet"})
+        assert pq.ParquetFile(io.BytesIO(response.content)).num_row_groups == 2
+        
+        assert client.get("/api/v1/export/sales", params={"format": "csv"}).status_code == 422
+        assert client.get("/api/v1/export/sales", params={"filters": "__import__('os')"}).status_code == 422
+        
+        monkeypatch.setattr(columnar_export, "pa", None)
+        assert client.get("/api/v1/export/billings", params={"format": "parquet"}).status_code == 501
+    
+    def test_failed_branch_fails_export(self, monkeypatch):
+        """Test that a branch failing before the first batch is written gives a 502"""
+        transport = _sales_transport(failing=("interior-design-sales",))
+        monkeypatch.setattr(main, "strapi_client", StrapiClient(transport=transport))
+        
+        response = client.get("/api/v1/export/sales")
+        assert response.status_code == 502
+        assert "interior_design" in response.json()["detail"]
@@ -0,0 +1,141 @@
+"""
+Tests for per-deal monthly forecast aggregates
+"""
+import random
+from datetime import date
+from decimal import Decimal
+import pytest
+from app.forecast_aggregate import MonthlyForecastAggregate, make_aggregation_backend
+from app.forecast_service import ForecastService
+from app.records import DealRecord
+
+
+def _attrs(value, probability, start, end):
+    return DealRecord.from_attributes(None, {
+        "deal_value": value,
+        "probability": probability,
+        "recognition_start_month": start,
+        "recognition_end_month": end
+    })
+
+
+def _expand(recognitions):
+    for first, last, tier, amount in recognitions:
+        for index in range(first, last + 1):
+            yield date(index // 12, index % 12 + 1, 1), tier, amount
+
+
+def _brute_force(deals, start_month, end_month):
+    confirmed = tentative = Decimal(0)
+    months = {}
+    for attrs in deals.values():
+        for month, tier, amount in _expand(ForecastService._deal_contributions(attrs)):
+            if start_month <= month <= end_month:
+                months[month] = months.get(month, Decimal(0)) + amount
+                if tier == "confirmed":
+                    confirmed += amount
+                else:
+                    tentative += amount
+    return confirmed, tentative, months
+
+
+class TestMonthlyForecastAggregate:
+    def test_window_matches_full_recompute_after_updates(self):
+        """Test that add/update/remove keep window queries equal to a recompute"""
+        rng = random.Random(7)
+        aggregate = MonthlyForecastAggregate()
+        deals = {}
+        
+        for step in range(300):
+            deal_id = rng.randrange(40)
+            if rng.random() < 0.2:
+                deals.pop(deal_id, None)
+                aggregate.remove_deal(deal_id)
+                continue
+            start = date(2024 + rng.randrange(2), rng.randrange(1, 13), 1)
+            end = date(start.year + rng.randrange(2), rng.randrange(1, 13), 1)
+            deals[deal_id] = _attrs(rng.randrange(1, 10**6), rng.randrange(0, 101), start.isoformat(), end.isoformat())
+            aggregate.upsert_deal(deal_id, ForecastService._deal_contributions(deals[deal_id]))
+        
+        for start_month, end_month in [(date(2024, 1, 1), date(2026, 12, 1)), (date(2024, 6, 15), date(2025, 3, 1))]:
+            window = aggregate.window(start_month, end_month)
+            confirmed, tentative, months = _brute_force(deals, start_month, end_month)
+            
+            assert abs(window["confirmed"] - confirmed) < Decimal("1e-12")
+            assert abs(window["tentative"] - tentative) < Decimal("1e-12")
+            assert [m["month"] for m in window["months"]] == sorted(months)
+            assert all(abs(m["total"] - months[m["month"]]) < Decimal("1e-12") for m in window["months"])
+    
+    def test_update_reports_old_and_new_months(self):
+        """Test that moving a deal touches both its old and new recognition windows"""
+        aggregate = MonthlyForecastAggregate()
+        aggregate.upsert_deal(1, ForecastService._deal_contributions(_attrs(1200, 50, "2024-01-01", "2024-02-01")))
+        
+        touched = aggregate.upsert_deal(1, ForecastService._deal_contributions(_attrs(1200, 50, "2024-02-01", "2024-03-01")))
+        
+        assert touched == [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)]
+        assert [m["month"] for m in aggregate.window(date(2024, 1, 1), date(2024, 12, 1))["months"]] == [
+            date(2024, 2, 1), date(2024, 3, 1)
+        ]
+        assert aggregate.remove_deal(1) == [date(2024, 2, 1), date(2024, 3, 1)]
+        assert aggregate.window(date(2024, 1, 1), date(2024, 12, 1))["months"] == []
+
+
+def _golden_book(size=3000, seed=2024):
+    """Deterministic book with awkward values: odd cents, fractional probabilities, long windows"""
+    rng = random.Random(seed)
+    deals = {}
+    for deal_id in range(size):
+        start = date(2023 + rng.randrange(4), rng.randrange(1, 13), 1)
+        months = rng.randrange(1, 61)
+        end = date(start.year + (start.month - 1 + months) // 12, (start.month - 1 + months) % 12 + 1, 1)
+        value = rng.choice([rng.randrange(1, 10**9), round(rng.uniform(100, 5 * 10**7), 2), str(rng.randrange(10**7)) + ".07"])
+        probability = rng.choice([0, 10, 33.3, 50, 62.5, 74.99, 75, 90, 100])
+        deals[deal_id] = _attrs(value, probability, start.isoformat(), end.isoformat())
+    return deals
+
+
+def _formatted(backend_name, deals, start_month, end_month):
+    backend = make_aggregation_backend(backend_name)
+    aggregate = MonthlyForecastAggregate(backend)
+    for deal_id, attrs in deals.items():
+        aggregate.add_deal(deal_id, ForecastService._deal_contributions(attrs, backend))
+    window = aggregate.window(start_month, end_month)
+    return (
+        {m["month"]: (backend.to_float(m["confirmed"]), backend.to_float(m["tentative"], Decimal("0.75"))) for m in window["months"]},
+        (backend.to_float(window["confirmed"]), backend.to_float(window["tentative"]))
+    )
+
+
+class TestAggregationBackends:
+    @pytest.mark.parametrize("backend_name", ["float", "fixed"])
+    def test_matches_decimal_to_the_cent_on_golden_book(self, backend_name):
+        """Test that fast backends reproduce the Decimal monthly and summary totals to the cent"""
+        deals = _golden_book()
+        
+        for start_month, end_month in [(date(2023, 1, 1), date(2030, 12, 1)), (date(2025, 3, 15), date(2026, 2, 1))]:
+            expected_months, expected_totals = _formatted("decimal", deals, start_month, end_month)
+            months, totals = _formatted(backend_name, deals, start_month, end_month)
+            
+            assert months.keys() == expected_months.keys()
+            for month, values in months.items():
+                assert [round(v, 2) for v in values] == [round(v, 2) for v in expected_months[month]]
+            assert [round(v, 2) for v in totals] == [round(v, 2) for v in expected_totals]
+    
+    def test_fixed_point_patches_do_not_drift(self):
+        """Test that fixed-point totals return exactly to zero after adding and removing every deal"""
+        backend = make_aggregation_backend("fixed")
+        aggregate = MonthlyForecastAggregate(backend)
+        deals = _golden_book(size=200)
+        for deal_id, attrs in deals.items():
+            aggregate.upsert_deal(deal_id, ForecastService._deal_contributions(attrs, backend))
+        for deal_id in deals:
+            aggregate.remove_deal(deal_id)
+        
+        window = aggregate.window(date(2020, 1, 1), date(2035, 1, 1))
+        assert window == {"months": [], "confirmed": 0, "tentative": 0}
+    
+    def test_unknown_backend_rejected(self):
+        """Test that an unknown backend name raises a ValueError"""
+        with pytest.raises(ValueError):
+            make_aggregation_backend("bigfloat")
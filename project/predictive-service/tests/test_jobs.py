@@ -0,0 +1,141 @@
+"""
+Tests for the background job queue and snapshot recompute
+"""
+import asyncio
+import json
+import httpx
+from app.forecast_service import ForecastService
+from app.jobs import JobQueue
+from app.replica_store import ReplicaStore
+from app.strapi_client import StrapiClient
+
+
+class TestJobQueue:
+    def test_job_runs_in_background_with_progress(self):
+        """Test that submit returns immediately and the worker records progress and result"""
+        queue = JobQueue(workers=2)
+        
+        async def work(job):
+            for step in range(3):
+                job.update_progress(deals_processed=step + 1)
+                await asyncio.sleep(0)
+            return {"deals_processed": 3}
+        
+        async def run():
+            job = queue.submit("recompute", work)
+            status_on_submit = job.status
+            await queue.join()
+            await queue.stop()
+            return job, status_on_submit
+        
+        job, status_on_submit = asyncio.run(run())
+        
+        assert status_on_submit == "queued"
+        assert job.status == "completed"
+        assert job.progress == {"deals_processed": 3}
+        assert job.result == {"deals_processed": 3}
+        assert job.started_at and job.completed_at and job.execution_time_ms is not None
+    
+    def test_failures_are_recorded_and_do_not_stop_workers(self):
+        """Test that a failing job is marked failed and later jobs still run"""
+        queue = JobQueue()
+        
+        async def fail(job):
+            raise RuntimeError("strapi unavailable")
+        
+        async def succeed(job):
+            return {}
+        
+        async def run():
+            failed = queue.submit("recompute", fail)
+            ok = queue.submit("recompute", succeed)
+            await queue.join()
+            await queue.stop()
+            return failed, ok
+        
+        failed, ok = asyncio.run(run())
+        
+        assert failed.status == "failed" and failed.error == "strapi unavailable"
+        assert ok.status == "completed"
+        assert queue.stats()["jobs"] == {"queued": 0, "running": 0, "completed": 1, "failed": 1}
+    
+    def test_backlog_is_bounded(self):
+        """Test that submitting past max_queued raises QueueFull"""
+        queue = JobQueue(max_queued=1)
+        
+        async def work(job):
+            return {}
+        
+        async def run():
+            queue.submit("recompute", work)
+            try:
+                queue.submit("recompute", work)
+            except asyncio.QueueFull:
+                return True
+            finally:
+                await queue.stop()
+            return False
+        
+        assert asyncio.run(run())
+    
+    def test_find_active_matches_kind_and_params(self):
+        """Test that identical queued jobs can be found for reuse"""
+        queue = JobQueue()
+        
+        async def work(job):
+            return {}
+        
+        async def run():
+            job = queue.submit("recompute", work, {"write_snapshots": True})
+            found = queue.find_active("recompute", {"write_snapshots": True})
+            other = queue.find_active("recompute", {"write_snapshots": False})
+            await queue.stop()
+            return job, found, other
+        
+        job, found, other = asyncio.run(run())
+        
+        assert found is job
+        assert other is None
+
+
+class TestRecomputeSnapshots:
+    def test_snapshots_written_per_deal_month_in_batches(self):
+        """Test that each deal month becomes one snapshot and writes are batched"""
+        posted = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            posted.append(json.loads(request.content)["data"])
+            return httpx.Response(200, json={"data": {"id": len(posted)}})
+        
+        replica = ReplicaStore()
+        replica.upsert("pipeline-deals", [
+            {"id": 1, "attributes": {"status": "active", "deal_value": 1200, "probability": 50,
+                                     "recognition_start_month": "2024-11-01", "recognition_end_month": "2025-01-01"}},
+            {"id": 2, "attributes": {"status": "active", "deal_value": 500, "probability": 90,
+                                     "recognition_start_month": "2024-01-01", "recognition_end_month": "2024-01-01"}},
+            {"id": 3, "attributes": {"status": "lost", "deal_value": 900, "probability": 0,
+                                     "recognition_start_month": "2024-01-01", "recognition_end_month": "2024-12-01"}}
+        ])
+        replica._mark_synced("pipeline-deals", None)
+        strapi = StrapiClient(transport=httpx.MockTransport(handler))
+        service = ForecastService(strapi, replica)
+        progress = []
+        
+        async def run():
+            try:
+                return await service.recompute_snapshots(
+                    "job1",
+                    scenario_overrides={"deal_id": 2, "probability_override": 0.6},
+                    batch_size=3,
+                    progress=lambda **counts: progress.append(counts)
+                )
+            finally:
+                await strapi.aclose()
+        
+        counts = asyncio.run(run())
+        
+        assert counts == {"deals_processed": 2, "snapshots_computed": 4, "snapshots_created": 4, "snapshots_failed": 0}
+        assert [s["expected_month"] for s in posted] == ["2024-11-01", "2024-12-01", "2025-01-01", "2024-01-01"]
+        assert posted[0]["snapshot_id"] == "job1-1-2024-11" and posted[0]["expected_amount"] == 200.0
+        assert posted[3]["probability"] == 60.0 and posted[3]["expected_amount"] == 300.0
+        assert progress[-1] == counts
@@ -0,0 +1,60 @@
+"""
+Tests for the JSON codec
+"""
+from datetime import date, datetime
+from decimal import Decimal
+import numpy as np
+import pytest
+from fastapi.encoders import jsonable_encoder
+from app.json_codec import JSON_CODECS, FastJSONResponse, make_json_codec
+
+
+def _available_codecs():
+    codecs = []
+    for name in JSON_CODECS:
+        try:
+            codecs.append(make_json_codec(name))
+        except ValueError:
+            pass  # optional package not installed
+    return codecs
+
+
+PAYLOAD = {
+    "month": date(2024, 3, 1),
+    "generated_at": datetime(2024, 3, 1, 12, 30, 5, 123456),
+    "whole": Decimal("1200"),
+    "fraction": Decimal("1200.75"),
+    "values": np.array([1.5, 2.0]),
+    "count": np.int64(3),
+    "rows": [{"id": 1, "name": "ไทย"}]
+}
+
+
+class TestJSONCodec:
+    @pytest.mark.parametrize("codec", _available_codecs(), ids=lambda codec: codec.name)
+    def test_encodes_like_jsonable_encoder(self, codec):
+        """Test that every available codec decodes back to what FastAPI's encoder would produce"""
+        expected = jsonable_encoder({**PAYLOAD, "values": [1.5, 2.0], "count": 3})
+        
+        assert codec.loads(codec.dumps(PAYLOAD)) == expected
+        assert codec.loads(b'{"data": [{"id": 1}]}') == {"data": [{"id": 1}]}
+        with pytest.raises(ValueError):
+            codec.loads(b"{not json")
+    
+    def test_auto_falls_back_to_stdlib(self, monkeypatch):
+        """Test that auto picks the standard library when neither package is installed"""
+        monkeypatch.setattr("app.json_codec.orjson", None)
+        monkeypatch.setattr("app.json_codec.msgspec", None)
+        
+        assert make_json_codec("auto").name == "stdlib"
+        with pytest.raises(ValueError):
+            make_json_codec("orjson")
+        with pytest.raises(ValueError):
+            make_json_codec("yaml")
+    
+    def test_response_renders_decimals_and_dates(self):
+        """Test that the response class serializes non-JSON types without jsonable_encoder"""
+        response = FastJSONResponse({"month": date(2024, 1, 1), "total": Decimal("10.5")})
+        
+        assert response.media_type == "application/json"
+        assert response.body.replace(b" ", b"") == b'{"month":"2024-01-01","total":10.5}'
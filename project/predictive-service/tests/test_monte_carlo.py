@@ -1,6 +1,7 @@
 """
 Tests for Monte Carlo simulation
 """
+import numpy as np
 import pytest
 from decimal import Decimal
 from app.monte_carlo import MonteCarloSimulation
@@ -75,8 +76,261 @@ class TestMonteCarloSimulation:
         sim = MonteCarloSimulation()
         
         assert sim._percentile([], 50) == 0.0
-
-
-
-
-
+    
+    
+    
+    
+    
+    
+    def test_portfolio_is_reproducible_with_seed(self):
+        """Test that a fixed seed reproduces the same portfolio result"""
+        deals = [
+            {"attributes": {"deal_value": 100000, "probability": 30}},
+            {"attributes": {"deal_value": 250000, "probability": 60}},
+            {"attributes": {"deal_value": 50000, "probability": 90}}
+        ]
+        
+        first = MonteCarloSimulation(seed=7).simulate_portfolio(deals, iterations=5000)
+        second = MonteCarloSimulation(seed=7).simulate_portfolio(deals, iterations=5000)
+        
+        assert first == second
+    
+    def test_portfolio_matches_expected_moments(self):
+        """Test that the array engine converges to the analytic mean and variance"""
+        deals = [
+            {"attributes": {"deal_value": 1000 * (i + 1), "probability": 10 + (i * 7) % 85}}
+            for i in range(50)
+        ]
+        values = [1000 * (i + 1) for i in range(50)]
+        probs = [(10 + (i * 7) % 85) / 100 for i in range(50)]
+        expected_mean = sum(v * p for v, p in zip(values, probs))
+        expected_std = sum(v * v * p * (1 - p) for v, p in zip(values, probs)) ** 0.5
+        
+        # Small chunk budget forces several chunks per run
+        sim = MonteCarloSimulation(seed=42, max_draws_per_chunk=10000)
+        result = sim.simulate_portfolio(deals, iterations=20000)
+        
+        assert abs(result["expected_value"] - expected_mean) < 4 * expected_std / (20000 ** 0.5)
+        assert abs(result["std_dev"] - expected_std) < expected_std * 0.05
+        assert result["min"] <= result["confidence_intervals"]["95"][0]
+        assert result["confidence_intervals"]["95"][1] <= result["max"]
+    
+    def test_portfolio_uses_probability_model(self):
+        """Test that model probabilities are used when a model is supplied"""
+        from app.probability_model import ProbabilityModel
+        
+        deals = [{"attributes": {"deal_value": 100000, "stage": "closed-lost"}}]
+        result = MonteCarloSimulation(seed=1).simulate_portfolio(
+            deals, iterations=1000, probability_model=ProbabilityModel()
+        )
+        
+        assert result["expected_value"] == 0.0
+        assert result["max"] == 0.0
+    
+    def test_simulate_with_timing(self):
+        """Test monthly revenue distribution over the recognition window"""
+        from datetime import date
+        
+        sim = MonteCarloSimulation(seed=42)
+        deals = [
+            {
+                "attributes": {
+                    "deal_value": 120000,
+                    "probability": 50,
+                    "recognition_start_month": "2025-01-01",
+                    "recognition_end_month": "2025-06-01"
+                }
+            },
+            {
+                "attributes": {
+                    "deal_value": 30000,
+                    "probability": 100,
+                    "recognition_start_month": "2025-05-01",
+                    "recognition_end_month": "2025-12-01"
+                }
+            }
+        ]
+        
+        result = sim.simulate_with_timing(
+            deals, date(2025, 3, 1), date(2025, 8, 31), iterations=4000
+        )
+        months = result["monthly_distributions"]
+        
+        # Only months inside the window are reported
+        assert list(months.keys()) == [
+            "2025-03-01", "2025-04-01", "2025-05-01",
+            "2025-06-01", "2025-07-01", "2025-08-01"
+        ]
+        # First deal recognises 30000/month over Mar-Jun in the window, closing half the time
+        assert months["2025-03-01"]["mean"] == pytest.approx(15000, rel=0.05)
+        assert months["2025-03-01"]["percentiles"]["5"] == 0.0
+        assert months["2025-03-01"]["percentiles"]["95"] == pytest.approx(30000)
+        # Second deal always closes and spreads 30000 over May-Aug
+        assert months["2025-08-01"]["mean"] == pytest.approx(7500)
+        assert months["2025-08-01"]["std_dev"] == pytest.approx(0.0, abs=1e-9)
+    
+    def test_sketch_accumulator_matches_exact(self):
+        """Test that the constant-memory sketch agrees with exact statistics"""
+        deals = [
+            {"attributes": {"deal_value": 5000 * (i + 1), "probability": 20 + i % 60}}
+            for i in range(40)
+        ]
+        
+        exact = MonteCarloSimulation(seed=3).simulate_portfolio(deals, iterations=20000)
+        sketch = MonteCarloSimulation(seed=3, accumulator="sketch").simulate_portfolio(
+            deals, iterations=20000
+        )
+        
+        assert sketch["expected_value"] == pytest.approx(exact["expected_value"])
+        assert sketch["std_dev"] == pytest.approx(exact["std_dev"])
+        for level in ["5", "50", "95"]:
+            assert sketch["distribution"]["percentiles"][level] == pytest.approx(
+                exact["distribution"]["percentiles"][level], rel=0.02
+            )
+    
+    def test_parallel_matches_serial_for_seed(self):
+        """Test that results for a seed do not depend on the worker count"""
+        deals = [
+            {"attributes": {"deal_value": 10000 * (i + 1), "probability": 15 + i % 70}}
+            for i in range(25)
+        ]
+        
+        serial = MonteCarloSimulation(seed=11).simulate_portfolio(deals, iterations=20000)
+        sim = MonteCarloSimulation(seed=11, max_workers=3)
+        try:
+            parallel = sim.simulate_portfolio(deals, iterations=20000, workers=3)
+            pool = sim._pool
+            # The pool outlives a run and is reused by the next one
+            sim.simulate_portfolio(deals, iterations=20000, workers=2)
+            assert sim._pool is pool is not None
+        finally:
+            sim.close()
+        
+        assert parallel == serial
+        assert sim._pool is None
+    
+    def test_calls_use_independent_streams(self):
+        """Test that consecutive calls on one instance draw fresh streams"""
+        deals = [{"attributes": {"deal_value": 100000, "probability": 50}}]
+        sim = MonteCarloSimulation(seed=5)
+        
+        first = sim.simulate_portfolio(deals, iterations=1000)
+        second = sim.simulate_portfolio(deals, iterations=1000)
+        
+        assert first["expected_value"] != second["expected_value"]
+    
+    def test_analytic_exact_matches_sampling(self):
+        """Test that the exact analytic distribution agrees with sampling"""
+        deals = [
+            {"attributes": {"deal_value": 1000 * (i + 1), "probability": 10 + i % 80}}
+            for i in range(60)
+        ]
+        sim = MonteCarloSimulation(seed=8)
+        
+        analytic = sim.analytic_portfolio(deals)
+        sampled = sim.simulate_portfolio(deals, iterations=50000)
+        
+        assert analytic["method"] == "exact"
+        assert analytic["expected_value"] == pytest.approx(sampled["expected_value"], rel=0.01)
+        assert analytic["std_dev"] == pytest.approx(sampled["std_dev"], rel=0.02)
+        for level in ["5", "50", "95"]:
+            assert analytic["distribution"]["percentiles"][level] == pytest.approx(
+                sampled["distribution"]["percentiles"][level], rel=0.02
+            )
+    
+    def test_analytic_two_deal_distribution(self):
+        """Test exact percentiles on a distribution small enough to enumerate"""
+        deals = [
+            {"attributes": {"deal_value": 100, "probability": 50}},
+            {"attributes": {"deal_value": 300, "probability": 50}}
+        ]
+        
+        result = MonteCarloSimulation().analytic_portfolio(deals, method="exact")
+        
+        # Outcomes 0, 100, 300, 400 each with probability 0.25
+        assert result["expected_value"] == pytest.approx(200)
+        assert result["min"] == 0.0
+        assert result["max"] == 400.0
+        assert result["distribution"]["percentiles"]["25"] == 0.0
+        assert result["distribution"]["percentiles"]["50"] == 100.0
+        assert result["distribution"]["percentiles"]["95"] == 400.0
+    
+    def test_analytic_method_selection(self):
+        """Test that large lattices fall back to approximate methods"""
+        deals = [
+            {"attributes": {"deal_value": 123456.78 + i * 1.01, "probability": 40}}
+            for i in range(50)
+        ]
+        sim = MonteCarloSimulation()
+        
+        auto = sim.analytic_portfolio(deals)
+        normal = sim.analytic_portfolio(deals, method="normal")
+        
+        assert auto["method"] == "bucketed"
+        assert normal["method"] == "normal"
+        assert normal["distribution"]["percentiles"]["50"] == pytest.approx(
+            auto["distribution"]["percentiles"]["50"], rel=0.01
+        )
+        with pytest.raises(ValueError):
+            sim.analytic_portfolio(deals, method="exact")
+    
+    @pytest.mark.parametrize("mode", ["antithetic", "stratified", "sobol"])
+    def test_variance_reduction_lowers_standard_error(self, mode):
+        """Test that variance-reduced sampling beats plain sampling at equal iterations"""
+        deals = [
+            {"attributes": {"deal_value": 1000 * (i + 1), "probability": 35 + i % 30}}
+            for i in range(100)
+        ]
+        expected_mean = sum(1000 * (i + 1) * (35 + i % 30) / 100 for i in range(100))
+        
+        plain = MonteCarloSimulation(seed=4).simulate_portfolio(deals, iterations=8192)
+        reduced = MonteCarloSimulation(seed=4).simulate_portfolio(
+            deals, iterations=8192, variance_reduction=mode
+        )
+        
+        assert reduced["variance_reduction"] == mode
+        assert reduced["standard_error"] < plain["standard_error"]
+        assert abs(reduced["expected_value"] - expected_mean) < 4 * reduced["standard_error"]
+    
+    def test_target_precision_stops_early(self):
+        """Test that sampling stops once the requested half-width is reached"""
+        deals = [
+            {"attributes": {"deal_value": 1000 * (i + 1), "probability": 10 + i % 80}}
+            for i in range(50)
+        ]
+        
+        result = MonteCarloSimulation(seed=9).simulate_portfolio(
+            deals, iterations=500000, variance_reduction="stratified", target_precision=10
+        )
+        
+        assert result["converged"] is True
+        # More than the first round of replicates was needed, but not the whole budget
+        assert 8 * 4096 < result["iterations"] < 500000
+        assert 0 < 1.96 * result["standard_error"] <= 10
+    
+    def test_standard_error_matches_spread_across_seeds(self):
+        """Test that the replicate-based standard error tracks the mean's spread across seeds"""
+        deals = [
+            {"attributes": {"deal_value": 1000 * (i + 1), "probability": 10 + i % 80}}
+            for i in range(50)
+        ]
+        
+        for variance_reduction in ("stratified", "sobol"):
+            results = [
+                MonteCarloSimulation(seed=seed).simulate_portfolio(
+                    deals, iterations=8192, variance_reduction=variance_reduction
+                )
+                for seed in range(40)
+            ]
+            empirical = np.std([r["expected_value"] for r in results], ddof=1)
+            reported = np.mean([r["standard_error"] for r in results])
+            
+            assert empirical > 0
+            assert 0.6 < reported / empirical < 1.6
+    
+    def test_unknown_variance_reduction(self):
+        """Test that unknown sampling schemes are rejected"""
+        deals = [{"attributes": {"deal_value": 1000, "probability": 50}}]
+        
+        with pytest.raises(ValueError):
+            MonteCarloSimulation().simulate_portfolio(deals, iterations=1000, variance_reduction="halton")
@@ -0,0 +1,36 @@
+"""
+Tests for integer month index helpers
+"""
+from datetime import date
+from app.month_index import (
+    month_from_index, month_index, parse_date, parse_month_index, recognition_range, window_bounds
+)
+
+
+class TestMonthIndex:
+    def test_round_trip_across_year_boundaries(self):
+        """Test that indices map back to the first day of the same month"""
+        for month in [date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 29), date(2099, 12, 31)]:
+            assert month_from_index(month_index(month)) == month.replace(day=1)
+        assert month_index(date(2025, 1, 1)) - month_index(date(2024, 12, 1)) == 1
+    
+    def test_parse_date_accepts_dates_and_timestamps(self):
+        """Test that plain dates and UTC timestamps parse to the same calendar date"""
+        assert parse_date("2024-03-15") == date(2024, 3, 15)
+        assert parse_date("2024-03-15T23:30:00.000Z") == date(2024, 3, 15)
+        assert parse_month_index(date(2024, 3, 15)) == parse_month_index("2024-03-01")
+    
+    def test_window_bounds_exclude_mid_month_start(self):
+        """Test that months are counted when their first day falls in the window"""
+        assert window_bounds(date(2024, 1, 1), date(2024, 3, 1)) == (month_index(date(2024, 1, 1)), month_index(date(2024, 3, 1)))
+        first, last = window_bounds(date(2024, 1, 15), date(2024, 3, 31))
+        assert (month_from_index(first), month_from_index(last)) == (date(2024, 2, 1), date(2024, 3, 1))
+    
+    def test_recognition_range(self):
+        """Test recognition windows as inclusive index ranges"""
+        attrs = {"recognition_start_month": "2024-11-01", "recognition_end_month": "2025-02-01"}
+        first, last = recognition_range(attrs)
+        
+        assert last - first + 1 == 4
+        assert recognition_range({"recognition_start_month": "2024-11-01"}) is None
+        assert recognition_range({"recognition_start_month": "2025-01-01", "recognition_end_month": "2024-01-01"}) is None
@@ -98,8 +98,62 @@ class TestProbabilityModel:
         adjusted = model.adjust_probability(Decimal("0.10"), deal_attrs)
         assert adjusted >= Decimal("0.0")
         assert adjusted <= Decimal("1.0")
-
-
-
-
-
+    
+    
+    
+    
+    
+    
+    def test_batch_probabilities_match_scalar(self):
+        """Test that columnar batch scoring reproduces the scalar path exactly"""
+        from datetime import datetime, timedelta, timezone
+        from app.deal_table import DealTable
+        
+        now = datetime.now(timezone.utc)
+        deals = [
+            {"id": 1, "attributes": {"stage": "proposal", "deal_value": 1500000}},
+            {"id": 2, "attributes": {"stage": "Negotiation", "probability": 33.3}},
+            {"id": 3, "attributes": {"stage": "qualification", "probability": 0, "deal_value": 200000}},
+            {"id": 4, "attributes": {"confidence_override": 42.5, "deal_value": 5000000}},
+            {"id": 5, "attributes": {
+                "stage": "negotiation",
+                "last_activity_at": (now - timedelta(days=45)).isoformat()
+            }},
+            {"id": 6, "attributes": {
+                "stage": "proposal",
+                "last_activity_at": (now - timedelta(days=3)).isoformat().replace("+00:00", "Z"),
+                "risk_flags": {"data": [{"attributes": {"severity": "high"}}]}
+            }},
+            {"id": 7, "attributes": {
+                "stage": "closed-won",
+                "project": {"data": {"attributes": {"complexity_score": 9}}},
+                "risk_flags": {"data": [{"attributes": {"severity": "low"}}]}
+            }},
+            {"id": 8, "attributes": {"stage": "unknown-stage", "last_activity_at": "not-a-date"}},
+            {"id": 9, "attributes": {
+                "stage": "prospecting",
+                "deal_value": 2000000,
+                "last_activity_at": (now - timedelta(days=100)).isoformat()
+            }},
+            # Strapi sends decimal columns as strings; "0" is set, unlike 0
+            {"id": 10, "attributes": {"stage": "negotiation", "probability": "0"}},
+            {"id": 11, "attributes": {"stage": "proposal", "probability": "0.0", "deal_value": "1500000"}},
+            {"id": 12, "attributes": {"stage": "proposal", "confidence_override": "0"}},
+            {"id": 13, "attributes": {"stage": "proposal", "confidence_override": 0, "probability": ""}}
+        ]
+        
+        table = DealTable.from_deals(deals)
+        batch = ProbabilityModel.compute_deal_probabilities(table)
+        scalar = [float(ProbabilityModel.compute_deal_probability(d["attributes"])) for d in deals]
+        
+        assert list(batch) == scalar
+    
+    def test_batch_probabilities_without_override(self):
+        """Test that batch scoring honours use_override=False"""
+        from app.deal_table import DealTable
+        
+        deals = [{"id": 1, "attributes": {"confidence_override": 85, "stage": "negotiation"}}]
+        table = DealTable.from_deals(deals)
+        
+        assert ProbabilityModel.compute_deal_probabilities(table)[0] == 0.85
+        assert ProbabilityModel.compute_deal_probabilities(table, use_override=False)[0] == 0.75
@@ -0,0 +1,95 @@
+"""
+Tests for typed Strapi records
+"""
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from app.deal_table import DealTable
+from app.model_calibration import ModelCalibration
+from app.monte_carlo import MonteCarloSimulation
+from app.month_index import month_index
+from app.records import BillingRecord, DealRecord, SaleRecord, deal_records
+
+
+def _deal(deal_id, **attrs):
+    return {"id": deal_id, "attributes": attrs}
+
+
+class TestRecords:
+    def test_deal_record_parses_values_and_flattens_relations(self):
+        """Test that a deal entry is parsed once into typed fields"""
+        record = DealRecord.from_entry(_deal(
+            7,
+            stage="Proposal",
+            deal_value="1250000.50",
+            probability=0,
+            last_activity_at="2024-01-02T03:04:05Z",
+            recognition_start_month="2024-01-01",
+            recognition_end_month="2024-03-01",
+            project={"data": {"id": 3, "attributes": {"complexity_score": 9}}},
+            risk_flags={"data": [{"id": 1, "attributes": {"severity": "low"}}, {"id": 2, "attributes": {"severity": "high"}}]}
+        ))
+        
+        assert record.deal_value == Decimal("1250000.50")
+        assert record.probability == 0 and not record.probability
+        assert record.confidence_override is None
+        assert record.last_activity_at.year == 2024 and record.last_activity_at.tzinfo is not None
+        assert record.recognition == (month_index(date(2024, 1, 1)), month_index(date(2024, 3, 1)))
+        assert (record.risk_flag_count, record.high_risk, record.complexity_score) == (2, True, 9.0)
+        assert not hasattr(record, "__dict__")
+    
+    def test_table_from_records_matches_table_from_entries(self):
+        """Test that engines get the same arrays from records and raw entries"""
+        deals = [
+            _deal(1, stage="negotiation", deal_value=2_000_000, probability=80, confidence_override=None),
+            _deal(2, deal_value="500.25", last_activity_at="2020-01-01T00:00:00+00:00", risk_flags=[]),
+            _deal(3, stage="Qualification", deal_value=75_000, confidence_override="65",
+                  project={"data": {"attributes": {}}})
+        ]
+        from_entries = DealTable.from_deals(deals)
+        from_records = DealTable.from_deals(deal_records(deals))
+        
+        for name in ("deal_value", "probability", "confidence_override", "last_activity_at", "high_risk", "complexity_score"):
+            np.testing.assert_array_equal(getattr(from_records, name), getattr(from_entries, name))
+        assert from_records.stages == ["negotiation", "prospecting", "qualification"]
+        assert list(from_records.ids) == [1, 2, 3]
+    
+    def test_simulation_accepts_records(self):
+        """Test that simulations give identical results for records and entries"""
+        deals = [
+            _deal(i, deal_value=10_000 * (i + 1), probability=20 + 10 * i,
+                  recognition_start_month="2024-01-01", recognition_end_month="2024-06-01")
+            for i in range(5)
+        ]
+        records = deal_records(deals)
+        
+        assert (
+            MonteCarloSimulation(seed=1).simulate_portfolio(records, iterations=2000)
+            == MonteCarloSimulation(seed=1).simulate_portfolio(deals, iterations=2000)
+        )
+        assert (
+            MonteCarloSimulation(seed=1).simulate_with_timing(records, date(2024, 1, 1), date(2024, 12, 1), iterations=500)
+            == MonteCarloSimulation(seed=1).simulate_with_timing(deals, date(2024, 1, 1), date(2024, 12, 1), iterations=500)
+        )
+    
+    def test_sale_and_billing_records(self):
+        """Test sale/billing parsing and the calibration deal-to-billing join"""
+        sale = SaleRecord.from_entry({"documentId": "abc", "customer": "Acme", "amount": "1200", "createdAt": "2024-05-06T07:00:00Z"})
+        assert (sale.id, sale.client, sale.status, sale.amount, sale.sale_date) == (
+            "abc", "Acme", "Pending", Decimal("1200"), date(2024, 5, 6)
+        )
+        
+        billing = BillingRecord.from_entry({"id": 9, "attributes": {
+            "amount": "300", "month": 2, "year": 2024, "invoice_date": "2024-04-10",
+            "collected_date": "2024-05-01", "deal": {"data": {"id": 1}}
+        }})
+        assert (billing.deal_id, billing.amount, billing.month_index, billing.collected) == (
+            1, Decimal("300"), month_index(date(2024, 4, 1)), True
+        )
+        
+        analysis = ModelCalibration().analyze_historical_conversion(
+            [_deal(1, stage="proposal", deal_value=100), _deal(2, stage="proposal", deal_value=300)],
+            [{"id": 9, "attributes": {"amount": 50, "deal": {"data": {"id": 1}}}}, {"id": 10, "attributes": {"deal": {"data": None}}}]
+        )
+        assert analysis["stage_conversion_rates"]["proposal"]["converted_count"] == 1
+        assert analysis["stage_conversion_rates"]["proposal"]["value_conversion_rate"] == 0.25
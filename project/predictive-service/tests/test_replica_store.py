@@ -0,0 +1,106 @@
+"""
+Tests for the local Strapi replica
+"""
+import asyncio
+import httpx
+from app.forecast_service import ForecastService
+from app.replica_store import ReplicaStore
+from app.strapi_client import StrapiClient
+
+
+def _deal(deal_id, updated_at, **attributes):
+    return {"id": deal_id, "attributes": {"updatedAt": updated_at, **attributes}}
+
+
+class FakeStrapi:
+    """Serves a mutable in-memory collection and records the params of each request"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.requests = []
+    
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(dict(request.url.params))
+        since = request.url.params.get("filters[updatedAt][$gte]")
+        rows = [r for r in self.rows if not since or r["attributes"]["updatedAt"] >= since]
+        return httpx.Response(200, json={"data": rows, "meta": {"pagination": {"pageCount": 1}}})
+
+
+def _sync(replica, fake, **kwargs):
+    client = StrapiClient(transport=httpx.MockTransport(fake.handler))
+    
+    async def run():
+        try:
+            return await replica.sync(client, "pipeline-deals", **kwargs)
+        finally:
+            await client.aclose()
+    
+    return asyncio.run(run())
+
+
+class TestReplicaStore:
+    def test_incremental_sync_pulls_only_changes(self):
+        """Test that a second sync starts from the stored updatedAt watermark"""
+        fake = FakeStrapi([
+            _deal(1, "2024-01-01T00:00:00.000Z", stage="proposal"),
+            _deal(2, "2024-01-02T00:00:00.000Z", stage="negotiation")
+        ])
+        replica = ReplicaStore()
+        
+        assert _sync(replica, fake) == 2
+        fake.rows.append(_deal(3, "2024-01-03T00:00:00.000Z", stage="prospecting"))
+        
+        assert _sync(replica, fake) == 2  # entry 2 shares the watermark, plus entry 3
+        assert fake.requests[-1]["filters[updatedAt][$gte]"] == "2024-01-02T00:00:00.000Z"
+        assert replica.count("pipeline-deals") == 3
+        assert replica.get("pipeline-deals", 3)["attributes"]["stage"] == "prospecting"
+    
+    def test_full_sync_drops_deleted_entries(self):
+        """Test that a full sync removes entries no longer in Strapi"""
+        fake = FakeStrapi([_deal(1, "2024-01-01"), _deal(2, "2024-01-02")])
+        replica = ReplicaStore()
+        _sync(replica, fake)
+        
+        fake.rows = fake.rows[:1]
+        _sync(replica, fake, full_sync=True)
+        
+        assert [e["id"] for e in replica.entries("pipeline-deals")] == [1]
+        assert "filters[updatedAt][$gte]" not in fake.requests[-1]
+    
+    def test_iter_entries_filters_on_attributes(self):
+        """Test attribute equality filters and id ordering"""
+        replica = ReplicaStore()
+        replica.upsert("pipeline-deals", [
+            _deal(3, "t", status="active"),
+            _deal(1, "t", status="active"),
+            _deal(2, "t", status="closed")
+        ])
+        
+        active = list(replica.iter_entries("pipeline-deals", {"status": "active"}, batch_size=1))
+        
+        assert [e["id"] for e in active] == [1, 3]
+    
+    def test_forecast_served_from_replica_when_strapi_is_down(self):
+        """Test that ForecastService reads synced deals without calling Strapi"""
+        def unavailable(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("Strapi is down")
+        
+        replica = ReplicaStore()
+        replica.upsert("pipeline-deals", [_deal(
+            1, "2024-01-01",
+            status="active",
+            deal_value=1200,
+            probability=80,
+            recognition_start_month="2024-01-01",
+            recognition_end_month="2024-03-01"
+        )])
+        replica._mark_synced("pipeline-deals", "2024-01-01")
+        service = ForecastService(StrapiClient(transport=httpx.MockTransport(unavailable)), replica)
+        
+        from datetime import date
+        result = asyncio.run(service.compute_base_forecast(date(2024, 1, 1), date(2024, 12, 1)))
+        
+        assert result["forecast"]["summary"]["total_confirmed"] == 960.0
+        assert [m["month"] for m in result["forecast"]["monthly_totals"]] == [
+            "2024-01-01", "2024-02-01", "2024-03-01"
+        ]
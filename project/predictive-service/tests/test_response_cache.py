@@ -0,0 +1,58 @@
+"""
+Tests for the ETag response cache
+"""
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.response_cache import ResponseCache
+
+
+def _client():
+    cache = ResponseCache(max_entries=8, ttl_seconds=60)
+    calls = []
+    app = FastAPI()
+    
+    @app.get("/forecast")
+    async def forecast(request: Request, month: str = "2024-01"):
+        async def compute():
+            calls.append(month)
+            return {"month": month, "total": 100.0 * len(calls)}
+        return await cache.respond(request, "forecast", {"month": month}, compute)
+    
+    return TestClient(app), cache, calls
+
+
+class TestResponseCache:
+    def test_cached_until_data_version_bump(self):
+        """Test that repeat requests are served from cache until the data changes"""
+        client, cache, calls = _client()
+        
+        first = client.get("/forecast")
+        second = client.get("/forecast")
+        assert first.json() == second.json()
+        assert first.headers["etag"] == second.headers["etag"]
+        assert len(calls) == 1
+        
+        client.get("/forecast", params={"month": "2024-02"})
+        assert len(calls) == 2
+        
+        cache.bump_version()
+        third = client.get("/forecast")
+        assert len(calls) == 3
+        assert third.headers["etag"] != first.headers["etag"]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 3
+    
+    def test_if_none_match_returns_304(self):
+        """Test ETag revalidation"""
+        client, cache, calls = _client()
+        etag = client.get("/forecast").headers["etag"]
+        
+        revalidated = client.get("/forecast", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == etag
+        
+        stale = client.get("/forecast", headers={"If-None-Match": '"something-else"'})
+        assert stale.status_code == 200
+        assert cache.stats()["not_modified"] == 1
+        assert len(calls) == 1
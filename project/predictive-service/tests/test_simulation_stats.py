@@ -0,0 +1,88 @@
+"""
+Tests for streaming simulation statistics
+"""
+import pytest
+import numpy as np
+from app.simulation_stats import RunningMoments, TDigest, make_accumulator
+
+
+class TestRunningMoments:
+    def test_batches_match_numpy(self):
+        """Test that chunked Welford updates match a single numpy pass"""
+        rng = np.random.default_rng(0)
+        data = rng.exponential(1000.0, size=50000)
+        
+        moments = RunningMoments()
+        for chunk in np.array_split(data, 7):
+            moments.update(chunk)
+        
+        assert moments.count == data.size
+        assert moments.mean == pytest.approx(data.mean(), rel=1e-12)
+        assert moments.std_dev == pytest.approx(data.std(ddof=1), rel=1e-10)
+        assert moments.min == data.min()
+        assert moments.max == data.max()
+    
+    def test_merge_partial_results(self):
+        """Test that merging partial moments equals the combined moments"""
+        left, right = RunningMoments(), RunningMoments()
+        left.update(np.array([1.0, 2.0, 3.0]))
+        right.update(np.array([10.0, 20.0]))
+        left.merge(right)
+        
+        assert left.mean == pytest.approx(7.2)
+        assert left.variance == pytest.approx(np.var([1, 2, 3, 10, 20], ddof=1))
+
+
+class TestTDigest:
+    def test_quantiles_within_rank_error(self):
+        """Test that sketch quantiles stay within the configured rank error"""
+        rng = np.random.default_rng(1)
+        data = rng.lognormal(12, 1.0, size=200000)
+        rank_error = 0.01
+        
+        digest = TDigest.for_rank_error(rank_error)
+        for chunk in np.array_split(data, 20):
+            digest.update(chunk)
+        
+        qs = [0.025, 0.1, 0.25, 0.5, 0.75, 0.9, 0.975]
+        estimates = digest.quantiles(qs, data.min(), data.max())
+        sorted_data = np.sort(data)
+        for q, estimate in zip(qs, estimates):
+            rank = np.searchsorted(sorted_data, estimate) / data.size
+            assert abs(rank - q) <= rank_error
+        
+        # Memory is bounded by the compression, not the number of values
+        assert digest.means.size <= digest.compression + 1
+    
+    def test_small_inputs_are_exact(self):
+        """Test that uncompressed digests reproduce numpy percentiles"""
+        data = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0])
+        digest = TDigest(compression=1000)
+        digest.update(data)
+        
+        assert list(digest.quantiles([0.25, 0.5, 0.75], 1.0, 10.0)) == pytest.approx([3.25, 5.5, 7.75])
+
+
+class TestAccumulators:
+    def test_sketch_merges_like_single_stream(self):
+        """Test that merged worker sketches agree with a single accumulator"""
+        rng = np.random.default_rng(2)
+        data = rng.normal(1e6, 2e5, size=100000)
+        
+        single = make_accumulator("sketch", rank_error=0.005)
+        single.update(data)
+        
+        merged = make_accumulator("sketch", rank_error=0.005)
+        for part in np.array_split(data, 4):
+            worker = make_accumulator("sketch", rank_error=0.005)
+            worker.update(part)
+            merged.merge(worker)
+        
+        assert merged.count == single.count
+        assert merged.mean == pytest.approx(single.mean)
+        assert merged.percentiles([50])[0] == pytest.approx(single.percentiles([50])[0], rel=0.01)
+    
+    def test_unknown_accumulator(self):
+        """Test that unknown accumulator names are rejected"""
+        with pytest.raises(ValueError):
+            make_accumulator("histogram")
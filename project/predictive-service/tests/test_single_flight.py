@@ -0,0 +1,91 @@
+"""
+Tests for request coalescing
+"""
+import asyncio
+import httpx
+import pytest
+from app.single_flight import SingleFlight
+from app.strapi_client import StrapiClient
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that identical concurrent calls run once and report coalesced counts"""
+        flight = SingleFlight()
+        runs = []
+        
+        async def compute():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return {"total": 42}
+        
+        async def run():
+            results = await asyncio.gather(*(flight.do("forecast", compute) for _ in range(10)))
+            later = await flight.do("forecast", compute)
+            return results, later
+        
+        results, later = asyncio.run(run())
+        
+        assert all(r is results[0] for r in results)
+        assert later == {"total": 42}
+        assert len(runs) == 2  # the later call starts a new execution
+        assert flight.stats()["coalesced"] == 9
+        assert flight.stats()["in_flight"] == 0
+    
+    def test_errors_reach_every_waiter(self):
+        """Test that a failing execution raises for all coalesced callers"""
+        flight = SingleFlight()
+        
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+        
+        async def run():
+            return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        
+        results = asyncio.run(run())
+        
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.stats()["executions"] == 1
+    
+    def test_cancelled_caller_does_not_cancel_shared_work(self):
+        """Test that other waiters still get the result when one caller is cancelled"""
+        flight = SingleFlight()
+        
+        async def compute():
+            await asyncio.sleep(0.02)
+            return "done"
+        
+        async def run():
+            first = asyncio.ensure_future(flight.do("k", compute))
+            second = asyncio.ensure_future(flight.do("k", compute))
+            await asyncio.sleep(0)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+        
+        assert asyncio.run(run()) == "done"
+    
+    def test_strapi_pages_fetched_once_for_concurrent_readers(self):
+        """Test that concurrent identical collection reads share upstream requests"""
+        requests = []
+        
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"data": [{"id": 1}], "meta": {"pagination": {"pageCount": 1}}})
+        
+        client = StrapiClient(transport=httpx.MockTransport(handler))
+        
+        async def run():
+            try:
+                return await asyncio.gather(*(client.get_pipeline_deals() for _ in range(5)))
+            finally:
+                await client.aclose()
+        
+        results = asyncio.run(run())
+        
+        assert all(r == [{"id": 1}] for r in results)
+        assert len(requests) == 1
+        assert client.single_flight.stats()["coalesced"] == 4
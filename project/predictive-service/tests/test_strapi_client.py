@@ -0,0 +1,256 @@
+"""
+Tests for Strapi client connection handling
+"""
+import asyncio
+import json
+import httpx
+from app.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from app.retry_logic import RetryConfig
+from app.strapi_client import StrapiClient, StrapiOverloadedError
+
+
+def _transport(requests):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/billings"):
+            return httpx.Response(404)
+        return httpx.Response(200, json={"data": [{"id": 1, "attributes": {}}]})
+    return httpx.MockTransport(handler)
+
+
+class TestStrapiClient:
+    def test_requests_share_one_client(self):
+        """Test that calls reuse the pooled client instead of opening new ones"""
+        requests = []
+        client = StrapiClient(transport=_transport(requests))
+        
+        async def run():
+            deals = await client.get_pipeline_deals(filters={"stage": "proposal"})
+            first = client._client
+            billings = await client.get_billings()
+            assert client._client is first
+            await client.aclose()
+            assert first.is_closed
+            return deals, billings
+        
+        deals, billings = asyncio.run(run())
+        
+        assert deals == [{"id": 1, "attributes": {}}]
+        assert billings == []
+        assert requests[0].url.params["filters[stage]"] == "proposal"
+    
+    def test_client_recreated_after_close(self):
+        """Test that a closed client is replaced on the next call"""
+        client = StrapiClient(transport=_transport([]))
+        
+        async def run():
+            await client.get_clients()
+            await client.aclose()
+            assert client._client is None
+            return await client.get_projects()
+        
+        assert asyncio.run(run()) == [{"id": 1, "attributes": {}}]
+    
+    def test_client_from_previous_loop_is_closed(self):
+        """Test that switching event loops closes the previous pooled client"""
+        client = StrapiClient(transport=_transport([]))
+        
+        async def fetch():
+            await client.get_clients()
+            return client._client
+        
+        first = asyncio.run(fetch())
+        
+        async def run():
+            second = await fetch()
+            await asyncio.sleep(0)
+            await client.aclose()
+            return second
+        
+        second = asyncio.run(run())
+        assert second is not first
+        assert first.is_closed
+    
+    def test_fan_out_isolates_failing_branch(self):
+        """Test that one failing branch yields partial data with an error marker"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/loose-furniture-sales"):
+                return httpx.Response(500)
+            return httpx.Response(200, json={"data": [{"id": request.url.path}]})
+        
+        client = StrapiClient(transport=httpx.MockTransport(handler))
+        
+        async def run():
+            try:
+                return await client.get_all_sales()
+            finally:
+                await client.aclose()
+        
+        result = asyncio.run(run())
+        
+        assert result["loose_furniture"] == []
+        assert set(result["errors"]) == {"loose_furniture"}
+        assert len(result["construction"]) == 1
+        assert len(result["interior_design"]) == 1
+        assert len(result["total"]) == 2
+    
+    def test_fan_out_is_concurrent_and_bounded(self, monkeypatch):
+        """Test that branches overlap but never exceed the concurrency limit"""
+        monkeypatch.setenv("STRAPI_FANOUT_CONCURRENCY", "2")
+        client = StrapiClient()
+        in_flight = 0
+        peak = 0
+        
+        async def fake_fetch(*args, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return [{"id": 1}]
+        
+        for name in ("get_billings", "get_construction_billings",
+                     "get_loose_furniture_billings", "get_interior_design_billings"):
+            monkeypatch.setattr(client, name, fake_fetch)
+        
+        result = asyncio.run(client.get_all_billings())
+        
+        assert peak == 2
+        assert len(result["total"]) == 4
+        assert result["errors"] == {}
+    
+    def test_iter_collection_walks_all_pages(self):
+        """Test that streaming follows pagination and yields entries in order"""
+        pages_requested = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            page = int(request.url.params["pagination[page]"])
+            size = int(request.url.params["pagination[pageSize]"])
+            pages_requested.append(page)
+            rows = [{"id": i} for i in range((page - 1) * size + 1, min(page * size, 23) + 1)]
+            return httpx.Response(200, json={
+                "data": rows,
+                "meta": {"pagination": {"page": page, "pageSize": size, "pageCount": 3, "total": 23}}
+            })
+        
+        client = StrapiClient(transport=httpx.MockTransport(handler))
+        client.page_size = 10
+        
+        async def run():
+            try:
+                streamed = [row["id"] async for row in client.iter_billings()]
+                listed = await client.get_billings()
+                return streamed, listed
+            finally:
+                await client.aclose()
+        
+        streamed, listed = asyncio.run(run())
+        
+        assert streamed == list(range(1, 24))
+        assert [row["id"] for row in listed] == streamed
+        assert sorted(pages_requested) == [1, 1, 2, 2, 3, 3]
+    
+    def test_iter_collection_prefetch_is_bounded(self):
+        """Test that no more than `prefetch` pages are requested ahead of the consumer"""
+        client = StrapiClient()
+        fetched = []
+        
+        async def fake_page(path, params, page, page_size, not_found_ok=True):
+            fetched.append(page)
+            return [{"id": page}], 50
+        
+        client._get_page = fake_page
+        
+        async def run():
+            stream = client.iter_collection("/billings")
+            seen = []
+            async for row in stream:
+                seen.append(row["id"])
+                if len(seen) == 3:
+                    break
+            await stream.aclose()
+            return seen
+        
+        seen = asyncio.run(run())
+        
+        assert seen == [1, 2, 3]
+        assert max(fetched) <= 3 + client.page_prefetch
+    
+    def test_bulk_create_is_concurrent_and_ordered(self):
+        """Test that snapshots are written concurrently and outcomes follow input order"""
+        active = peak = 0
+        
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.005)
+            active -= 1
+            return httpx.Response(200, json={"data": {"id": json.loads(request.content)["data"]["n"]}})
+        
+        client = StrapiClient(transport=httpx.MockTransport(handler))
+        client.bulk_concurrency = 4
+        client.bulk_max_concurrency = 8
+        
+        async def run():
+            try:
+                return await client.bulk_create_snapshots([{"n": n} for n in range(60)])
+            finally:
+                await client.aclose()
+        
+        result = asyncio.run(run())
+        
+        assert result["created"] == 60 and result["failed"] == 0
+        assert [outcome["id"] for outcome in result["results"]] == list(range(60))
+        assert 4 <= peak <= 8
+    
+    def test_bulk_create_retries_overload_and_reports_failures(self):
+        """Test that 429s are retried with reduced concurrency and 4xx errors fail the item only"""
+        calls = {}
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            n = json.loads(request.content)["data"]["n"]
+            calls[n] = calls.get(n, 0) + 1
+            if n == 3:
+                return httpx.Response(400, json={"error": "invalid"})
+            if calls[n] == 1 and n % 2 == 0:
+                return httpx.Response(429)
+            return httpx.Response(200, json={"data": {"id": n}})
+        
+        client = StrapiClient(transport=httpx.MockTransport(handler))
+        client.bulk_concurrency = 8
+        client.bulk_retry = RetryConfig(
+            max_retries=2,
+            initial_delay=0,
+            retryable_exceptions=(StrapiOverloadedError, httpx.TransportError)
+        )
+        
+        async def run():
+            try:
+                return await client.bulk_create_snapshots([{"n": n} for n in range(10)])
+            finally:
+                await client.aclose()
+        
+        result = asyncio.run(run())
+        
+        assert result["created"] == 9 and result["failed"] == 1
+        assert result["results"][3]["status"] == "failed" and result["results"][3]["attempts"] == 1
+        assert result["results"][0] == {"index": 0, "status": "created", "id": 0, "attempts": 2}
+        assert result["concurrency"]["decreases"] >= 1
+        assert client.bulk_concurrency < 8
+    
+    def test_limiter_increases_additively_and_halves_on_overload(self):
+        """Test the AIMD limit adjustments"""
+        limiter = AdaptiveConcurrencyLimiter(initial=4, max_limit=10)
+        
+        async def run():
+            for _ in range(4):
+                await limiter.release(await limiter.acquire())
+            grown = limiter.limit
+            await limiter.release(await limiter.acquire(), overloaded=True)
+            return grown, limiter.limit
+        
+        grown, reduced = asyncio.run(run())
+        
+        assert 4.9 < grown < 5.1
+        assert reduced == grown / 2
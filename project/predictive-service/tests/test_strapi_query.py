@@ -0,0 +1,130 @@
+"""
+Tests for Strapi query pushdown
+"""
+import asyncio
+import httpx
+from datetime import date
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from app import main
+from app.forecast_service import ForecastService
+from app.replica_store import ReplicaStore
+from app.strapi_client import StrapiClient
+from app.strapi_query import StrapiQuery
+
+
+def _deal(deal_id, value, stage="proposal", status="active"):
+    return {"id": deal_id, "attributes": {
+        "name": f"Deal {deal_id}",
+        "status": status,
+        "stage": stage,
+        "deal_value": value,
+        "probability": 40
+    }}
+
+
+class TestStrapiQuery:
+    def test_params_use_strapi_bracket_syntax(self):
+        """Test that filters, projections and sort flatten to Strapi parameters"""
+        query = (
+            StrapiQuery()
+            .eq("status", "active")
+            .in_("id", [3, 7])
+            .gte("deal_value", Decimal("1000.50"))
+            .between("close_date", date(2024, 1, 1), date(2024, 6, 30))
+            .fields("name", "deal_value")
+            .populate("risk_flags", ["id"])
+            .populate("project")
+            .sort("deal_value:desc")
+        )
+        
+        assert query.to_params() == {
+            "filters[status][$eq]": "active",
+            "filters[id][$in][0]": 3,
+            "filters[id][$in][1]": 7,
+            "filters[deal_value][$gte]": "1000.50",
+            "filters[close_date][$gte]": "2024-01-01",
+            "filters[close_date][$lte]": "2024-06-30",
+            "fields[0]": "name",
+            "fields[1]": "deal_value",
+            "populate[risk_flags][fields][0]": "id",
+            "populate[project]": "true",
+            "sort": "deal_value:desc"
+        }
+    
+    def test_matches_evaluates_filters_locally(self):
+        """Test local evaluation used for replica reads"""
+        query = StrapiQuery().eq("status", "active").in_("id", [1, 2]).gte("deal_value", 500)
+        
+        assert query.matches(_deal(1, "750.00"))
+        assert not query.matches(_deal(2, 499))
+        assert not query.matches(_deal(3, 900))
+        assert not query.matches(_deal(1, 900, status="lost"))
+        assert query.equalities() == {"status": "active"}
+
+
+class TestPushdown:
+    def test_heatmap_pushes_threshold_and_projection_to_strapi(self):
+        """Test that the heatmap requests only matching deals and the fields it reads"""
+        requests = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"data": [_deal(1, 2_000_000)], "meta": {"pagination": {"pageCount": 1}}})
+        
+        strapi = StrapiClient(transport=httpx.MockTransport(handler))
+        service = ForecastService(strapi)
+        
+        async def run():
+            try:
+                return await service.compute_risk_heatmap(min_deal_value=Decimal("1000000"))
+            finally:
+                await strapi.aclose()
+        
+        result = asyncio.run(run())
+        params = requests[0].url.params
+        
+        assert params["filters[deal_value][$gte]"] == "1000000"
+        assert params["filters[status][$eq]"] == "active"
+        assert "deal_value" in [value for key, value in params.multi_items() if key.startswith("fields[")]
+        assert "populate" not in params and params["populate[risk_flags][fields][0]"] == "id"
+        assert result["heatmap"]["matrix"][0]["deal_count"] == 1
+    
+    def test_replica_reads_apply_the_same_query(self):
+        """Test that replica-served heatmaps honour the pushed-down threshold"""
+        replica = ReplicaStore()
+        replica.upsert("pipeline-deals", [_deal(1, 2_000_000), _deal(2, 10_000), _deal(3, 5_000_000, status="lost")])
+        replica._mark_synced("pipeline-deals", None)
+        service = ForecastService(StrapiClient(), replica)
+        
+        result = asyncio.run(service.compute_risk_heatmap(min_deal_value=Decimal("1000000")))
+        empty = asyncio.run(service.compute_risk_heatmap(min_deal_value=Decimal("9000000")))
+        
+        assert [cell["deal_count"] for cell in result["heatmap"]["matrix"]] == [1]
+        # Active deals below the threshold give an empty heatmap, not the sales fallback
+        assert empty["heatmap"]["matrix"] == [] and "data_source" not in empty
+    
+    def test_scoring_queries_populate_probability_relations(self, monkeypatch):
+        """Test that simulation, scenario and export queries populate risk flags and project"""
+        requests = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"data": [_deal(1, 100000)], "meta": {"pagination": {"pageCount": 1}}})
+        
+        monkeypatch.setattr(main, "strapi_client", StrapiClient(transport=httpx.MockTransport(handler)))
+        client = TestClient(main.app)
+        
+        client.post("/api/v1/models/forecast/simulate", json={"deal_ids": [1], "iterations": 100})
+        client.get("/api/v1/models/forecast/scenario/best")
+        client.post(
+            "/api/v1/export/simulation",
+            json={"deal_ids": [1], "start_month": "2025-01-01", "end_month": "2025-03-01", "iterations": 100}
+        )
+        
+        deal_requests = [r for r in requests if r.url.path.endswith("/pipeline-deals")]
+        assert len(deal_requests) == 3
+        for request in deal_requests:
+            params = request.url.params
+            assert params["populate[risk_flags][fields][0]"] == "severity"
+            assert params["populate[project][fields][0]"] == "complexity_score"
@@ -0,0 +1,113 @@
+"""
+Tests for streamed NDJSON / JSON responses
+"""
+import asyncio
+import json
+import httpx
+from app.streaming import FLUSH, json_document_stream, ndjson_stream
+from app.strapi_client import StrapiClient
+
+
+def _paged_transport(pages_per_collection=3, page_size=2):
+    def handler(request: httpx.Request) -> httpx.Response:
+        collection = request.url.path.rsplit("/", 1)[-1]
+        if collection == "interior-design-sales":
+            return httpx.Response(500)
+        page = int(request.url.params["pagination[page]"])
+        data = [
+            {"id": (page - 1) * page_size + i + 1, "attributes": {"collection": collection}}
+            for i in range(page_size)
+        ]
+        return httpx.Response(200, json={"data": data, "meta": {"pagination": {"pageCount": pages_per_collection}}})
+    return httpx.MockTransport(handler)
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class TestStreaming:
+    def test_branches_stream_as_ndjson_with_failures_recorded(self):
+        """Test that branches stream in order and a failing branch is recorded, not raised"""
+        client = StrapiClient(transport=_paged_transport())
+        errors = {}
+        
+        async def rows():
+            async for name, entry in client.iter_branches(
+                {"construction": "/construction-sales", "interior_design": "/interior-design-sales",
+                 "loose_furniture": "/loose-furniture-sales"},
+                errors=errors
+            ):
+                yield {"branch": name, **entry}
+        
+        async def run():
+            try:
+                return await _collect(ndjson_stream(rows(), chunk_bytes=1))
+            finally:
+                await client.aclose()
+        
+        chunks = asyncio.run(run())
+        lines = [json.loads(line) for line in b"".join(chunks).splitlines()]
+        
+        assert len(chunks) == len(lines) == 12  # one chunk per row at chunk_bytes=1
+        assert [row["branch"] for row in lines] == ["construction"] * 6 + ["loose_furniture"] * 6
+        assert [row["id"] for row in lines[:6]] == [1, 2, 3, 4, 5, 6]
+        assert list(errors) == ["interior_design"]
+    
+    def test_json_document_includes_summary_filled_while_streaming(self):
+        """Test the chunked JSON document form and its trailing summary"""
+        summary = {"count": 0}
+        
+        async def rows():
+            for i in range(1000):
+                summary["count"] += 1
+                yield {"id": i}
+        
+        chunks = asyncio.run(_collect(json_document_stream(rows(), summary, chunk_bytes=1024)))
+        document = json.loads(b"".join(chunks))
+        
+        assert len(chunks) > 1 and all(len(chunk) < 2048 for chunk in chunks)
+        assert [row["id"] for row in document["data"]] == list(range(1000))
+        assert document["summary"] == {"count": 1000}
+    
+    def test_first_chunk_sent_before_source_is_exhausted(self):
+        """Test that the first row (NDJSON) or document opening (JSON) is sent without waiting for a full chunk"""
+        exhausted = []
+        
+        async def rows():
+            for i in range(100):
+                yield {"id": i}
+            exhausted.append(True)
+        
+        async def first_chunk(stream):
+            chunk = await stream.__anext__()
+            await stream.aclose()
+            return chunk
+        
+        assert json.loads(asyncio.run(first_chunk(ndjson_stream(rows())))) == {"id": 0}
+        assert asyncio.run(first_chunk(json_document_stream(rows(), {}))) == b'{"data":['
+        assert not exhausted
+    
+    def test_each_upstream_page_is_flushed(self):
+        """Test that a FLUSH after every fetched page sends the page without waiting for a full chunk"""
+        client = StrapiClient(transport=_paged_transport())
+        
+        async def rows():
+            async for name, entries in client.iter_branch_pages(
+                {"construction": "/construction-sales", "loose_furniture": "/loose-furniture-sales"}
+            ):
+                for entry in entries:
+                    yield {"branch": name, **entry}
+                yield FLUSH
+        
+        async def run():
+            try:
+                return await _collect(ndjson_stream(rows()))
+            finally:
+                await client.aclose()
+        
+        chunks = asyncio.run(run())
+        
+        # The first row on its own, the rest of the first page, then one chunk per remaining page
+        assert [len(chunk.splitlines()) for chunk in chunks] == [1, 1, 2, 2, 2, 2, 2]
+        assert [json.loads(line)["id"] for line in b"".join(chunks).splitlines()] == [1, 2, 3, 4, 5, 6] * 2
@@ -0,0 +1,132 @@
+"""
+Tests for webhook-driven replica and forecast updates
+"""
+import asyncio
+import httpx
+from datetime import date
+from fastapi.testclient import TestClient
+from app import main
+from app.forecast_service import ForecastService
+from app.replica_store import ReplicaStore
+from app.strapi_client import StrapiClient
+from app.webhook_handler import WebhookHandler
+
+
+def _deal(deal_id, value, probability, start, end, status="active"):
+    return {"id": deal_id, "attributes": {
+        "status": status,
+        "deal_value": value,
+        "probability": probability,
+        "recognition_start_month": start,
+        "recognition_end_month": end
+    }}
+
+
+def _setup(deals, current):
+    """Replica synced with `deals`; Strapi returns `current[id]` when a deal is fetched"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        deal_id = int(request.url.params["filters[id]"])
+        return httpx.Response(200, json={"data": [current[deal_id]] if deal_id in current else []})
+    
+    replica = ReplicaStore()
+    replica.upsert("pipeline-deals", deals)
+    replica._mark_synced("pipeline-deals", None)
+    strapi = StrapiClient(transport=httpx.MockTransport(handler))
+    service = ForecastService(strapi, replica)
+    return WebhookHandler(strapi, service), service, replica
+
+
+def _monthly(forecast):
+    return {m["month"]: m["total"] for m in forecast["forecast"]["monthly_totals"]}
+
+
+class TestWebhookHandler:
+    def test_deal_update_patches_only_touched_months(self):
+        """Test that a deal edit patches cached totals to match a full recompute"""
+        deals = [
+            _deal(1, 3000, 80, "2024-01-01", "2024-03-01"),
+            _deal(2, 1000, 50, "2024-02-01", "2024-02-01")
+        ]
+        edited = _deal(2, 2000, 50, "2024-04-01", "2024-05-01")
+        handler, service, replica = _setup(deals, {2: edited})
+        window = (date(2024, 1, 1), date(2024, 12, 1))
+        
+        async def run():
+            await service.compute_base_forecast(*window)
+            result = await handler._handle_deal_change({"entry": {"id": 2}})
+            patched = await service.compute_base_forecast(*window)
+            service.invalidate_forecast_cache()
+            recomputed = await service.compute_base_forecast(*window)
+            return result, patched, recomputed
+        
+        result, patched, recomputed = asyncio.run(run())
+        
+        assert result["action"] == "forecast_patched"
+        assert result["months_touched"] == ["2024-02-01", "2024-04-01", "2024-05-01"]
+        assert _monthly(patched) == _monthly(recomputed)
+        assert _monthly(patched) == {
+            "2024-01-01": 800.0, "2024-02-01": 800.0, "2024-03-01": 800.0,
+            "2024-04-01": 500.0, "2024-05-01": 500.0
+        }
+        assert replica.get("pipeline-deals", 2)["attributes"]["deal_value"] == 2000
+    
+    def test_deal_delete_removes_contribution(self):
+        """Test that deleting a deal removes it from the replica and cached totals"""
+        deals = [
+            _deal(1, 3000, 80, "2024-01-01", "2024-03-01"),
+            _deal(2, 1000, 50, "2024-06-01", "2024-06-01")
+        ]
+        handler, service, replica = _setup(deals, {})
+        window = (date(2024, 1, 1), date(2024, 12, 1))
+        
+        async def run():
+            await service.compute_base_forecast(*window)
+            result = await handler._handle_deal_delete({"entry": {"id": 2}})
+            return result, await service.compute_base_forecast(*window)
+        
+        result, forecast = asyncio.run(run())
+        
+        assert result["months_touched"] == ["2024-06-01"]
+        assert "2024-06-01" not in _monthly(forecast)
+        assert replica.get("pipeline-deals", 2) is None
+    
+    def test_billing_change_updates_replica(self):
+        """Test that other entities are written to the replica from the webhook entry"""
+        handler, _, replica = _setup([], {})
+        
+        payload = {"entry": {"id": 7, "amount": 1500, "month": 3, "year": 2024}}
+        result = asyncio.run(handler._handle_entry_change("billings", payload))
+        
+        assert result["action"] == "replica_updated"
+        assert replica.get("billings", 7)["attributes"]["amount"] == 1500
+    
+    def test_endpoint_applies_update_and_delete(self, monkeypatch):
+        """Test that events posted to the webhook route reach the replica and retire cached responses"""
+        handler, _, replica = _setup(
+            [_deal(5, 1000, 50, "2024-01-01", "2024-01-01")],
+            {5: _deal(5, 4000, 50, "2024-01-01", "2024-01-01")}
+        )
+        monkeypatch.setattr(main, "webhook_handler", handler)
+        client = TestClient(main.app)
+        
+        version = main.response_cache.data_version
+        response = client.post(
+            "/api/v1/webhooks/strapi",
+            json={"event": "entry.update", "model": "pipeline-deal", "entry": {"id": 5}}
+        )
+        assert response.status_code == 200
+        assert response.json()["deal_id"] == 5
+        assert replica.get("pipeline-deals", 5)["attributes"]["deal_value"] == 4000
+        assert main.response_cache.data_version != version
+        
+        # The X-Strapi-* headers take precedence over the payload
+        version = main.response_cache.data_version
+        response = client.post(
+            "/api/v1/webhooks/strapi",
+            json={"entry": {"id": 5}},
+            headers={"X-Strapi-Event": "entry.delete", "X-Strapi-Entity": "pipeline-deal"}
+        )
+        assert response.status_code == 200
+        assert response.json()["action"] in ("forecast_patched", "replica_updated")
+        assert replica.get("pipeline-deals", 5) is None
+        assert main.response_cache.data_version != version